@@ -1,6 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Profile, Attendance, LeaveRequest, Payroll
+from .models import (
+    CustomUser, Profile, Attendance, AttendanceCalendar, DailyAttendanceSummary, LeaveRequest, LeaveBalance,
+    Payroll, PayrollRun, Payslip, OutboundEmail,
+)
+from .balances import set_leave_status
+from .rollups import record_attendance_change
 
 
 @admin.register(CustomUser)
@@ -12,7 +17,7 @@ class CustomUserAdmin(UserAdmin):
     
     fieldsets = UserAdmin.fieldsets + (
         ('Employee Information', {
-            'fields': ('employee_id', 'role', 'email_verified', 'verification_token')
+            'fields': ('employee_id', 'role', 'email_verified')
         }),
     )
     
@@ -40,6 +45,45 @@ class AttendanceAdmin(admin.ModelAdmin):
     search_fields = ['user__employee_id', 'user__first_name', 'user__last_name']
     date_hierarchy = 'date'
     ordering = ['-date']
+    
+    # Edits here bypass the views, which keep DailyAttendanceSummary in step;
+    # move the rows between summary buckets the same way
+    def save_model(self, request, obj, form, change):
+        old = Attendance.objects.filter(pk=obj.pk).values('user_id', 'date', 'status').first() if change else None
+        super().save_model(request, obj, form, change)
+        if old and (old['user_id'], old['date']) != (obj.user_id, obj.date):
+            record_attendance_change(old['user_id'], old['date'], old['status'], None)
+            old = None
+        record_attendance_change(obj.user_id, obj.date, old and old['status'], obj.status)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        record_attendance_change(obj.user_id, obj.date, obj.status, None)
+    
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset.values_list('user_id', 'date', 'status'))
+        super().delete_queryset(request, queryset)
+        for user_id, day, status in rows:
+            record_attendance_change(user_id, day, status, None)
+
+
+@admin.register(DailyAttendanceSummary)
+class DailyAttendanceSummaryAdmin(admin.ModelAdmin):
+    """Daily attendance rollup admin (rebuilt with rebuild_attendance_summary)"""
+    list_display = ['date', 'department', 'status', 'count']
+    list_filter = ['status', 'department', 'date']
+    date_hierarchy = 'date'
+    ordering = ['-date', 'department']
+
+
+@admin.register(AttendanceCalendar)
+class AttendanceCalendarAdmin(admin.ModelAdmin):
+    """Team calendar rows admin (rebuilt with rebuild_team_calendar)"""
+    list_display = ['user', 'month', 'days']
+    list_filter = ['month']
+    search_fields = ['user__employee_id', 'user__first_name', 'user__last_name']
+    list_select_related = ['user']
+    date_hierarchy = 'month'
 
 
 @admin.register(LeaveRequest)
@@ -54,16 +98,26 @@ class LeaveRequestAdmin(admin.ModelAdmin):
     actions = ['approve_leaves', 'reject_leaves']
     
     def approve_leaves(self, request, queryset):
-        queryset.update(status='APPROVED', approved_by=request.user)
-        self.message_user(request, f"{queryset.count()} leave requests approved.")
+        changed = set_leave_status(queryset, 'APPROVED', request.user, from_statuses=None)
+        self.message_user(request, f"{changed} leave requests approved.")
     approve_leaves.short_description = "Approve selected leave requests"
     
     def reject_leaves(self, request, queryset):
-        queryset.update(status='REJECTED', approved_by=request.user)
-        self.message_user(request, f"{queryset.count()} leave requests rejected.")
+        changed = set_leave_status(queryset, 'REJECTED', request.user, from_statuses=None)
+        self.message_user(request, f"{changed} leave requests rejected.")
     reject_leaves.short_description = "Reject selected leave requests"
 
 
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    """Leave ledger admin (maintained by accrue_leave and reconcile_leave_balances)"""
+    list_display = ['user', 'leave_type', 'year', 'accrued', 'used', 'accrued_through']
+    list_filter = ['year', 'leave_type']
+    search_fields = ['user__employee_id', 'user__first_name', 'user__last_name']
+    list_select_related = ['user']
+    readonly_fields = ['accrued_through', 'updated_at']
+
+
 @admin.register(Payroll)
 class PayrollAdmin(admin.ModelAdmin):
     """Payroll admin"""
@@ -72,3 +126,39 @@ class PayrollAdmin(admin.ModelAdmin):
     search_fields = ['user__employee_id', 'user__first_name', 'user__last_name']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'effective_date'
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    """Payroll run admin (runs are created with run_payroll)"""
+    list_display = ['month', 'payslip_count', 'total_gross', 'total_net', 'created_by', 'created_at']
+    date_hierarchy = 'month'
+    readonly_fields = ['month', 'created_by', 'payslip_count', 'total_gross', 'total_net', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Payslip)
+class PayslipAdmin(admin.ModelAdmin):
+    """Payslip admin (read-only, payslips are immutable)"""
+    list_display = ['user', 'month', 'working_days', 'loss_of_pay_days', 'gross_salary', 'total_deductions', 'net_salary']
+    list_filter = ['month']
+    search_fields = ['user__employee_id', 'user__first_name', 'user__last_name']
+    list_select_related = ['user']
+    date_hierarchy = 'month'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Outbound email queue admin"""
+    list_display = ['to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['to', 'subject']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
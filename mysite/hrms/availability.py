@@ -0,0 +1,66 @@
+import math
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from .models import LeaveRequest, Profile
+from .rollups import UNASSIGNED_DEPARTMENT
+
+
+# Leaves that block the dates they cover for their owner
+ACTIVE_LEAVE_STATUSES = ('PENDING', 'APPROVED')
+
+
+def overlapping_leaves(user, start, end, exclude_pk=None):
+    """
+    The user's pending or approved leaves that share a day with start..end.
+
+    Two inclusive ranges overlap when each starts before the other ends;
+    with the user and status fixed that is a range scan on
+    hrms_leave_user_interval_idx.
+    """
+    leaves = LeaveRequest.objects.filter(
+        user=user, status__in=ACTIVE_LEAVE_STATUSES, start_date__lte=end, end_date__gte=start,
+    )
+    if exclude_pk is not None:
+        leaves = leaves.exclude(pk=exclude_pk)
+    return leaves.order_by('start_date')
+
+
+def people_out_by_day(department, start, end, exclude_user=None):
+    """{date: number of people in `department` on approved leave} for start..end"""
+    leaves = LeaveRequest.objects.filter(
+        user__profile__department=department,
+        status='APPROVED', start_date__lte=end, end_date__gte=start,
+    ).order_by()
+    if exclude_user is not None:
+        leaves = leaves.exclude(user=exclude_user)
+
+    out = {}
+    for user_id, leave_start, leave_end in leaves.values_list('user_id', 'start_date', 'end_date'):
+        day = max(leave_start, start)
+        while day <= min(leave_end, end):
+            out.setdefault(day, set()).add(user_id)
+            day += timedelta(days=1)
+    return Counter({day: len(users) for day, users in out.items()})
+
+
+def department_capacity(department):
+    """How many people in `department` may be on leave on one day, or None for no limit"""
+    share = getattr(settings, 'HRMS_DEPARTMENT_LEAVE_CAPACITY', None)
+    if share is None or not department or department == UNASSIGNED_DEPARTMENT:
+        return None
+    headcount = Profile.objects.filter(department=department, user__is_active=True).count()
+    return max(1, math.floor(headcount * share))
+
+
+def capacity_conflicts(user, start, end):
+    """
+    Days in start..end on which one more absence from the user's department
+    would exceed its capacity, as [(date, people_out, capacity)].
+    """
+    department = Profile.objects.filter(user=user).values_list('department', flat=True).first()
+    capacity = department_capacity(department)
+    if capacity is None:
+        return []
+    out = people_out_by_day(department, start, end, exclude_user=user)
+    return [(day, count, capacity) for day, count in sorted(out.items()) if count + 1 > capacity]
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def get_user_cache():
+    return caches[getattr(settings, 'HRMS_USER_CACHE', 'default')]
+
+
+def _user_key(user_id):
+    return f'hrms:auth-user:{user_id}'
+
+
+def invalidate_cached_user(*user_ids):
+    """Drop cached users after writes that bypass post_save (queryset.update())"""
+    get_user_cache().delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+class CachedUserBackend(ModelBackend):
+    """
+    ModelBackend that loads the signed-in user from the cache.
+
+    AuthenticationMiddleware resolves request.user on every request; with
+    this backend that is a cache hit instead of a SELECT. The entry is
+    dropped whenever the user is saved or deleted (see signals.py), so role,
+    active-flag and password changes take effect on the next request.
+    """
+
+    def get_user(self, user_id):
+        cache = get_user_cache()
+        key = _user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, timeout=getattr(settings, 'HRMS_USER_CACHE_TIMEOUT', 3600))
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,226 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Value, When
+from django.utils import timezone
+from .caching import ADMIN_DASHBOARD, bump_all_dashboards, bump_dashboard_version
+from .models import CustomUser, LeaveRequest, LeaveBalance
+from .rollups import month_spans, mark_calendar_leaves, rebuild_calendar
+
+
+CENT = Decimal('0.01')
+
+DEFAULT_ENTITLEMENTS = {'PAID': 18, 'SICK': 12, 'CASUAL': 6}
+
+
+def get_entitlements():
+    """Yearly entitlement in days per leave type"""
+    return getattr(settings, 'HRMS_LEAVE_ENTITLEMENTS', DEFAULT_ENTITLEMENTS)
+
+
+def leave_days_by_year(start, end):
+    """Split an inclusive date range into {year: days}"""
+    days = {}
+    for year in range(start.year, end.year + 1):
+        first = max(start, date(year, 1, 1))
+        last = min(end, date(year, 12, 31))
+        days[year] = (last - first).days + 1
+    return days
+
+
+def _apply_used_deltas(deltas, batch_size=500):
+    """Add {(user_id, leave_type, year): days} to `used` with a few set-based statements"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    now = timezone.now()
+    # Rows that do not exist yet start at zero; a negative delta for a missing
+    # row is drift that reconcile_leave_balances repairs
+    LeaveBalance.objects.bulk_create(
+        [
+            LeaveBalance(user_id=user_id, leave_type=leave_type, year=year)
+            for (user_id, leave_type, year), delta in deltas.items() if delta > 0
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    balance_ids = {}
+    for pk, user_id, leave_type, year in LeaveBalance.objects.filter(
+        user_id__in={key[0] for key in deltas}, year__in={key[2] for key in deltas},
+    ).values_list('pk', 'user_id', 'leave_type', 'year'):
+        if (user_id, leave_type, year) in deltas:
+            balance_ids[pk] = deltas[(user_id, leave_type, year)]
+
+    pks = list(balance_ids)
+    for start in range(0, len(pks), batch_size):
+        chunk = pks[start:start + batch_size]
+        LeaveBalance.objects.filter(pk__in=chunk).update(
+            used=F('used') + Case(
+                *[When(pk=pk, then=Value(balance_ids[pk])) for pk in chunk],
+                output_field=DecimalField(max_digits=6, decimal_places=2),
+            ),
+            updated_at=now,
+        )
+
+
+def set_leave_status(leaves, status, approved_by, comment=None, from_statuses=('PENDING',)):
+    """
+    Move the leave requests in `leaves` to `status` and keep LeaveBalance in step.
+
+    Only requests currently in one of `from_statuses` change (pass None to
+    allow any other status). Each source status is one conditional UPDATE,
+    so a request decided concurrently by someone else is not touched, and
+    the return value is the exact number of requests changed. Days move
+    into `used` when a request becomes APPROVED and back out when an
+    approved one is rejected or reopened, split by calendar year.
+    """
+    # Transitions that move days run first: the read-back below matches on
+    # the stamp, and must not pick up rows a later no-op transition changes
+    from_statuses = sorted(
+        (
+            value for value, _ in LeaveRequest.STATUS_CHOICES
+            if value != status and (from_statuses is None or value in from_statuses)
+        ),
+        key=lambda value: (status == 'APPROVED') == (value == 'APPROVED'),
+    )
+    # Resolve the selection first; `leaves` may filter on the status being changed
+    selected = list(leaves.order_by().values_list('pk', 'user_id'))
+    if not selected:
+        return 0
+    leave_ids = [pk for pk, _ in selected]
+
+    # A fresh timestamp tags the rows this call changed, so they can be read
+    # back without a read-modify-write
+    stamp = timezone.now()
+    values = {'status': status, 'approved_by': approved_by, 'updated_at': stamp}
+    if comment is not None:
+        values['admin_comment'] = comment
+
+    changed = 0
+    counted = set()
+    deltas = defaultdict(int)
+    newly_approved = []
+    withdrawn = defaultdict(set)
+    with transaction.atomic():
+        for old_status in from_statuses:
+            updated = LeaveRequest.objects.filter(pk__in=leave_ids, status=old_status).update(**values)
+            changed += updated
+            sign = (status == 'APPROVED') - (old_status == 'APPROVED')
+            if not updated or not sign:
+                continue
+            for pk, user_id, leave_type, start_date, end_date in LeaveRequest.objects.filter(
+                pk__in=leave_ids, status=status, updated_at=stamp,
+            ).values_list('pk', 'user_id', 'leave_type', 'start_date', 'end_date'):
+                # Rows moved by an earlier statement of this call carry the same stamp
+                if pk in counted:
+                    continue
+                counted.add(pk)
+                for year, days in leave_days_by_year(start_date, end_date).items():
+                    deltas[(user_id, leave_type, year)] += sign * days
+                if sign > 0:
+                    newly_approved.append((user_id, start_date, end_date))
+                else:
+                    for month, _, _ in month_spans(start_date, end_date):
+                        withdrawn[month].add(user_id)
+        _apply_used_deltas(deltas)
+        # Keep the team calendar in step: mark new leave in place, and rebuild
+        # the few months where approved leave was withdrawn
+        mark_calendar_leaves(newly_approved)
+        for month, user_ids in withdrawn.items():
+            rebuild_calendar(month, user_ids)
+
+    if changed:
+        # The admin dashboard counts pending requests
+        bump_dashboard_version(ADMIN_DASHBOARD, *[user_id for _, user_id in selected])
+    return changed
+
+
+def accrue_leave(on_date=None, batch_size=1000):
+    """
+    Accrue every active employee's entitlement for the year up to `on_date`.
+
+    Entitlements accrue evenly over the year from 1 January. `accrued` is
+    set rather than incremented, so running the job twice on the same day,
+    or catching up after a missed night, gives the same result. Missing
+    ledger rows are created first. Returns (rows_created, rows_accrued).
+    """
+    on_date = on_date or timezone.now().date()
+    year = on_date.year
+    days_in_year = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+    elapsed = (on_date - date(year, 1, 1)).days + 1
+    employees = CustomUser.objects.filter(role='EMPLOYEE', is_active=True)
+
+    created = 0
+    accrued = 0
+    with transaction.atomic():
+        for leave_type, _ in LeaveRequest.LEAVE_TYPE_CHOICES:
+            missing = employees.filter(~Exists(LeaveBalance.objects.filter(
+                user=OuterRef('pk'), leave_type=leave_type, year=year,
+            )))
+            last_pk = 0
+            while True:
+                user_ids = list(
+                    missing.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+                )
+                if not user_ids:
+                    break
+                LeaveBalance.objects.bulk_create(
+                    [LeaveBalance(user_id=user_id, leave_type=leave_type, year=year) for user_id in user_ids],
+                    ignore_conflicts=True,
+                )
+                created += len(user_ids)
+                last_pk = user_ids[-1]
+
+        for leave_type, days in get_entitlements().items():
+            amount = (Decimal(days) * elapsed / days_in_year).quantize(CENT, rounding=ROUND_HALF_UP)
+            accrued += LeaveBalance.objects.filter(
+                year=year, leave_type=leave_type, user__in=employees,
+            ).update(accrued=amount, accrued_through=on_date, updated_at=timezone.now())
+
+    bump_all_dashboards()
+    return created, accrued
+
+
+def reconcile_leave_balances(year, fix=True):
+    """
+    Recompute `used` for `year` from approved leave requests.
+
+    Returns a list of (user_id, leave_type, recorded, expected) for every
+    ledger entry that had drifted; with `fix`, those entries are corrected
+    and missing ones created.
+    """
+    expected = defaultdict(int)
+    for user_id, leave_type, start_date, end_date in LeaveRequest.objects.filter(
+        status='APPROVED', start_date__lte=date(year, 12, 31), end_date__gte=date(year, 1, 1),
+    ).values_list('user_id', 'leave_type', 'start_date', 'end_date').iterator(chunk_size=2000):
+        expected[(user_id, leave_type)] += leave_days_by_year(start_date, end_date)[year]
+
+    recorded = {
+        (user_id, leave_type): (pk, used)
+        for pk, user_id, leave_type, used in LeaveBalance.objects.filter(year=year).values_list(
+            'pk', 'user_id', 'leave_type', 'used'
+        ).iterator(chunk_size=2000)
+    }
+
+    drift = []
+    for key in expected.keys() | recorded.keys():
+        used = recorded[key][1] if key in recorded else None
+        if used != expected.get(key, 0):
+            drift.append((key[0], key[1], used, expected.get(key, 0)))
+
+    if fix and drift:
+        with transaction.atomic():
+            to_create = []
+            for user_id, leave_type, used, days in drift:
+                if used is None:
+                    to_create.append(LeaveBalance(user_id=user_id, leave_type=leave_type, year=year, used=days))
+                else:
+                    LeaveBalance.objects.filter(pk=recorded[(user_id, leave_type)][0]).update(
+                        used=days, updated_at=timezone.now()
+                    )
+            LeaveBalance.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+        bump_dashboard_version(*[user_id for user_id, _, _, _ in drift])
+
+    return drift
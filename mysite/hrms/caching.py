@@ -0,0 +1,93 @@
+"""
+Per-user cache for the employee dashboard and profile blocks.
+
+Every user has a version stamp in the cache, and every block key carries
+it, so replacing the stamp retires all of that user's blocks at once
+without deleting anything. A global generation stamp retires everyone's
+blocks after bulk jobs that touch many users. Stamps live in the cache
+itself, so invalidation works across app nodes as long as they share a
+cache backend (HRMS_DASHBOARD_CACHE names the alias in CACHES).
+
+Bumps wait for the surrounding transaction to commit: a bump made before
+the commit would let a concurrent reader cache the old rows under the new
+stamp, where they would stay until the next change.
+"""
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+GENERATION_KEY = 'hrms:dashboard:generation'
+
+# Owner id of the admin dashboard's company-wide counts
+ADMIN_DASHBOARD = 'admin'
+
+# Distinguishes a cached None (say, no attendance yet today) from a miss
+_MISSING = object()
+
+
+def get_dashboard_cache():
+    return caches[getattr(settings, 'HRMS_DASHBOARD_CACHE', 'default')]
+
+
+def _version_key(user_id):
+    return f'hrms:dashboard:version:{user_id}'
+
+
+def _seed(cache, key):
+    """Start a missing stamp and return its value"""
+    # Stamps come from the clock, not a counter from 0: if one is evicted,
+    # blocks cached under its old value must not become current again
+    value = time.time_ns()
+    # add() keeps the stamp another node created in the meantime
+    if cache.add(key, value, timeout=None):
+        return value
+    return cache.get(key, value)
+
+
+def bump_dashboard_version(*user_ids):
+    """Invalidate the cached dashboard blocks of `user_ids` once the current transaction commits"""
+    user_ids = set(user_ids)
+
+    def bump():
+        # Any new value retires the old blocks; a fresh clock stamp per user
+        # is written for all of them in one set_many() round trip
+        stamp = time.time_ns()
+        get_dashboard_cache().set_many({_version_key(user_id): stamp for user_id in user_ids}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def bump_all_dashboards():
+    """Invalidate every user's cached dashboard blocks once the current transaction commits, for bulk jobs"""
+    transaction.on_commit(lambda: get_dashboard_cache().set(GENERATION_KEY, time.time_ns(), timeout=None))
+
+
+def get_dashboard_blocks(user_id, builders):
+    """
+    Return {name: value} for the blocks in `builders`, a {name: callable} dict.
+
+    Blocks are read with one get_many() round trip after the version lookup;
+    only missing blocks are built, and they are stored together.
+    """
+    cache = get_dashboard_cache()
+    counter_keys = [GENERATION_KEY, _version_key(user_id)]
+    counters = cache.get_many(counter_keys)
+    version = '.'.join(
+        str(counters[key] if key in counters else _seed(cache, key)) for key in counter_keys
+    )
+    keys = {name: f'hrms:dashboard:{user_id}:{version}:{name}' for name in builders}
+
+    cached = cache.get_many(list(keys.values()))
+    blocks = {}
+    missing = {}
+    for name, key in keys.items():
+        value = cached.get(key, _MISSING)
+        if value is _MISSING:
+            value = builders[name]()
+            missing[key] = value
+        blocks[name] = value
+    if missing:
+        cache.set_many(missing, timeout=getattr(settings, 'HRMS_DASHBOARD_CACHE_TIMEOUT', 3600))
+    return blocks
@@ -1,7 +1,10 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .models import CustomUser, Profile, LeaveRequest
+from .availability import capacity_conflicts, overlapping_leaves
 import re
 
 
@@ -120,9 +123,30 @@ class ProfileUpdateForm(forms.ModelForm):
                 'placeholder': 'Emergency Contact Number'
             }),
             'profile_picture': forms.FileInput(attrs={
-                'class': 'form-file-input'
+                'class': 'form-file-input',
+                'accept': 'image/*'
             })
         }
+    
+    def clean_profile_picture(self):
+        picture = self.cleaned_data.get('profile_picture')
+        max_bytes = getattr(settings, 'HRMS_PROFILE_PICTURE_MAX_BYTES', 10 * 1024 * 1024)
+        if picture and 'profile_picture' in self.changed_data and picture.size > max_bytes:
+            raise ValidationError(f'Pictures can be at most {max_bytes // (1024 * 1024)} MB.')
+        return picture
+    
+    def save(self, commit=True):
+        profile = super().save(commit=False)
+        # Only the columns this form edits: the picture worker writes
+        # picture_hash and picture_due_at on the same row meanwhile
+        update_fields = [name for name in self.changed_data if name != 'profile_picture']
+        if 'profile_picture' in self.changed_data:
+            # Thumbnails are made off the request by the process_profile_pictures worker
+            profile.picture_due_at = timezone.now()
+            update_fields += ['profile_picture', 'picture_due_at']
+        if commit and update_fields:
+            profile.save(update_fields=update_fields + ['updated_at'])
+        return profile
 
 
 class AdminProfileUpdateForm(forms.ModelForm):
@@ -167,6 +191,11 @@ class LeaveRequestForm(forms.ModelForm):
             })
         }
     
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The requesting employee; overlap and capacity checks are skipped without one
+        self.user = user
+    
     def clean(self):
         cleaned_data = super().clean()
         start_date = cleaned_data.get('start_date')
@@ -175,4 +204,20 @@ class LeaveRequestForm(forms.ModelForm):
         if start_date and end_date and start_date > end_date:
             raise ValidationError('End date must be after start date.')
         
+        if self.user is not None and start_date and end_date:
+            overlap = overlapping_leaves(self.user, start_date, end_date, exclude_pk=self.instance.pk).first()
+            if overlap:
+                raise ValidationError(
+                    f'You already have a {overlap.get_status_display().lower()} leave from '
+                    f'{overlap.start_date:%b %d} to {overlap.end_date:%b %d, %Y}.'
+                )
+            
+            conflicts = capacity_conflicts(self.user, start_date, end_date)
+            if conflicts:
+                day, people_out, capacity = conflicts[0]
+                raise ValidationError(
+                    f'{people_out} people from your department are already on leave on {day:%b %d, %Y} '
+                    f'(at most {capacity} can be away on the same day). Please choose other dates.'
+                )
+        
         return cleaned_data
@@ -0,0 +1,211 @@
+"""
+Opt-in per-view request instrumentation.
+
+Enable with HRMS_INSTRUMENTATION=1 in the environment (see settings.py). For
+every request the middleware records SQL query count and time, repeated
+query signatures (likely N+1s), template render time and total latency.
+It reports them in a Server-Timing header and keeps a rolling window of
+samples per view, which `manage.py dump_request_stats` summarises.
+"""
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+
+_current = contextvars.ContextVar('hrms_request_metrics', default=None)
+
+# Samples of requests that resolved to no view (404s, scanners) share one key
+UNRESOLVED_VIEW = '<unresolved>'
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class RequestMetrics:
+    """Measurements for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.signatures = Counter()
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.query_count += 1
+            # Placeholders keep parameters out of the SQL, so repeats share a signature
+            self.signatures[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Signatures executed more than once, with their counts"""
+        return {sql: count for sql, count in self.signatures.items() if count > 1}
+
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+    wrapper._hrms_timed = True
+    return wrapper
+
+
+def install_template_timer():
+    """Time top-level template renders (idempotent)"""
+    if not getattr(DjangoTemplate.render, '_hrms_timed', False):
+        DjangoTemplate.render = _timed_render(DjangoTemplate.render)
+
+
+class StatsRegistry:
+    """Rolling per-view samples, periodically written to a per-process JSON file"""
+
+    def __init__(self, window=500, flush_interval=5.0):
+        self.window = window
+        self.flush_interval = flush_interval
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def add(self, view_name, total_ms, db_ms, queries, template_ms, duplicates):
+        with self.lock:
+            self.samples[view_name].append((total_ms, db_ms, queries, template_ms, duplicates))
+            # Decided under the lock, so only one request thread flushes
+            now = time.monotonic()
+            due = now - self.last_flush >= self.flush_interval
+            if due:
+                self.last_flush = now
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {view: list(samples) for view, samples in self.samples.items()}
+
+    def flush(self):
+        directory = stats_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'requests-{os.getpid()}.json'
+        # A temporary file of its own, so concurrent flushes never replace each other's
+        with tempfile.NamedTemporaryFile('w', dir=directory, prefix=f'{path.stem}-', suffix='.tmp', delete=False) as handle:
+            handle.write(json.dumps(self.snapshot()))
+        os.replace(handle.name, path)
+
+
+registry = StatsRegistry()
+
+
+def stats_dir():
+    return Path(getattr(settings, 'HRMS_INSTRUMENTATION_DIR', Path(tempfile.gettempdir()) / 'hrms-instrumentation'))
+
+
+def load_stats():
+    """Merge the samples written by every process"""
+    merged = defaultdict(list)
+    for path in sorted(stats_dir().glob('requests-*.json')):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for view, samples in data.items():
+            merged[view].extend(samples)
+    return merged
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def histogram(values):
+    """Counts of `values` per LATENCY_BUCKETS bucket"""
+    counts = [0] * (len(LATENCY_BUCKETS) + 1)
+    for value in values:
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+class QueryInstrumentationMiddleware:
+    """Record query, template and total timings per view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with _wrap_all_connections(metrics.record_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total = metrics.total_time()
+        duplicates = metrics.duplicates
+        repeated = sum(count - 1 for count in duplicates.values())
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.query_time * 1000:.1f};desc="{metrics.query_count} queries"',
+            f'dup;desc="{repeated} repeats of {len(duplicates)} statements"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED_VIEW
+        registry.add(
+            view_name,
+            round(total * 1000, 2),
+            round(metrics.query_time * 1000, 2),
+            metrics.query_count,
+            round(metrics.template_time * 1000, 2),
+            repeated,
+        )
+        return response
+
+
+class _wrap_all_connections:
+    """Install an execute wrapper on every configured database connection"""
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        self.contexts = []
+
+    def __enter__(self):
+        for alias in connections:
+            context = connections[alias].execute_wrapper(self.wrapper)
+            context.__enter__()
+            self.contexts.append(context)
+        return self
+
+    def __exit__(self, *exc_info):
+        while self.contexts:
+            self.contexts.pop().__exit__(*exc_info)
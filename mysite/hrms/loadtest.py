@@ -0,0 +1,236 @@
+"""
+HTTP load generator for the morning check-in peak.
+
+Each virtual employee signs in against a running server and then walks
+the dashboard -> attendance -> check-in -> check-out flow over its own
+keep-alive connection. Used by `manage.py benchmark_checkin`.
+"""
+import http.client
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+from django.utils import timezone
+from .backends import invalidate_cached_user
+from .instrumentation import percentile
+from .middleware import LOCK_CONTENTION_HEADER, LOCK_ERROR_MARKERS
+from .models import CustomUser, Attendance
+from .provisioning import import_employees
+from .rollups import rebuild_attendance_summary
+
+
+BENCH_USERNAME_PREFIX = 'bench'
+BENCH_EMPLOYEE_ID_BASE = 900000
+
+# Flow steps in the order a virtual employee runs them; signin is not part of the timed flow
+FLOW = (
+    ('employee_dashboard', 'GET'),
+    ('attendance_view', 'GET'),
+    ('attendance_checkin', 'POST'),
+    ('attendance_checkout', 'POST'),
+)
+
+# With DEBUG the error page names the database error; without it only the
+# LockContentionMiddleware header tells lock contention apart
+LOCK_MARKERS = tuple(marker.encode() for marker in LOCK_ERROR_MARKERS)
+
+
+def bench_usernames(count):
+    return [f'{BENCH_USERNAME_PREFIX}{index}' for index in range(count)]
+
+
+def provision_bench_employees(count, password):
+    """Create up to `count` benchmark employees sharing one password; returns the number created"""
+    # Hash once and share it; hashing per user would dominate provisioning time
+    hashed = make_password(password)
+    usernames = bench_usernames(count)
+    created, _ = import_employees(
+        (
+            {
+                'employee_id': f'EMP{BENCH_EMPLOYEE_ID_BASE + index}',
+                'username': username,
+                'email': f'{username}@bench.invalid',
+                'first_name': 'Bench',
+                'last_name': str(index),
+                'department': 'Benchmark',
+                'password': password,
+            }
+            for index, username in enumerate(usernames)
+        ),
+        password_hasher=lambda raw: hashed,
+    )
+    # Employees left over from an earlier run may have a different password
+    stale = list(CustomUser.objects.filter(username__in=usernames).exclude(password=hashed).values_list('pk', flat=True))
+    if stale:
+        CustomUser.objects.filter(pk__in=stale).update(password=hashed)
+        invalidate_cached_user(*stale)
+    return created
+
+
+def reset_bench_attendance(count):
+    """Delete today's attendance for the benchmark employees so the flow starts from scratch"""
+    today = timezone.localdate()
+    deleted, _ = Attendance.objects.filter(
+        user__username__in=bench_usernames(count), date=today
+    ).delete()
+    if deleted:
+        rebuild_attendance_summary(date_from=today, date_to=today)
+    return deleted
+
+
+class StepResult:
+    __slots__ = ('step', 'status', 'elapsed', 'error')
+
+    def __init__(self, step, status, elapsed, error=None):
+        self.step = step
+        self.status = status
+        self.elapsed = elapsed
+        self.error = error
+
+
+class VirtualEmployee:
+    """One employee's browser: a keep-alive connection plus session and CSRF cookies"""
+
+    def __init__(self, base_url, username, password, timeout=30):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.prefix = parts.path.rstrip('/')
+        self.host = parts.netloc
+        self.username = username
+        self.password = password
+        self.cookies = {}
+
+    def request(self, method, path, fields=None):
+        """Send one request without following redirects; returns (status, headers, body)"""
+        headers = {'Host': self.host}
+        body = None
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if method == 'POST':
+            fields = dict(fields or {}, csrfmiddlewaretoken=self.cookies.get('csrftoken', ''))
+            body = urlencode(fields)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            # A dropped keep-alive connection is reopened on the next request
+            self.connection.close()
+            raise
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, response.headers, payload
+
+    def timed(self, step, method, path, fields=None):
+        started = time.perf_counter()
+        try:
+            status, headers, payload = self.request(method, path, fields)
+        except (OSError, http.client.HTTPException):
+            return StepResult(step, None, time.perf_counter() - started, 'connection_error')
+        elapsed = time.perf_counter() - started
+        error = None
+        if status >= 500:
+            lowered = payload.lower()
+            if headers.get(LOCK_CONTENTION_HEADER) or any(marker in lowered for marker in LOCK_MARKERS):
+                error = 'lock_contention'
+            else:
+                error = f'http_{status}'
+        elif status >= 400:
+            error = f'http_{status}'
+        return StepResult(step, status, elapsed, error)
+
+    def sign_in(self):
+        path = reverse('signin')
+        self.request('GET', path)
+        result = self.timed('signin', 'POST', path, {'username': self.username, 'password': self.password})
+        # A successful sign-in redirects; re-rendering the form (200) means bad credentials
+        if result.error is None and result.status != 302:
+            result.error = 'signin_rejected'
+        return result
+
+    def run_flow(self):
+        results = [self.sign_in()]
+        if results[0].error is None:
+            for step, method in FLOW:
+                results.append(self.timed(step, method, reverse(step)))
+        self.connection.close()
+        return results
+
+
+def run_checkin_benchmark(base_url, usernames, password, concurrency=50, ramp_up=0.0, timeout=30):
+    """
+    Run the check-in flow once for every username with `concurrency` workers.
+
+    Start times are spread evenly over `ramp_up` seconds. Returns a summary
+    dict with per-step and whole-flow latency percentiles (ms), throughput
+    and error counts by kind.
+    """
+    usernames = list(usernames)
+    interval = ramp_up / len(usernames) if usernames else 0
+    started = time.perf_counter()
+    lock = threading.Lock()
+    by_step = defaultdict(list)
+    flows = []
+    errors = Counter()
+    errors_by_step = defaultdict(Counter)
+
+    def worker(index, username):
+        delay = started + index * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        results = VirtualEmployee(base_url, username, password, timeout=timeout).run_flow()
+        with lock:
+            for result in results:
+                by_step[result.step].append(result.elapsed * 1000)
+                if result.error:
+                    errors[result.error] += 1
+                    errors_by_step[result.step][result.error] += 1
+            if len(results) == len(FLOW) + 1 and not any(result.error for result in results[1:]):
+                flows.append(sum(result.elapsed for result in results[1:]) * 1000)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker, index, name) for index, name in enumerate(usernames)]:
+            future.result()
+
+    duration = time.perf_counter() - started
+    requests = sum(len(samples) for samples in by_step.values())
+    return {
+        'base_url': base_url,
+        'employees': len(usernames),
+        'concurrency': concurrency,
+        'ramp_up_s': ramp_up,
+        'duration_s': round(duration, 3),
+        'requests': requests,
+        'throughput_rps': round(requests / duration, 1) if duration else 0.0,
+        'flows_completed': len(flows),
+        'flows_failed': len(usernames) - len(flows),
+        'flow': latency_summary(flows),
+        'steps': {
+            step: dict(latency_summary(by_step[step]), errors=dict(errors_by_step[step]))
+            for step in ['signin'] + [name for name, _ in FLOW]
+            if by_step[step]
+        },
+        'errors': dict(errors),
+        'lock_contention_errors': errors['lock_contention'],
+    }
+
+
+def latency_summary(samples):
+    if not samples:
+        return {'count': 0}
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 0.50), 2),
+        'p95_ms': round(percentile(samples, 0.95), 2),
+        'p99_ms': round(percentile(samples, 0.99), 2),
+        'max_ms': round(max(samples), 2),
+        'mean_ms': round(sum(samples) / len(samples), 2),
+    }
@@ -0,0 +1,111 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+from .models import OutboundEmail
+
+
+# How long a claimed message is hidden from other workers before it is retried
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """Queue an email for the send_queued_mail worker instead of sending it inline"""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or '',
+        to=','.join(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 1, 2, 4, ... minutes, capped at one hour"""
+    return timedelta(minutes=min(2 ** max(attempts - 1, 0), 60))
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to `batch_size` due messages for this worker.
+
+    One conditional UPDATE pushes next_attempt_at of the due rows forward,
+    so concurrent workers never pick the same row, and a crashed worker's
+    messages become due again after CLAIM_TIMEOUT.
+    """
+    now = timezone.now()
+    claimed_until = now + CLAIM_TIMEOUT
+    due = OutboundEmail.objects.filter(status='PENDING', next_attempt_at__lte=now)
+    due_ids = list(due.order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size])
+    if not due_ids or not due.filter(pk__in=due_ids).update(next_attempt_at=claimed_until):
+        return []
+    # Rows another worker claimed in between did not match the UPDATE
+    return list(OutboundEmail.objects.filter(pk__in=due_ids, next_attempt_at=claimed_until))
+
+
+def _record_failures(emails, exc, max_attempts):
+    # Backoff depends on the attempt count: one UPDATE per distinct count
+    by_attempts = {}
+    for email in emails:
+        by_attempts.setdefault(email.attempts + 1, []).append(email.pk)
+    for attempts, pks in by_attempts.items():
+        OutboundEmail.objects.filter(pk__in=pks).update(
+            attempts=attempts,
+            last_error=str(exc)[:1000],
+            status='FAILED' if attempts >= max_attempts else 'PENDING',
+            next_attempt_at=timezone.now() + retry_delay(attempts),
+        )
+
+
+def send_queued_mail(batch_size=100, max_attempts=5, rate_limit=None, connection=None):
+    """
+    Deliver one batch of queued mail over a single backend connection.
+
+    Messages are handed to the backend with one send_messages() call, or
+    one per second's worth of messages when `rate_limit` caps messages per
+    second. A call that fails reschedules all of its messages with
+    exponential backoff (FAILED after `max_attempts`); the backend may have
+    sent some of them, so delivery is at least once. Returns (sent, failed).
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    connection = connection or get_connection(fail_silently=False)
+    default_from = getattr(settings, 'DEFAULT_FROM_EMAIL', None)
+    chunk_size = max(1, int(rate_limit)) if rate_limit else len(emails)
+    sent = failed = 0
+
+    connection.open()
+    try:
+        for start in range(0, len(emails), chunk_size):
+            started = time.monotonic()
+            chunk = emails[start:start + chunk_size]
+            messages = [
+                EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email or default_from,
+                    to=email.to.split(','),
+                    connection=connection,
+                )
+                for email in chunk
+            ]
+            try:
+                connection.send_messages(messages)
+            except Exception as exc:
+                _record_failures(chunk, exc, max_attempts)
+                failed += len(chunk)
+            else:
+                OutboundEmail.objects.filter(pk__in=[email.pk for email in chunk]).update(
+                    status='SENT', attempts=F('attempts') + 1, sent_at=timezone.now(), last_error='',
+                )
+                sent += len(chunk)
+
+            if rate_limit and start + chunk_size < len(emails):
+                time.sleep(max(0, len(chunk) / rate_limit - (time.monotonic() - started)))
+    finally:
+        connection.close()
+
+    return sent, failed
@@ -0,0 +1,25 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from hrms.balances import accrue_leave
+
+
+class Command(BaseCommand):
+    help = 'Accrue leave entitlements for every active employee up to a date (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Accrue through this date, YYYY-MM-DD (default: today)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Ledger rows per bulk insert')
+
+    def handle(self, *args, **options):
+        try:
+            on_date = datetime.strptime(options['date'], '%Y-%m-%d').date() if options['date'] else None
+        except ValueError:
+            raise CommandError('Date must be in YYYY-MM-DD format')
+
+        started = time.monotonic()
+        created, accrued = accrue_leave(on_date, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Accrued {accrued} leave balance(s), created {created} new ledger row(s) in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,127 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from hrms.loadtest import (
+    bench_usernames, provision_bench_employees, reset_bench_attendance, run_checkin_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate the 9:00 check-in peak against a running server: N employees sign in '
+        'and walk dashboard -> attendance -> check-in -> check-out concurrently. Reports '
+        'p50/p95/p99 latency, throughput and lock-contention errors and saves the results '
+        'as JSON so releases can be compared.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to benchmark')
+        parser.add_argument('--employees', type=int, default=500, help='Number of virtual employees')
+        parser.add_argument('--concurrency', type=int, default=50, help='Employees in flight at once')
+        parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which employees start')
+        parser.add_argument('--password', default='bench-password', help='Password of the benchmark employees')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+        parser.add_argument('--label', default='', help='Release or change being measured')
+        parser.add_argument('--output', help='JSON results file (default: mysite/benchmarks/checkin-<timestamp>.json, git-ignored)')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+        parser.add_argument('--no-setup', action='store_true',
+                            help='Use existing benchmark employees and attendance as they are')
+
+    def handle(self, *args, **options):
+        count = options['employees']
+        if count < 1 or options['concurrency'] < 1:
+            raise CommandError('--employees and --concurrency must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read {options['compare']}: {exc}")
+
+        if not options['no_setup']:
+            created = provision_bench_employees(count, options['password'])
+            cleared = reset_bench_attendance(count)
+            self.stdout.write(
+                f'Prepared {count} benchmark employee(s) ({created} new), cleared {cleared} attendance row(s) for today'
+            )
+
+        self.stdout.write(
+            f"Running {count} check-in flow(s) against {options['base_url']} "
+            f"with concurrency {options['concurrency']}..."
+        )
+        results = run_checkin_benchmark(
+            options['base_url'],
+            bench_usernames(count),
+            options['password'],
+            concurrency=options['concurrency'],
+            ramp_up=options['ramp_up'],
+            timeout=options['timeout'],
+        )
+        results = {
+            'label': options['label'],
+            'recorded_at': timezone.now().isoformat(),
+            'git_revision': self.git_revision(),
+            'python': platform.python_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            **results,
+        }
+
+        output = Path(
+            options['output'] or settings.BASE_DIR / 'benchmarks' / f'checkin-{timezone.now():%Y%m%dT%H%M%S}.json'
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+
+        self.report(results, baseline)
+        self.stdout.write(f'Results written to {output}')
+
+    def report(self, results, baseline):
+        self.stdout.write(
+            f"{results['requests']} request(s) in {results['duration_s']:.2f}s "
+            f"({results['throughput_rps']} req/s), {results['flows_completed']} flow(s) completed, "
+            f"{results['flows_failed']} failed"
+        )
+        self.stdout.write(f"{'step':<22} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  errors")
+        rows = [('flow', results['flow'])] + list(results['steps'].items())
+        for name, stats in rows:
+            if not stats['count']:
+                continue
+            line = (
+                f"{name:<22} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}  "
+                f"{', '.join(f'{kind}={n}' for kind, n in stats.get('errors', {}).items()) or '-'}"
+            )
+            before = self.baseline_stats(baseline, name)
+            if before:
+                change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+                line += f'  (p95 {change:+.0f}% vs {before["p95_ms"]:.1f})'
+            self.stdout.write(line)
+
+        if results['lock_contention_errors']:
+            self.stdout.write(self.style.ERROR(f"{results['lock_contention_errors']} lock-contention error(s)"))
+        elif results['errors']:
+            self.stdout.write(self.style.WARNING(
+                'Errors: ' + ', '.join(f'{kind}={n}' for kind, n in results['errors'].items())
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('No errors'))
+
+    def baseline_stats(self, baseline, name):
+        if not baseline:
+            return None
+        stats = baseline.get('flow') if name == 'flow' else baseline.get('steps', {}).get(name)
+        return stats if stats and stats.get('count') else None
+
+    def git_revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
@@ -0,0 +1,145 @@
+import multiprocessing
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.utils import timezone
+from hrms.loadtest import bench_usernames, latency_summary, provision_bench_employees, reset_bench_attendance
+from hrms.models import Attendance, CustomUser
+from hrms.rollups import check_in, check_out
+from hrms.sqlite import get_pragmas, run_write
+
+
+# SQLite as Django leaves it: rollback journal, full fsync, 5 s lock wait,
+# deferred transactions
+STOCK_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}
+
+MODES = ('stock', 'hardened', 'queued')
+
+
+def configure_mode(mode):
+    """Switch this (forked) worker process to one of MODES"""
+    if mode == 'stock':
+        settings.HRMS_SQLITE_PRAGMAS = STOCK_PRAGMAS
+        settings.DATABASES['default'].setdefault('OPTIONS', {}).pop('transaction_mode', None)
+    settings.HRMS_WRITE_QUEUE = mode == 'queued'
+
+
+def punch_thread(user_ids, day, latencies, errors):
+    """Check every user in, then out again, as one request thread of a worker would"""
+    for punch in (check_in, check_out):
+        for user_id in user_ids:
+            started = time.perf_counter()
+            try:
+                run_write(punch, user_id, day, timezone.now())
+            except OperationalError as exc:
+                errors['locked' if 'locked' in str(exc) else 'operational'] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+    connection.close()
+
+
+def run_worker(mode, user_ids, threads, day, start, results):
+    """One worker process: `threads` request threads sharing the process, like gunicorn gthread"""
+    configure_mode(mode)
+    latencies = []
+    errors = Counter()
+    workers = [
+        threading.Thread(target=punch_thread, args=(user_ids[index::threads], day, latencies, errors))
+        for index in range(threads)
+    ]
+    start.wait()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((latencies, dict(errors)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure sustained check-in/check-out throughput on SQLite with several worker '
+        'processes of several threads each writing at once (the shape of gunicorn gthread '
+        'workers), comparing stock SQLite, the hardened pragmas and the write queue. '
+        'Punches go through the same code as the attendance views, no server needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=800, help='Employees punching in and out')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes')
+        parser.add_argument('--threads', type=int, default=8, help='Request threads per worker')
+        parser.add_argument('--mode', action='append', choices=MODES,
+                            help='Mode to measure; repeat for several (default: all)')
+        parser.add_argument('--password', default='bench-password', help='Password of the benchmark employees')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('benchmark_punches needs a file-based SQLite database')
+        count = options['employees']
+        if count < 1 or options['workers'] < 1 or options['threads'] < 1:
+            raise CommandError('--employees, --workers and --threads must be at least 1')
+
+        provision_bench_employees(count, options['password'])
+        user_ids = list(
+            CustomUser.objects.filter(username__in=bench_usernames(count)).order_by('pk').values_list('pk', flat=True)
+        )
+        day = timezone.localdate()
+
+        self.stdout.write(
+            f"{count} employee(s), {options['workers']} worker(s) x {options['threads']} thread(s), "
+            f"{2 * count} punches per mode"
+        )
+        self.stdout.write(
+            f"{'mode':<10} {'punches/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  errors"
+        )
+        throughput = {}
+        for mode in options['mode'] or MODES:
+            reset_bench_attendance(count)
+            punches, duration, latencies, errors = self.measure(mode, user_ids, day, options)
+            throughput[mode] = punches / duration
+            stats = latency_summary(latencies)
+            self.stdout.write(
+                f"{mode:<10} {throughput[mode]:>10.0f} {stats.get('p50_ms', 0):>9.1f} {stats.get('p95_ms', 0):>9.1f} "
+                f"{stats.get('p99_ms', 0):>9.1f} {stats.get('max_ms', 0):>9.1f}  "
+                f"{', '.join(f'{kind}={n}' for kind, n in errors.items()) or '-'}"
+            )
+            complete = Attendance.objects.filter(user_id__in=user_ids, date=day, check_out_time__isnull=False).count()
+            if complete != count and not errors:
+                raise CommandError(f'{mode}: only {complete} of {count} employees checked out')
+
+        reset_bench_attendance(count)
+        self.stdout.write(f'Pragmas now in effect: {get_pragmas(connection)}')
+        best = max(throughput, key=throughput.get)
+        self.stdout.write(self.style.SUCCESS(f'Best sustained throughput: {best}, {throughput[best]:.0f} punches/s'))
+
+    def measure(self, mode, user_ids, day, options):
+        """Return (punches, seconds, latencies, errors) for one mode"""
+        context = multiprocessing.get_context('fork')
+        start = context.Event()
+        results = context.Queue()
+        # Forked workers must open their own connections
+        connections.close_all()
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(mode, user_ids[index::options['workers']], options['threads'], day, start, results),
+            )
+            for index in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        started = time.perf_counter()
+        start.set()
+
+        latencies = []
+        errors = Counter()
+        for _ in processes:
+            worker_latencies, worker_errors = results.get()
+            latencies.extend(worker_latencies)
+            errors.update(worker_errors)
+        duration = time.perf_counter() - started
+        for process in processes:
+            process.join()
+        return len(latencies), duration, latencies, errors
@@ -0,0 +1,85 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from hrms.instrumentation import RequestMetrics, percentile
+from hrms.loadtest import bench_usernames, provision_bench_employees
+
+
+# Session and user loading before the caches: both read from the database
+DATABASE_MODE = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+}
+
+# What settings.py switches to when HRMS_CACHE_URL names a shared cache
+CACHED_MODE = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['hrms.backends.CachedUserBackend', 'django.contrib.auth.backends.ModelBackend'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the per-request overhead of an authenticated employee request in the '
+        'steady state: queries and latency with database-backed sessions and user loading '
+        'versus cached ones, as enabled by HRMS_CACHE_URL. Runs in-process, no server needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per mode')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per mode to fill the caches')
+        parser.add_argument('--password', default='bench-password', help='Password of the benchmark employee')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        provision_bench_employees(1, options['password'])
+        username = bench_usernames(1)[0]
+
+        if 'locmem' in settings.CACHES['default']['BACKEND']:
+            self.stdout.write(self.style.WARNING(
+                'The default cache is per-process local memory: the cached figures hold for one '
+                'process only. Set HRMS_CACHE_URL to measure against the shared cache.'
+            ))
+        self.stdout.write(f"{'mode':<10} {'queries/request':>16} {'mean ms':>9} {'p95 ms':>9}")
+        results = {}
+        with override_settings(**DATABASE_MODE):
+            results['database'] = self.measure(username, options)
+        with override_settings(**CACHED_MODE):
+            results['cached'] = self.measure(username, options)
+        for mode, (queries, samples) in results.items():
+            self.stdout.write(
+                f'{mode:<10} {queries:>16.2f} {sum(samples) / len(samples):>9.2f} {percentile(samples, 0.95):>9.2f}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Database -> cached sessions and users: {results['database'][0]:.2f} -> "
+            f"{results['cached'][0]:.2f} queries per request"
+        ))
+
+    def measure(self, username, options):
+        """Return (mean queries per request, latencies in ms) for the employee dashboard"""
+        client = Client(HTTP_HOST='localhost')
+        if not client.login(username=username, password=options['password']):
+            raise CommandError(f'Cannot sign in as {username}')
+        url = reverse('employee_dashboard')
+        for _ in range(options['warmup']):
+            client.get(url)
+
+        queries = 0
+        samples = []
+        for _ in range(options['requests']):
+            metrics = RequestMetrics()
+            started = time.perf_counter()
+            with connection.execute_wrapper(metrics.record_query):
+                response = client.get(url)
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+            queries += metrics.query_count
+        client.logout()
+        return queries / options['requests'], samples
@@ -1,45 +1,75 @@
+import time
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from hrms.models import Payroll
-from django.db.models import Count
+
+
+def duplicate_payrolls(queryset):
+    """
+    Payroll rows that are not the most recent one for their user/effective_date.
+
+    A single ROW_NUMBER() OVER (PARTITION BY user, effective_date ORDER BY
+    created_at DESC) query ranks every row; anything ranked after 1 is a loser.
+    """
+    return queryset.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('user_id'), F('effective_date')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        )
+    ).filter(row_number__gt=1)
 
 
 class Command(BaseCommand):
     help = 'Remove duplicate payroll records, keeping only the most recent one per user/effective_date'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without deleting them')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per transaction')
+
     def handle(self, *args, **options):
-        # Find duplicate payroll records (same user and effective_date)
-        duplicates = (
-            Payroll.objects.values('user', 'effective_date')
-            .annotate(count=Count('id'))
-            .filter(count__gt=1)
+        started = time.monotonic()
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        losers = list(
+            duplicate_payrolls(Payroll.objects.all()).values_list(
+                'id', 'user__employee_id', 'effective_date', 'created_at'
+            )
         )
-        
-        total_deleted = 0
-        
-        for dup in duplicates:
-            # Get all payroll records for this user/effective_date combination
-            payrolls = Payroll.objects.filter(
-                user_id=dup['user'],
-                effective_date=dup['effective_date']
-            ).order_by('-created_at')  # Most recent first
-            
-            # Delete all except the most recent one
-            to_delete = payrolls[1:]  # Skip the first (most recent)
-            count = len(to_delete)
-            
-            for payroll in to_delete:
+
+        if not losers:
+            self.stdout.write(self.style.SUCCESS('No duplicate payroll records found'))
+            return
+
+        groups = {(employee_id, effective_date) for _, employee_id, effective_date, _ in losers}
+        if options['verbosity'] > 1:
+            for payroll_id, employee_id, effective_date, created_at in losers:
                 self.stdout.write(
-                    f"Deleting payroll ID {payroll.id} for user {payroll.user.employee_id} "
-                    f"(effective_date: {payroll.effective_date}, created: {payroll.created_at})"
-                )
-                payroll.delete()
-                total_deleted += 1
-        
-        if total_deleted > 0:
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully deleted {total_deleted} duplicate payroll record(s)'
+                    f"{'Would delete' if dry_run else 'Deleting'} payroll ID {payroll_id} for user {employee_id} "
+                    f"(effective_date: {effective_date}, created: {created_at})"
                 )
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'Dry run: {len(losers)} duplicate payroll record(s) in {len(groups)} group(s) would be deleted'
+            ))
+            return
+
+        deleted = 0
+        ids = [row[0] for row in losers]
+        for start in range(0, len(ids), batch_size):
+            with transaction.atomic():
+                _, per_model = Payroll.objects.filter(id__in=ids[start:start + batch_size]).delete()
+            deleted += per_model.get(Payroll._meta.label, 0)
+            self.stdout.write(f'  deleted {deleted}/{len(ids)}')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully deleted {deleted} duplicate payroll record(s) '
+                f'from {len(groups)} group(s) in {elapsed:.2f}s'
             )
-        else:
-            self.stdout.write(self.style.SUCCESS('No duplicate payroll records found'))
+        )
@@ -0,0 +1,56 @@
+import json
+from django.core.management.base import BaseCommand
+from hrms.instrumentation import LATENCY_BUCKETS, histogram, load_stats, percentile, stats_dir
+
+
+class Command(BaseCommand):
+    help = 'Summarise per-view latency and query stats recorded by QueryInstrumentationMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+        parser.add_argument('--histogram', action='store_true', help='Include latency histogram buckets')
+        parser.add_argument('--reset', action='store_true', help='Delete the recorded samples after printing')
+
+    def handle(self, *args, **options):
+        summary = []
+        for view, samples in sorted(load_stats().items()):
+            totals = [sample[0] for sample in samples]
+            queries = [sample[2] for sample in samples]
+            summary.append({
+                'view': view,
+                'requests': len(samples),
+                'p50_ms': percentile(totals, 0.50),
+                'p95_ms': percentile(totals, 0.95),
+                'p99_ms': percentile(totals, 0.99),
+                'avg_db_ms': round(sum(sample[1] for sample in samples) / len(samples), 2),
+                'avg_template_ms': round(sum(sample[3] for sample in samples) / len(samples), 2),
+                'avg_queries': round(sum(queries) / len(samples), 1),
+                'max_queries': max(queries),
+                'max_repeated_queries': max(sample[4] for sample in samples),
+                'histogram': dict(zip(
+                    [f'<={bound}ms' for bound in LATENCY_BUCKETS] + [f'>{LATENCY_BUCKETS[-1]}ms'],
+                    histogram(totals),
+                )),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+        elif not summary:
+            self.stdout.write(self.style.WARNING('No samples recorded yet (is HRMS_INSTRUMENTATION enabled?)'))
+        else:
+            self.stdout.write(
+                f"{'view':<32} {'reqs':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'db':>8} {'tpl':>8} "
+                f"{'queries':>8} {'max q':>6} {'dup':>5}"
+            )
+            for row in summary:
+                self.stdout.write(
+                    f"{row['view'][:32]:<32} {row['requests']:>6} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                    f"{row['p99_ms']:>8.1f} {row['avg_db_ms']:>8.1f} {row['avg_template_ms']:>8.1f} "
+                    f"{row['avg_queries']:>8} {row['max_queries']:>6} {row['max_repeated_queries']:>5}"
+                )
+                if options['histogram']:
+                    self.stdout.write('    ' + '  '.join(f'{bucket}: {count}' for bucket, count in row['histogram'].items()))
+
+        if options['reset']:
+            for path in stats_dir().glob('requests-*.json'):
+                path.unlink()
@@ -1,33 +1,36 @@
-from django.core.management.base import BaseCommand
-from hrms.models import CustomUser, Profile, Payroll
+import time
+from datetime import datetime, time as dt_time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from hrms.models import CustomUser
+from hrms.provisioning import create_missing_profiles, create_missing_payrolls
 
 
 class Command(BaseCommand):
     help = 'Create missing Profile and Payroll records for existing users'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only check users who joined on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
     def handle(self, *args, **options):
-        users_fixed = 0
-        
-        for user in CustomUser.objects.all():
-            # Create Profile if missing
-            if not hasattr(user, 'profile'):
-                Profile.objects.create(
-                    user=user,
-                    designation='Not Assigned',
-                    department='Not Assigned'
-                )
-                self.stdout.write(self.style.SUCCESS(f'Created Profile for {user.username}'))
-                users_fixed += 1
-            
-            # Create Payroll if missing
-            if not Payroll.objects.filter(user=user).exists():
-                Payroll.objects.create(
-                    user=user,
-                    basic_salary=0.00
-                )
-                self.stdout.write(self.style.SUCCESS(f'Created Payroll for {user.username}'))
-        
-        if users_fixed > 0:
-            self.stdout.write(self.style.SUCCESS(f'\nFixed {users_fixed} users!'))
+        started = time.monotonic()
+        users = CustomUser.objects.all()
+
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+            users = users.filter(date_joined__gte=timezone.make_aware(datetime.combine(since, dt_time.min)))
+
+        profiles_created = create_missing_profiles(users, batch_size=options['batch_size'])
+        payrolls_created = create_missing_payrolls(users, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+
+        if profiles_created or payrolls_created:
+            self.stdout.write(self.style.SUCCESS(
+                f'Created {profiles_created} Profile(s) and {payrolls_created} Payroll(s) in {elapsed:.2f}s'
+            ))
         else:
-            self.stdout.write(self.style.SUCCESS('All users already have profiles!'))
+            self.stdout.write(self.style.SUCCESS(f'All users already have profiles! ({elapsed:.2f}s)'))
@@ -0,0 +1,187 @@
+import csv
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from hrms.caching import bump_all_dashboards
+from hrms.models import CustomUser, Attendance
+from hrms.rollups import month_spans, rebuild_attendance_summary, rebuild_calendar
+
+
+# Unknown employee IDs kept to show in the report; the rest are only counted
+UNKNOWN_SAMPLE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Import badge reader check-in/check-out events from a CSV or JSONL file. '
+        'Each record needs employee_id and timestamp (ISO 8601); an optional event '
+        'column (IN/OUT) marks the punch direction, otherwise the first punch of the '
+        'day is the check-in and the last one the check-out.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from file extension)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Attendance rows per bulk upsert')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+
+        self.events_read = 0
+        self.rows_written = 0
+        self.skipped = 0
+        self.unknown_rows = 0
+        self.unknown_sample = set()
+        self.started = time.monotonic()
+        date_range = [None, None]
+
+        # (employee_id, date) -> [check_in_time, check_out_time]; flushed every batch_size keys
+        pending = {}
+
+        try:
+            with open(path, newline='', encoding='utf-8') as handle:
+                records = self.read_jsonl(handle) if fmt == 'jsonl' else csv.DictReader(handle)
+                for record in records:
+                    self.events_read += 1
+                    punch = self.parse_record(record)
+                    if punch is None:
+                        self.skipped += 1
+                        continue
+
+                    employee_id, timestamp, event = punch
+                    day = timezone.localtime(timestamp).date()
+                    date_range[0] = min(date_range[0] or day, day)
+                    date_range[1] = max(date_range[1] or day, day)
+
+                    times = pending.setdefault((employee_id, day), [None, None])
+                    if event != 'OUT':
+                        times[0] = min(times[0] or timestamp, timestamp)
+                    if event != 'IN':
+                        times[1] = max(times[1] or timestamp, timestamp)
+
+                    if len(pending) >= batch_size:
+                        self.flush(pending)
+                        pending = {}
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+
+        if pending:
+            self.flush(pending)
+
+        # Statuses changed in bulk, so recompute the dashboard rollup and team
+        # calendars for the affected dates, and drop cached employee dashboards
+        if date_range[0]:
+            rebuild_attendance_summary(date_from=date_range[0], date_to=date_range[1])
+            for month, _, _ in month_spans(date_range[0], date_range[1]):
+                rebuild_calendar(month)
+            bump_all_dashboards()
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.events_read} event(s) into {self.rows_written} attendance row(s) '
+            f'in {elapsed:.1f}s ({self.events_read / max(elapsed, 1e-6):.0f} rows/s)'
+        ))
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {self.skipped} malformed event(s)'))
+        if self.unknown_rows:
+            sample = ', '.join(sorted(self.unknown_sample))
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {self.unknown_rows} attendance day(s) of unknown employee IDs, e.g. {sample}'
+            ))
+
+    def read_jsonl(self, handle):
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield {}
+
+    def parse_record(self, record):
+        """Return (employee_id, aware timestamp, event) or None if the record is unusable"""
+        employee_id = (record.get('employee_id') or '').strip()
+        raw_timestamp = (record.get('timestamp') or '').strip()
+        event = (record.get('event') or '').strip().upper()
+        if not employee_id or not raw_timestamp or event not in ('', 'IN', 'OUT'):
+            return None
+        try:
+            timestamp = datetime.fromisoformat(raw_timestamp)
+        except ValueError:
+            return None
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        return employee_id, timestamp, event
+
+    def flush(self, pending):
+        """Merge one batch with existing rows and upsert it in a single statement"""
+        user_ids = dict(
+            CustomUser.objects.filter(employee_id__in={key[0] for key in pending})
+            .values_list('employee_id', 'id')
+        )
+
+        # Punches for a (user, date) may span batches, so widen with what is already stored
+        existing = {
+            (row['user_id'], row['date']): (row['check_in_time'], row['check_out_time'])
+            for row in Attendance.objects.filter(
+                user_id__in=user_ids.values(),
+                date__range=(min(key[1] for key in pending), max(key[1] for key in pending)),
+            ).values('user_id', 'date', 'check_in_time', 'check_out_time')
+        }
+
+        rows = []
+        for (employee_id, day), (check_in, check_out) in pending.items():
+            user_id = user_ids.get(employee_id)
+            if user_id is None:
+                self.unknown_rows += 1
+                if len(self.unknown_sample) < UNKNOWN_SAMPLE_SIZE:
+                    self.unknown_sample.add(employee_id)
+                continue
+
+            stored_in, stored_out = existing.get((user_id, day), (None, None))
+            check_in = min(filter(None, (check_in, stored_in)), default=None)
+            check_out = max(filter(None, (check_out, stored_out)), default=None)
+            if check_out and check_in and check_out <= check_in:
+                check_out = None
+
+            rows.append(Attendance(
+                user_id=user_id,
+                date=day,
+                check_in_time=check_in,
+                check_out_time=check_out,
+                **self.hours_and_status(check_in, check_out),
+            ))
+
+        with transaction.atomic():
+            Attendance.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'date'],
+                update_fields=['check_in_time', 'check_out_time', 'total_hours', 'status'],
+            )
+
+        self.rows_written += len(rows)
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f'  {self.events_read} events read, {self.rows_written} rows upserted '
+            f'({self.events_read / max(elapsed, 1e-6):.0f} rows/s)'
+        )
+
+    def hours_and_status(self, check_in, check_out):
+        """Same rules as Attendance.calculate_total_hours, without a save per row"""
+        if check_in and check_out:
+            hours = (check_out - check_in).total_seconds() / 3600
+            return {
+                'total_hours': Decimal(str(round(hours, 2))),
+                'status': Attendance.status_for_hours(hours),
+            }
+        if check_in:
+            return {'total_hours': Decimal('0.00'), 'status': 'PRESENT'}
+        return {'total_hours': Decimal('0.00'), 'status': 'ABSENT'}
@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from hrms.pictures import process_profile_pictures
+
+
+class Command(BaseCommand):
+    help = 'Turn queued profile picture uploads into metadata-free WebP/JPEG thumbnails under content-hashed names'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Pictures claimed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total_processed = total_failed = 0
+
+        while True:
+            processed, failed = process_profile_pictures(batch_size=options['batch_size'])
+            total_processed += processed
+            total_failed += failed
+            if processed or failed:
+                self.stdout.write(f'  processed {processed}, discarded {failed}')
+
+            if not (processed or failed):
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {total_processed} picture(s), discarded {total_failed} unreadable upload(s) '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from hrms.models import VerificationToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and used email verification tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=7, help='Keep used/expired tokens this many days for auditing')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['keep_days'])
+        deleted, _ = VerificationToken.objects.filter(
+            Q(expires_at__lt=cutoff) | Q(used_at__lt=cutoff)
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} verification token(s)'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from hrms.rollups import rebuild_attendance_summary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyAttendanceSummary rollup from Attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        created = rebuild_attendance_summary(
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} attendance summary row(s)'))
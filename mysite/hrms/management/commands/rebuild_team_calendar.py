@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from hrms.payroll import parse_month
+from hrms.rollups import rebuild_calendar
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user AttendanceCalendar rows for a month from Attendance and approved leave'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to rebuild, YYYY-MM (default: current month)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        try:
+            month = parse_month(options['month']) if options['month'] else timezone.now().date().replace(day=1)
+        except ValueError:
+            raise CommandError('Month must be in YYYY-MM format')
+
+        started = time.monotonic()
+        written = rebuild_calendar(month, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {written} calendar row(s) for {month:%B %Y} in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from hrms.balances import reconcile_leave_balances
+
+
+class Command(BaseCommand):
+    help = 'Recompute used leave days from approved requests and fix ledger drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Year to reconcile (default: current year)')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        year = options['year'] or timezone.now().year
+        started = time.monotonic()
+        drift = reconcile_leave_balances(year, fix=not options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        if options['verbosity'] > 1:
+            for user_id, leave_type, recorded, expected in drift:
+                self.stdout.write(f'  user {user_id} {leave_type}: recorded {recorded}, expected {expected}')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS(f'Leave balances for {year} are consistent ({elapsed:.2f}s)'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run: {len(drift)} leave balance(s) for {year} have drifted'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {len(drift)} leave balance(s) for {year} in {elapsed:.2f}s'
+            ))
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from hrms.payroll import parse_month, run_payroll
+
+
+class Command(BaseCommand):
+    help = 'Issue payslips for every active employee for a month (YYYY-MM)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', help='Month to pay, e.g. 2026-01')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Payslips per bulk insert')
+
+    def handle(self, *args, **options):
+        try:
+            month = parse_month(options['month'])
+        except ValueError:
+            raise CommandError('Month must be in YYYY-MM format')
+
+        started = time.monotonic()
+        run = run_payroll(month, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+
+        if run.payslip_count:
+            self.stdout.write(self.style.SUCCESS(
+                f'Issued {run.payslip_count} payslip(s) for {month:%B %Y} in {elapsed:.2f}s '
+                f'(gross ₹{run.total_gross}, net ₹{run.total_net})'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'No new payslips to issue for {month:%B %Y}'))
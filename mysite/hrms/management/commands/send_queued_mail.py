@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from hrms.mailqueue import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound email over one reused backend connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages claimed per batch')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before a message is marked FAILED')
+        parser.add_argument('--rate', type=float, help='Maximum messages per second')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+
+        while True:
+            try:
+                sent, failed = send_queued_mail(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    rate_limit=options['rate'],
+                )
+            except OSError as exc:
+                # The mail server is unreachable; claimed messages become due again later
+                self.stderr.write(self.style.ERROR(f'Could not connect to the mail server: {exc}'))
+                sent = failed = 0
+                if not options['loop']:
+                    break
+
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'  sent {sent}, failed {failed}')
+
+            if not (sent or failed):
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {total_sent} email(s), {total_failed} failed attempt(s)'))
@@ -0,0 +1,37 @@
+import logging
+from django.db import DatabaseError
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+# Database error messages that mean a lock could not be taken in time
+LOCK_ERROR_MARKERS = ('database is locked', 'deadlock detected', 'could not serialize access', 'lock wait timeout')
+
+# Set on the 503 so clients and load tests can tell lock contention from other failures
+LOCK_CONTENTION_HEADER = 'X-Lock-Contention'
+
+
+def is_lock_error(exception):
+    return isinstance(exception, DatabaseError) and any(
+        marker in str(exception).lower() for marker in LOCK_ERROR_MARKERS
+    )
+
+
+class LockContentionMiddleware:
+    """Answer requests that lost a database lock with 503 and Retry-After instead of a bare 500"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not is_lock_error(exception):
+            return None
+        logger.warning('Database lock contention on %s %s: %s', request.method, request.path, exception)
+        response = HttpResponse('The server is busy, please try again.', status=503, content_type='text/plain')
+        response['Retry-After'] = '1'
+        response[LOCK_CONTENTION_HEADER] = '1'
+        return response
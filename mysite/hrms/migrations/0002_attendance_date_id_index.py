@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='payroll',
+            options={'ordering': ['-effective_date', '-created_at'], 'verbose_name': 'Payroll', 'verbose_name_plural': 'Payroll Records'},
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='role',
+            field=models.CharField(choices=[('EMPLOYEE', 'Employee')], default='EMPLOYEE', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='hrms_attendance_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+from django.db import migrations, models
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summary(apps, schema_editor):
+    """Count existing attendance, so the dashboard is right from the first request after deploying"""
+    Attendance = apps.get_model('hrms', 'Attendance')
+    DailyAttendanceSummary = apps.get_model('hrms', 'DailyAttendanceSummary')
+    # Same grouping as hrms.rollups.rebuild_attendance_summary
+    aggregated = (
+        Attendance.objects.order_by()
+        .values('date', 'status', dept=Coalesce(F('user__profile__department'), Value('Not Assigned')))
+        .annotate(total=Count('id'))
+    )
+    DailyAttendanceSummary.objects.bulk_create(
+        (
+            DailyAttendanceSummary(date=row['date'], department=row['dept'], status=row['status'], count=row['total'])
+            for row in aggregated.iterator(chunk_size=1000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0002_attendance_date_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('department', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('PRESENT', 'Present'), ('ABSENT', 'Absent'), ('HALF_DAY', 'Half Day')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily Attendance Summary',
+                'verbose_name_plural': 'Daily Attendance Summaries',
+                'ordering': ['-date', 'department', 'status'],
+                'unique_together': {('date', 'department', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
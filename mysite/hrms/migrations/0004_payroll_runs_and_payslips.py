@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0003_daily_attendance_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month that was paid')),
+                ('payslip_count', models.PositiveIntegerField(default=0)),
+                ('total_gross', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('total_net', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Payroll Run',
+                'verbose_name_plural': 'Payroll Runs',
+                'ordering': ['-month', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Payslip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('working_days', models.PositiveSmallIntegerField()),
+                ('loss_of_pay_days', models.DecimalField(decimal_places=1, default=0, max_digits=4)),
+                ('basic_salary', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('gross_salary', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_deductions', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('net_salary', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payroll', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payslips', to='hrms.payroll')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payslips', to='hrms.payrollrun')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payslips', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Payslip',
+                'verbose_name_plural': 'Payslips',
+                'ordering': ['-month', 'user'],
+                'indexes': [models.Index(fields=['month'], name='hrms_payslip_month_idx')],
+                'unique_together': {('user', 'month')},
+            },
+        ),
+    ]
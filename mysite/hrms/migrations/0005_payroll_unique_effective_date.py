@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:45
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+
+logger = logging.getLogger(__name__)
+
+
+def delete_duplicate_payrolls(apps, schema_editor):
+    """Keep the newest payroll per user/effective_date so the constraint can be added"""
+    Payroll = apps.get_model('hrms', 'Payroll')
+    losers = list(
+        Payroll.objects.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('user_id'), F('effective_date')],
+                order_by=[F('created_at').desc(), F('id').desc()],
+            )
+        ).filter(row_number__gt=1).values_list('id', 'user_id', 'effective_date', 'created_at')
+    )
+    if not losers:
+        return
+    # Say exactly what goes; `manage.py cleanup_payroll_duplicates --dry-run`
+    # lists the same rows before upgrading
+    logger.warning(
+        'Deleting %d duplicate payroll row(s) to add hrms_payroll_unique_user_effective_date', len(losers)
+    )
+    for payroll_id, user_id, effective_date, created_at in losers:
+        logger.warning(
+            'Deleting payroll %s (user %s, effective_date %s, created %s)',
+            payroll_id, user_id, effective_date, created_at,
+        )
+    ids = [row[0] for row in losers]
+    for start in range(0, len(ids), 1000):
+        Payroll.objects.filter(id__in=ids[start:start + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0004_payroll_runs_and_payslips'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_payrolls, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payroll',
+            constraint=models.UniqueConstraint(fields=('user', 'effective_date'), name='hrms_payroll_unique_user_effective_date'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:48
+
+import hashlib
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_pending_tokens(apps, schema_editor):
+    """Move outstanding plain-text tokens into the hashed store so sent links keep working"""
+    CustomUser = apps.get_model('hrms', 'CustomUser')
+    VerificationToken = apps.get_model('hrms', 'VerificationToken')
+    expires_at = timezone.now() + timedelta(hours=48)
+    VerificationToken.objects.bulk_create([
+        VerificationToken(
+            user_id=user_id,
+            digest=hashlib.sha256(token.encode()).hexdigest(),
+            expires_at=expires_at,
+        )
+        for user_id, token in CustomUser.objects.exclude(verification_token='').values_list('id', 'verification_token')
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0006_outbound_email_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('used_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verification_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Verification Token',
+                'verbose_name_plural': 'Verification Tokens',
+            },
+        ),
+        migrations.RunPython(copy_pending_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='verification_token',
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:59
+
+from collections import defaultdict
+from datetime import date
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_used_days(apps, schema_editor):
+    """Seed the ledger's used days from already-approved leave requests"""
+    LeaveRequest = apps.get_model('hrms', 'LeaveRequest')
+    LeaveBalance = apps.get_model('hrms', 'LeaveBalance')
+    used = defaultdict(int)
+    for user_id, leave_type, start, end in LeaveRequest.objects.filter(status='APPROVED').values_list(
+        'user_id', 'leave_type', 'start_date', 'end_date'
+    ).iterator(chunk_size=2000):
+        for year in range(start.year, end.year + 1):
+            days = (min(end, date(year, 12, 31)) - max(start, date(year, 1, 1))).days + 1
+            used[(user_id, leave_type, year)] += days
+    LeaveBalance.objects.bulk_create([
+        LeaveBalance(user_id=user_id, leave_type=leave_type, year=year, used=days)
+        for (user_id, leave_type, year), days in used.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0007_verification_token_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('PAID', 'Paid Leave'), ('SICK', 'Sick Leave'), ('UNPAID', 'Unpaid Leave'), ('CASUAL', 'Casual Leave')], max_length=10)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('accrued', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('used', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('accrued_through', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leave Balance',
+                'verbose_name_plural': 'Leave Balances',
+                'ordering': ['-year', 'leave_type'],
+                'unique_together': {('user', 'leave_type', 'year')},
+            },
+        ),
+        migrations.RunPython(backfill_used_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0008_leave_balance_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['user', 'status', 'start_date', 'end_date'], name='hrms_leave_user_interval_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0009_leave_interval_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('days', models.CharField(max_length=31)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_calendars', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Attendance Calendar',
+                'verbose_name_plural': 'Attendance Calendars',
+                'indexes': [models.Index(fields=['month', 'user'], name='hrms_calendar_month_user_idx')],
+                'unique_together': {('user', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,123 @@
+from django.db import OperationalError, migrations
+
+
+SQLITE_FORWARD = [
+    # Substring matching needs the trigram tokenizer (SQLite 3.34+)
+    """
+    CREATE VIRTUAL TABLE hrms_employee_search USING fts5(
+        employee_id, name, email, department, designation, role UNINDEXED,
+        tokenize = 'trigram'
+    )
+    """,
+    """
+    INSERT INTO hrms_employee_search (rowid, employee_id, name, email, department, designation, role)
+    SELECT u.id, u.employee_id, u.first_name || ' ' || u.last_name, u.email,
+           COALESCE(p.department, ''), COALESCE(p.designation, ''), u.role
+    FROM hrms_customuser u LEFT JOIN hrms_profile p ON p.user_id = u.id
+    """,
+    # Triggers rather than signals, so bulk_create and queryset.update() stay in sync too
+    """
+    CREATE TRIGGER hrms_employee_search_user_insert AFTER INSERT ON hrms_customuser BEGIN
+        INSERT INTO hrms_employee_search (rowid, employee_id, name, email, department, designation, role)
+        VALUES (new.id, new.employee_id, new.first_name || ' ' || new.last_name, new.email, '', '', new.role);
+    END
+    """,
+    """
+    CREATE TRIGGER hrms_employee_search_user_update
+    AFTER UPDATE OF employee_id, first_name, last_name, email, role ON hrms_customuser BEGIN
+        UPDATE hrms_employee_search
+        SET employee_id = new.employee_id, name = new.first_name || ' ' || new.last_name,
+            email = new.email, role = new.role
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER hrms_employee_search_user_delete AFTER DELETE ON hrms_customuser BEGIN
+        DELETE FROM hrms_employee_search WHERE rowid = old.id;
+    END
+    """,
+]
+
+# Kept separate so later migrations can re-create them: SQLite rebuilds a
+# table for most schema changes, and dropping the old table drops its triggers
+SQLITE_PROFILE_TRIGGERS = [
+    """
+    CREATE TRIGGER hrms_employee_search_profile_insert AFTER INSERT ON hrms_profile BEGIN
+        UPDATE hrms_employee_search SET department = new.department, designation = new.designation
+        WHERE rowid = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER hrms_employee_search_profile_update
+    AFTER UPDATE OF department, designation ON hrms_profile BEGIN
+        UPDATE hrms_employee_search SET department = new.department, designation = new.designation
+        WHERE rowid = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER hrms_employee_search_profile_delete AFTER DELETE ON hrms_profile BEGIN
+        UPDATE hrms_employee_search SET department = '', designation = ''
+        WHERE rowid = old.user_id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS hrms_employee_search_profile_delete',
+    'DROP TRIGGER IF EXISTS hrms_employee_search_profile_update',
+    'DROP TRIGGER IF EXISTS hrms_employee_search_profile_insert',
+    'DROP TRIGGER IF EXISTS hrms_employee_search_user_delete',
+    'DROP TRIGGER IF EXISTS hrms_employee_search_user_update',
+    'DROP TRIGGER IF EXISTS hrms_employee_search_user_insert',
+    'DROP TABLE IF EXISTS hrms_employee_search',
+]
+
+# Trigram GIN indexes over the expressions Django's icontains lookup produces
+POSTGRESQL_COLUMNS = [
+    ('hrms_customuser', 'employee_id'),
+    ('hrms_customuser', 'first_name'),
+    ('hrms_customuser', 'last_name'),
+    ('hrms_customuser', 'email'),
+    ('hrms_profile', 'department'),
+    ('hrms_profile', 'designation'),
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_FORWARD[0])
+        except OperationalError:
+            # No FTS5/trigram support: hrms.search falls back to plain lookups
+            return
+        for statement in SQLITE_FORWARD[1:] + SQLITE_PROFILE_TRIGGERS:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for table, column in POSTGRESQL_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} '
+                f'USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        for table, column in POSTGRESQL_COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0010_attendance_calendar'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
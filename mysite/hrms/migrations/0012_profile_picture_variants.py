@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:17
+
+import importlib
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def restore_search_triggers(apps, schema_editor):
+    """Adding the fields rebuilt hrms_profile on SQLite, dropping the search index triggers on it"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if 'hrms_employee_search' not in connection.introspection.table_names(cursor):
+            return
+    search_index = importlib.import_module('hrms.migrations.0011_employee_search_index')
+    for statement in search_index.SQLITE_PROFILE_TRIGGERS:
+        schema_editor.execute(statement.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1))
+
+
+def queue_existing_pictures(apps, schema_editor):
+    """Existing uploads go through the thumbnail worker like new ones"""
+    Profile = apps.get_model('hrms', 'Profile')
+    Profile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True).update(
+        picture_due_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0011_employee_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='picture_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='picture_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(condition=models.Q(('picture_due_at__isnull', False)), fields=['picture_due_at'], name='hrms_profile_picture_due_idx'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(queue_existing_pictures, migrations.RunPython.noop),
+    ]
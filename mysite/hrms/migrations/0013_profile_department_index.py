@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0012_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['department', 'user'], name='hrms_profile_department_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms', '0013_profile_department_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['total_hours', 'id'], name='hrms_attendance_hours_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['status', 'id'], name='hrms_attendance_status_id_idx'),
+        ),
+    ]
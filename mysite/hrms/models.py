@@ -1,8 +1,50 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.sql import UpdateQuery
 from django.utils import timezone
+from django.conf import settings
 from django.core.validators import RegexValidator
+from django.db.models.functions import Round
+from datetime import timedelta
+import calendar
+import hashlib
 import secrets
+from .caching import bump_dashboard_version
+
+
+def update_returning(queryset, fields, **values):
+    """
+    UPDATE the rows of `queryset` with `values`; returns [tuple of `fields`] for the rows changed.
+
+    SQLite (3.35+) and PostgreSQL read the rows back in the same statement
+    with RETURNING. MySQL has no UPDATE ... RETURNING; there the rows are
+    locked, updated and read back by primary key in one transaction.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'mysql' or not connection.features.can_return_columns_from_insert:
+        with transaction.atomic(using=queryset.db):
+            pks = list(queryset.select_for_update().values_list('pk', flat=True))
+            if not pks or not queryset.model._default_manager.filter(pk__in=pks).update(**values):
+                return []
+            return list(queryset.model._default_manager.filter(pk__in=pks).values_list(*fields))
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    compiler = query.get_compiler(queryset.db)
+    compiler.pre_sql_setup()
+    update_sql, params = compiler.as_sql()
+    opts = queryset.model._meta
+    columns = [opts.get_field(name).get_col(opts.db_table) for name in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"{update_sql} RETURNING {', '.join(connection.ops.quote_name(col.target.column) for col in columns)}",
+            params,
+        )
+        rows = cursor.fetchall()
+    converters = compiler.get_converters(columns)
+    if converters:
+        rows = compiler.apply_converters(rows, converters)
+    return [tuple(row) for row in rows]
 
 
 class CustomUser(AbstractUser):
@@ -22,7 +64,6 @@ class CustomUser(AbstractUser):
     )
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='EMPLOYEE')
     email_verified = models.BooleanField(default=False)
-    verification_token = models.CharField(max_length=100, blank=True)
     
     class Meta:
         verbose_name = 'User'
@@ -32,10 +73,58 @@ class CustomUser(AbstractUser):
         return f"{self.employee_id} - {self.get_full_name()}"
     
     def generate_verification_token(self):
-        """Generate a unique verification token"""
-        self.verification_token = secrets.token_urlsafe(32)
-        self.save()
-        return self.verification_token
+        """Issue a single-use email verification token and return its raw value"""
+        return VerificationToken.issue(self)
+
+
+class VerificationToken(models.Model):
+    """
+    Single-use email verification token.
+
+    Only a SHA-256 digest of the token is stored; lookups go through the
+    unique index on it.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='verification_tokens')
+    digest = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    used_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Verification Token'
+        verbose_name_plural = 'Verification Tokens'
+    
+    def __str__(self):
+        return f"{self.user_id} - expires {self.expires_at}"
+    
+    @staticmethod
+    def hash(raw_token):
+        return hashlib.sha256(raw_token.encode()).hexdigest()
+    
+    @classmethod
+    def issue(cls, user):
+        """Store a new token for `user` and return the raw value to email"""
+        raw_token = secrets.token_urlsafe(32)
+        ttl = getattr(settings, 'HRMS_VERIFICATION_TOKEN_TTL', timedelta(hours=48))
+        cls.objects.create(user=user, digest=cls.hash(raw_token), expires_at=timezone.now() + ttl)
+        return raw_token
+    
+    @classmethod
+    def consume(cls, raw_token):
+        """
+        Mark a valid token used and return its user id, or None.
+
+        One conditional UPDATE on the digest both claims the token and
+        returns its user, so the token is single-use even when the link is
+        clicked twice at the same moment.
+        """
+        now = timezone.now()
+        claimed = update_returning(
+            cls.objects.filter(digest=cls.hash(raw_token), used_at__isnull=True, expires_at__gt=now),
+            ['user_id'],
+            used_at=now,
+        )
+        return claimed[0][0] if claimed else None
 
 
 class Profile(models.Model):
@@ -58,14 +147,83 @@ class Profile(models.Model):
     address = models.TextField(blank=True)
     emergency_contact = models.CharField(max_length=15, blank=True)
     
-    # Profile picture
+    # Profile picture: the upload waits here until the process_profile_pictures
+    # worker (hrms.pictures) has turned it into thumbnails named by picture_hash
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    picture_hash = models.CharField(max_length=64, blank=True)
+    picture_due_at = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Department headcount and coverage checks (availability.py) drive
+            # from here into hrms_leave_user_interval_idx, one user at a time
+            models.Index(fields=['department', 'user'], name='hrms_profile_department_idx'),
+            # The picture worker's queue: only profiles with an upload waiting
+            models.Index(
+                fields=['picture_due_at'], name='hrms_profile_picture_due_idx',
+                condition=models.Q(picture_due_at__isnull=False),
+            ),
+        ]
+    
     def __str__(self):
         return f"{self.user.employee_id} - {self.designation}"
+    
+    @property
+    def picture_variants(self):
+        """Thumbnail URLs by size and format, or None until a picture has been processed"""
+        if not self.picture_hash:
+            return None
+        from .pictures import variant_urls
+        return variant_urls(self.picture_hash)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+    
+    def changed_fields(self):
+        """Names of fields edited since the profile was loaded or saved"""
+        loaded = getattr(self, '_loaded_values', {})
+        return [
+            field.attname for field in self._meta.concrete_fields
+            if field.attname in loaded and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+
+class HoursBetween(models.Func):
+    """Hours elapsed from `start` to `end`, computed by the database"""
+    output_field = models.FloatField()
+    
+    def __init__(self, start, end, **extra):
+        super().__init__(end, start, **extra)
+    
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s)) * 24)', arg_joiner=') - julianday(', **extra_context
+        )
+    
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='(EXTRACT(EPOCH FROM (%(expressions)s)) / 3600)', arg_joiner=' - ', **extra_context
+        )
+    
+    def as_mysql(self, compiler, connection, **extra_context):
+        clone = self.copy()
+        clone.set_source_expressions(self.get_source_expressions()[::-1])
+        return clone.as_sql(
+            compiler, connection,
+            template='(TIMESTAMPDIFF(MICROSECOND, %(expressions)s) / 3600000000)', **extra_context
+        )
 
 
 class Attendance(models.Model):
@@ -87,12 +245,32 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ['user', 'date']
         ordering = ['-date']
+        indexes = [
+            # Keyset pagination of the admin attendance records, one per
+            # sortable column (ATTENDANCE_SORT_FIELDS in views.py)
+            models.Index(fields=['date', 'id'], name='hrms_attendance_date_id_idx'),
+            models.Index(fields=['total_hours', 'id'], name='hrms_attendance_hours_id_idx'),
+            models.Index(fields=['status', 'id'], name='hrms_attendance_status_id_idx'),
+        ]
         verbose_name = 'Attendance'
         verbose_name_plural = 'Attendance Records'
     
     def __str__(self):
         return f"{self.user.employee_id} - {self.date} - {self.status}"
     
+    # Minimum hours worked for each status
+    FULL_DAY_HOURS = 8
+    HALF_DAY_HOURS = 4
+    
+    @classmethod
+    def status_for_hours(cls, hours):
+        """Attendance status for a number of hours worked"""
+        if hours >= cls.FULL_DAY_HOURS:
+            return 'PRESENT'
+        elif hours >= cls.HALF_DAY_HOURS:
+            return 'HALF_DAY'
+        return 'ABSENT'
+    
     def calculate_total_hours(self):
         """Calculate total hours worked"""
         if self.check_in_time and self.check_out_time:
@@ -101,14 +279,142 @@ class Attendance(models.Model):
             self.total_hours = round(hours, 2)
             
             # Set status based on hours
-            if hours >= 8:
-                self.status = 'PRESENT'
-            elif hours >= 4:
-                self.status = 'HALF_DAY'
-            else:
-                self.status = 'ABSENT'
+            self.status = self.status_for_hours(hours)
             
-            self.save()
+            self.save(update_fields=['check_out_time', 'total_hours', 'status'])
+    
+    @classmethod
+    def _guarded_update(cls, rows, expected_status, returning=(), **values):
+        """
+        UPDATE `rows`; returns (status they had before, `returning` fields after), or (None, None).
+
+        The status is part of the WHERE clause so the caller learns the old
+        value without a read-modify-write, and the `returning` fields come
+        back from the same statement. `expected_status` is tried first,
+        which makes the usual case a single statement.
+        """
+        def attempt(status):
+            matched = rows.filter(status=status)
+            if returning:
+                updated = update_returning(matched, returning, **values)
+                return updated[0] if updated else None
+            return () if matched.update(**values) else None
+
+        row = attempt(expected_status)
+        if row is not None:
+            return expected_status, row
+        # The status was edited by hand since the row was created
+        for status in rows.values_list('status', flat=True)[:1]:
+            row = attempt(status)
+            if row is not None:
+                return status, row
+        return None, None
+    
+    @classmethod
+    def punch_in(cls, user_id, day, now):
+        """
+        Check a user in for `day` at `now`; returns (checked_in, old_status).
+
+        The day's row is created by the check-in itself, so the usual case
+        is a single INSERT. If a row already exists (an admin entry or an
+        import), one conditional UPDATE fills in its check-in instead.
+        Double-clicks and retries cannot overwrite an earlier check-in: the
+        loser gets checked_in=False. old_status is None when the row was
+        created.
+        """
+        punch = {'check_in_time': now, 'status': 'PRESENT'}
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, date=day, **punch)
+        except IntegrityError:
+            pending = cls.objects.filter(user_id=user_id, date=day, check_in_time__isnull=True)
+            old_status, _ = cls._guarded_update(pending, 'ABSENT', **punch)
+            if old_status:
+                # Set-based updates send no post_save
+                bump_dashboard_version(user_id)
+            return old_status is not None, old_status
+        return True, None
+    
+    @classmethod
+    def punch_out(cls, user_id, day, now):
+        """
+        Check a user out for `day` at `now`; returns (old_status, new_status, total_hours) or None.
+
+        Total hours and status are computed by the database in the same
+        conditional UPDATE and returned by it, so a check-out is one round
+        trip. A concurrent second check-out matches no row and gets None, as
+        does a user who has not checked in.
+        """
+        open_rows = cls.objects.filter(
+            user_id=user_id, date=day, check_in_time__isnull=False, check_out_time__isnull=True
+        )
+        old_status, row = cls._guarded_update(
+            open_rows, 'PRESENT', returning=['status', 'total_hours'],
+            check_out_time=now,
+            total_hours=models.ExpressionWrapper(
+                Round(HoursBetween(models.F('check_in_time'), models.Value(now)), 2),
+                output_field=models.DecimalField(max_digits=4, decimal_places=2),
+            ),
+            status=models.Case(
+                models.When(check_in_time__lte=now - timedelta(hours=cls.FULL_DAY_HOURS), then=models.Value('PRESENT')),
+                models.When(check_in_time__lte=now - timedelta(hours=cls.HALF_DAY_HOURS), then=models.Value('HALF_DAY')),
+                default=models.Value('ABSENT'),
+            ),
+        )
+        if old_status is None:
+            return None
+        bump_dashboard_version(user_id)
+        new_status, total_hours = row
+        return old_status, new_status, total_hours
+
+
+class DailyAttendanceSummary(models.Model):
+    """Pre-aggregated attendance counts per date, department and status"""
+    date = models.DateField()
+    department = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=Attendance.STATUS_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['date', 'department', 'status']
+        ordering = ['-date', 'department', 'status']
+        verbose_name = 'Daily Attendance Summary'
+        verbose_name_plural = 'Daily Attendance Summaries'
+    
+    def __str__(self):
+        return f"{self.date} - {self.department} - {self.status}: {self.count}"
+
+
+class AttendanceCalendar(models.Model):
+    """One user's month as a string with one state character per day (maintained by rollups.py)"""
+    NO_RECORD = '-'
+    ON_LEAVE = 'L'
+    # Day states for each Attendance status
+    ATTENDANCE_STATES = {
+        'PRESENT': 'P',
+        'HALF_DAY': 'H',
+        'ABSENT': 'A',
+    }
+    
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='attendance_calendars')
+    month = models.DateField(help_text='First day of the month')
+    days = models.CharField(max_length=31)
+    
+    class Meta:
+        unique_together = ['user', 'month']
+        indexes = [
+            models.Index(fields=['month', 'user'], name='hrms_calendar_month_user_idx'),
+        ]
+        verbose_name = 'Attendance Calendar'
+        verbose_name_plural = 'Attendance Calendars'
+    
+    def __str__(self):
+        return f"{self.user.employee_id} - {self.month:%Y-%m}: {self.days}"
+    
+    @classmethod
+    def blank(cls, month):
+        """A month with no recorded days"""
+        return cls.NO_RECORD * calendar.monthrange(month.year, month.month)[1]
 
 
 class LeaveRequest(models.Model):
@@ -145,6 +451,10 @@ class LeaveRequest(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Interval lookups for overlap and department coverage checks (availability.py)
+            models.Index(fields=['user', 'status', 'start_date', 'end_date'], name='hrms_leave_user_interval_idx'),
+        ]
         verbose_name = 'Leave Request'
         verbose_name_plural = 'Leave Requests'
     
@@ -157,6 +467,31 @@ class LeaveRequest(models.Model):
         return (self.end_date - self.start_date).days + 1
 
 
+class LeaveBalance(models.Model):
+    """Leave ledger per user, leave type and year (maintained by balances.py)"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.CharField(max_length=10, choices=LeaveRequest.LEAVE_TYPE_CHOICES)
+    year = models.PositiveSmallIntegerField()
+    accrued = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    used = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    accrued_through = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['user', 'leave_type', 'year']
+        ordering = ['-year', 'leave_type']
+        verbose_name = 'Leave Balance'
+        verbose_name_plural = 'Leave Balances'
+    
+    def __str__(self):
+        return f"{self.user.employee_id} - {self.leave_type} {self.year}: {self.available}"
+    
+    @property
+    def available(self):
+        """Days accrued but not yet used"""
+        return self.accrued - self.used
+
+
 class Payroll(models.Model):
     """Employee payroll and salary structure"""
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='payrolls')
@@ -180,6 +515,9 @@ class Payroll(models.Model):
     
     class Meta:
         ordering = ['-effective_date', '-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'effective_date'], name='hrms_payroll_unique_user_effective_date'),
+        ]
         verbose_name = 'Payroll'
         verbose_name_plural = 'Payroll Records'
     
@@ -211,3 +549,94 @@ class Payroll(models.Model):
     def net_salary(self):
         """Calculate net salary (gross - deductions)"""
         return self.gross_salary - self.total_deductions
+
+
+
+class PayrollRun(models.Model):
+    """One monthly payroll run and its totals"""
+    month = models.DateField(help_text='First day of the month that was paid')
+    created_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payroll_runs'
+    )
+    payslip_count = models.PositiveIntegerField(default=0)
+    total_gross = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    total_net = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-month', '-created_at']
+        verbose_name = 'Payroll Run'
+        verbose_name_plural = 'Payroll Runs'
+    
+    def __str__(self):
+        return f"{self.month:%B %Y} - {self.payslip_count} payslips"
+
+
+class Payslip(models.Model):
+    """Immutable monthly payslip with stored, prorated totals"""
+    run = models.ForeignKey(PayrollRun, on_delete=models.PROTECT, related_name='payslips')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='payslips')
+    payroll = models.ForeignKey(Payroll, on_delete=models.SET_NULL, null=True, blank=True, related_name='payslips')
+    month = models.DateField()
+    
+    working_days = models.PositiveSmallIntegerField()
+    loss_of_pay_days = models.DecimalField(max_digits=4, decimal_places=1, default=0)
+    
+    basic_salary = models.DecimalField(max_digits=12, decimal_places=2)
+    gross_salary = models.DecimalField(max_digits=12, decimal_places=2)
+    total_deductions = models.DecimalField(max_digits=12, decimal_places=2)
+    net_salary = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['user', 'month']
+        ordering = ['-month', 'user']
+        indexes = [
+            models.Index(fields=['month'], name='hrms_payslip_month_idx'),
+        ]
+        verbose_name = 'Payslip'
+        verbose_name_plural = 'Payslips'
+    
+    def __str__(self):
+        return f"{self.user.employee_id} - {self.month:%B %Y} - ₹{self.net_salary}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Payslips are immutable once issued.')
+        super().save(*args, **kwargs)
+
+
+class OutboundEmail(models.Model):
+    """Queued outgoing email, delivered by the send_queued_mail worker"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.TextField(help_text='Comma-separated recipient addresses')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='hrms_outbound_due_idx'),
+        ]
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+    
+    def __str__(self):
+        return f"{self.to} - {self.subject} ({self.status})"
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def get_page_size(request):
+    """Read the page size from the query string, clamped to the configured maximum"""
+    default = getattr(settings, 'HRMS_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'HRMS_MAX_PAGE_SIZE', 500)
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def get_sort(request, fields, default):
+    """Read `?sort=field` or `?sort=-field` (descending), falling back to `default` outside `fields`"""
+    sort = request.GET.get('sort', default)
+    if sort.lstrip('-') not in fields:
+        sort = default
+    return sort.lstrip('-'), sort.startswith('-')
+
+
+class KeysetPage:
+    """One page of a keyset (seek) paginated queryset"""
+
+    def __init__(self, object_list, field, has_next, has_previous):
+        self.object_list = object_list
+        self.field = field
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _cursor(self, obj):
+        value = getattr(obj, self.field)
+        return f"{value.isoformat() if hasattr(value, 'isoformat') else value}_{obj.pk}"
+
+    @property
+    def next_cursor(self):
+        """Cursor for the following page"""
+        if self.has_next and self.object_list:
+            return self._cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        """Cursor for the preceding page"""
+        if self.has_previous and self.object_list:
+            return self._cursor(self.object_list[0])
+        return None
+
+
+def parse_cursor(queryset, field, cursor):
+    """Decode a `<value>_<id>` cursor, returning None if it is malformed"""
+    if not cursor:
+        return None
+    value, _, pk = cursor.rpartition('_')
+    try:
+        return queryset.model._meta.get_field(field).to_python(value), int(pk)
+    except (ValidationError, ValueError):
+        return None
+
+
+def keyset_paginate(queryset, field, page_size, after=None, before=None, descending=True):
+    """
+    Paginate `queryset` by seeking on (`field`, id) instead of using OFFSET.
+
+    Rows are returned newest (largest) first unless `descending` is False.
+    `after` fetches the page following a cursor, `before` the page
+    preceding it. Each page is a single indexed range scan, so page N
+    costs the same as page 1.
+    """
+    after = parse_cursor(queryset, field, after)
+    before = parse_cursor(queryset, field, before)
+    forward, backward = ('lt', 'gt') if descending else ('gt', 'lt')
+    order = (f'-{field}', '-id') if descending else (field, 'id')
+
+    if before and not after:
+        value, pk = before
+        queryset = queryset.filter(
+            Q(**{f'{field}__{backward}': value}) | Q(**{field: value, f'id__{backward}': pk})
+        ).order_by(*[key[1:] if key.startswith('-') else f'-{key}' for key in order])
+    else:
+        if after:
+            value, pk = after
+            queryset = queryset.filter(
+                Q(**{f'{field}__{forward}': value}) | Q(**{field: value, f'id__{forward}': pk})
+            )
+        queryset = queryset.order_by(*order)
+
+    # Fetch one extra row to know whether another page exists
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if before and not after:
+        rows.reverse()
+        return KeysetPage(rows, field, has_next=True, has_previous=has_more)
+    return KeysetPage(rows, field, has_next=has_more, has_previous=bool(after))
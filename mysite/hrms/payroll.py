@@ -0,0 +1,161 @@
+import calendar
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Subquery
+from .models import CustomUser, Attendance, LeaveRequest, Payroll, PayrollRun, Payslip
+
+
+CENT = Decimal('0.01')
+
+
+def parse_month(value):
+    """Parse 'YYYY-MM' into the first day of that month"""
+    return datetime.strptime(value, '%Y-%m').date().replace(day=1)
+
+
+def month_bounds(month):
+    """First and last day of the month containing `month`"""
+    first = month.replace(day=1)
+    last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+    return first, last
+
+
+def count_working_days(start, end):
+    """Number of Monday-Friday days between two dates, inclusive"""
+    if start > end:
+        return 0
+    days = (end - start).days + 1
+    full_weeks, remainder = divmod(days, 7)
+    working = full_weeks * 5
+    for offset in range(remainder):
+        if (start + timedelta(days=offset)).weekday() < 5:
+            working += 1
+    return working
+
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def run_payroll(month, created_by=None, batch_size=1000):
+    """
+    Issue payslips for every active employee for `month`.
+
+    Each employee is paid from their latest Payroll structure effective on
+    or before the end of the month. Gross pay is prorated by loss-of-pay
+    days: approved unpaid leave on working days, ABSENT attendance rows on
+    other working days, and half of every such HALF_DAY row. Deductions are not prorated. Employees who
+    already have a payslip for the month are skipped, so a run can be
+    repeated safely.
+
+    Inputs are loaded with four set-based queries and the payslips are
+    inserted with bulk_create, so there are no per-employee queries.
+    """
+    first, last = month_bounds(month)
+    working_days = count_working_days(first, last)
+
+    latest_payroll = Payroll.objects.filter(
+        user=OuterRef('pk'),
+        effective_date__lte=last,
+    ).order_by('-effective_date', '-created_at').values('pk')[:1]
+
+    employees = (
+        CustomUser.objects.filter(role='EMPLOYEE', is_active=True)
+        .exclude(payslips__month=first)
+        .annotate(payroll_id=Subquery(latest_payroll))
+        .filter(payroll_id__isnull=False)
+        .values_list('pk', 'payroll_id')
+    )
+    payroll_by_user = dict(employees)
+
+    structures = {
+        row['pk']: row
+        for row in Payroll.objects.filter(pk__in=payroll_by_user.values()).values(
+            'pk', 'basic_salary', 'house_rent_allowance', 'transport_allowance',
+            'medical_allowance', 'other_allowances', 'provident_fund',
+            'professional_tax', 'income_tax', 'other_deductions',
+        )
+    }
+
+    approved_unpaid = LeaveRequest.objects.filter(leave_type='UNPAID', status='APPROVED')
+    # Only working days cost pay, and a day of unpaid leave is already
+    # counted in full below, whatever its attendance row says
+    unpaid_leave_on_day = approved_unpaid.filter(
+        user=OuterRef('user_id'), start_date__lte=OuterRef('date'), end_date__gte=OuterRef('date'),
+    )
+    attendance = {
+        row['user_id']: row
+        for row in Attendance.objects.filter(date__range=(first, last))
+        .exclude(date__week_day__in=[1, 7])
+        .exclude(Exists(unpaid_leave_on_day))
+        .order_by()
+        .values('user_id')
+        .annotate(
+            absent=Count('id', filter=Q(status='ABSENT')),
+            half_day=Count('id', filter=Q(status='HALF_DAY')),
+        )
+    }
+
+    unpaid_leave_days = {}
+    for user_id, start, end in approved_unpaid.filter(
+        start_date__lte=last,
+        end_date__gte=first,
+    ).values_list('user_id', 'start_date', 'end_date'):
+        days = count_working_days(max(start, first), min(end, last))
+        unpaid_leave_days[user_id] = unpaid_leave_days.get(user_id, 0) + days
+
+    run = PayrollRun(month=first, created_by=created_by)
+    payslips = []
+    total_gross = Decimal('0')
+    total_net = Decimal('0')
+
+    for user_id, payroll_id in payroll_by_user.items():
+        structure = structures[payroll_id]
+        counts = attendance.get(user_id, {})
+        loss_of_pay = Decimal(unpaid_leave_days.get(user_id, 0) + counts.get('absent', 0))
+        loss_of_pay += Decimal(counts.get('half_day', 0)) / 2
+        loss_of_pay = min(loss_of_pay, Decimal(working_days))
+        paid_fraction = (Decimal(working_days) - loss_of_pay) / working_days if working_days else Decimal('1')
+
+        gross = (
+            structure['basic_salary'] + structure['house_rent_allowance'] +
+            structure['transport_allowance'] + structure['medical_allowance'] +
+            structure['other_allowances']
+        )
+        deductions = (
+            structure['provident_fund'] + structure['professional_tax'] +
+            structure['income_tax'] + structure['other_deductions']
+        )
+        gross = _money(gross * paid_fraction)
+        deductions = _money(deductions)
+        net = gross - deductions
+
+        payslips.append(Payslip(
+            run=run,
+            user_id=user_id,
+            payroll_id=payroll_id,
+            month=first,
+            working_days=working_days,
+            loss_of_pay_days=loss_of_pay,
+            basic_salary=_money(structure['basic_salary'] * paid_fraction),
+            gross_salary=gross,
+            total_deductions=deductions,
+            net_salary=net,
+        ))
+        total_gross += gross
+        total_net += net
+
+    run.payslip_count = len(payslips)
+    run.total_gross = total_gross
+    run.total_net = total_net
+
+    # Nothing to issue: return the empty run without recording it
+    if not payslips:
+        return run
+
+    with transaction.atomic():
+        run.save()
+        Payslip.objects.bulk_create(payslips, batch_size=batch_size)
+
+    return run
@@ -0,0 +1,194 @@
+"""
+Profile picture pipeline.
+
+Uploads are stored as they arrive and queued on the profile
+(`picture_due_at`); the process_profile_pictures worker then decodes each
+one once, writes square WebP and JPEG thumbnails without metadata, and
+deletes the original. Variants are named after the SHA-256 of the upload,
+so identical uploads share one set of files and a name never changes
+content: they can be served with far-future, immutable cache headers.
+"""
+import hashlib
+import logging
+import re
+from datetime import timedelta
+from functools import partial
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .caching import bump_dashboard_version
+from .models import Profile
+
+
+logger = logging.getLogger(__name__)
+
+# Square thumbnail edge in pixels per variant name
+DEFAULT_PICTURE_SIZES = {'sm': 48, 'md': 160, 'lg': 320}
+
+# (extension, Pillow format, save options); WebP for browsers that take it, JPEG otherwise
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+VARIANT_DIR = 'profiles/v'
+VARIANT_RE = re.compile(r'^profiles/v/[0-9a-f]{2}/[0-9a-f]{64}-[a-z]+\.(webp|jpg)$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# How long a claimed picture is hidden from other workers before it is retried
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def get_picture_sizes():
+    return getattr(settings, 'HRMS_PROFILE_PICTURE_SIZES', DEFAULT_PICTURE_SIZES)
+
+
+def variant_name(digest, size, extension):
+    return f'{VARIANT_DIR}/{digest[:2]}/{digest}-{size}.{extension}'
+
+
+def variant_urls(digest):
+    """{size: {'px': edge, 'webp': url, 'jpg': url}} for a processed picture"""
+    return {
+        size: dict(
+            {extension: default_storage.url(variant_name(digest, size, extension)) for extension, _, _ in FORMATS},
+            px=px,
+        )
+        for size, px in get_picture_sizes().items()
+    }
+
+
+def render_variants(image):
+    """Encode every size and format of a decoded image; returns {(size, extension): bytes}"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        # Flatten transparency onto white; JPEG has no alpha channel
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+        image = background
+
+    variants = {}
+    # Largest first, each size scaled down from the previous one
+    for size, px in sorted(get_picture_sizes().items(), key=lambda item: -item[1]):
+        image = ImageOps.fit(image, (px, px), Image.Resampling.LANCZOS)
+        # Drop EXIF, ICC and any other metadata carried over from the upload
+        image.info = {}
+        for extension, image_format, options in FORMATS:
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+            variants[(size, extension)] = buffer.getvalue()
+    return variants
+
+
+def store_picture(data):
+    """Write the variants of an uploaded picture and return its content hash"""
+    digest = hashlib.sha256(data).hexdigest()
+    names = {
+        (size, extension): variant_name(digest, size, extension)
+        for size in get_picture_sizes() for extension, _, _ in FORMATS
+    }
+    # Another profile uploaded the same picture: nothing to decode
+    if all(default_storage.exists(name) for name in names.values()):
+        return digest
+
+    image = Image.open(BytesIO(data))
+    # JPEG can decode straight at a reduced scale, far cheaper than full size
+    largest = max(get_picture_sizes().values())
+    image.draft('RGB', (largest * 2, largest * 2))
+    for key, payload in render_variants(image).items():
+        if not default_storage.exists(names[key]):
+            default_storage.save(names[key], ContentFile(payload))
+    return digest
+
+
+def delete_variants(digest):
+    """Remove a picture's variants once no profile uses them"""
+    if not digest or Profile.objects.filter(picture_hash=digest).exists():
+        return
+    for size in get_picture_sizes():
+        for extension, _, _ in FORMATS:
+            default_storage.delete(variant_name(digest, size, extension))
+
+
+def discard_picture(upload, digest):
+    """Delete an upload that is done with and the variants of `digest` if nothing shows them"""
+    if upload:
+        default_storage.delete(upload)
+    delete_variants(digest)
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to `batch_size` due pictures for this worker; returns [(profile, claimed_until)].
+
+    Same scheme as the mail queue: one conditional UPDATE pushes
+    picture_due_at of the due rows forward, so concurrent workers never
+    pick the same profile and a crashed worker's pictures become due again
+    after CLAIM_TIMEOUT.
+    """
+    now = timezone.now()
+    claimed_until = now + CLAIM_TIMEOUT
+    due = Profile.objects.filter(picture_due_at__lte=now)
+    due_ids = list(due.order_by('picture_due_at').values_list('pk', flat=True)[:batch_size])
+    if not due_ids or not due.filter(pk__in=due_ids).update(picture_due_at=claimed_until):
+        return []
+    # Profiles another worker claimed in between did not match the UPDATE
+    return [
+        (profile, claimed_until)
+        for profile in Profile.objects.filter(pk__in=due_ids, picture_due_at=claimed_until)
+    ]
+
+
+def process_profile_pictures(batch_size=20):
+    """
+    Process one batch of queued uploads; returns (processed, failed).
+
+    Unreadable uploads are discarded and the profile keeps its previous
+    picture. A profile that got a newer upload while its previous one was
+    being processed keeps the newer one queued, and the older upload and
+    its variants are deleted.
+    """
+    processed = failed = 0
+    for profile, claimed_until in claim_batch(batch_size):
+        upload = profile.profile_picture.name
+        # Still this worker's claim on this very upload
+        current = Profile.objects.filter(pk=profile.pk, picture_due_at=claimed_until, profile_picture=upload)
+        try:
+            with default_storage.open(upload) as handle:
+                data = handle.read()
+            digest = store_picture(data)
+        except Exception:
+            # Pillow reports bad input with many exception types (SyntaxError,
+            # struct.error, EOFError...); one bad upload must not stop the queue
+            logger.warning('Discarding unreadable profile picture %s', upload, exc_info=True)
+            with transaction.atomic():
+                if current.update(profile_picture='', picture_due_at=None) or _superseded(profile, upload):
+                    transaction.on_commit(partial(discard_picture, upload, None))
+            failed += 1
+            continue
+
+        # Files are only deleted once the profile rows that stop using them
+        # are committed, so no reader is left pointing at a deleted file
+        with transaction.atomic():
+            if current.update(picture_hash=digest, profile_picture='', picture_due_at=None):
+                retired = profile.picture_hash if profile.picture_hash != digest else None
+                transaction.on_commit(partial(discard_picture, upload, retired))
+                # Another worker may have retired an identical picture between
+                # store_picture() finding its variants and this commit
+                transaction.on_commit(partial(store_picture, data))
+                bump_dashboard_version(profile.user_id)
+            elif _superseded(profile, upload):
+                # Replaced by a newer upload mid-way: nothing will show this one
+                transaction.on_commit(partial(discard_picture, upload, digest))
+        processed += 1
+    return processed, failed
+
+
+def _superseded(profile, upload):
+    """Whether the profile no longer holds `upload`, as opposed to another worker having reclaimed it"""
+    return not Profile.objects.filter(pk=profile.pk, profile_picture=upload).exists()
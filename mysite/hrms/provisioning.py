@@ -0,0 +1,203 @@
+import re
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from .caching import ADMIN_DASHBOARD, bump_dashboard_version
+from .models import CustomUser, Profile, Payroll
+
+
+# Values given to the Profile and Payroll every new user starts with
+DEFAULT_PROFILE = {
+    'designation': 'Not Assigned',
+    'department': 'Not Assigned',
+}
+DEFAULT_PAYROLL = {
+    'basic_salary': 0.00,
+}
+
+# Same format CustomUser.employee_id validates; bulk_create skips field validators
+EMPLOYEE_ID_RE = re.compile(r'^EMP\d{4,6}$')
+
+# Optional import columns checked against their model field before insert
+TYPED_FIELDS = (
+    (Profile, 'date_of_joining'),
+    (Profile, 'employment_type'),
+    (Payroll, 'basic_salary'),
+)
+
+
+def users_without_profile(users=None):
+    """Users with no Profile row (anti-join)"""
+    users = CustomUser.objects.all() if users is None else users
+    return users.filter(~Exists(Profile.objects.filter(user=OuterRef('pk'))))
+
+
+def users_without_payroll(users=None):
+    """Users with no Payroll row at all (anti-join)"""
+    users = CustomUser.objects.all() if users is None else users
+    return users.filter(~Exists(Payroll.objects.filter(user=OuterRef('pk'))))
+
+
+def _bulk_create_for(users, build, model, batch_size):
+    # Walk the anti-join in primary key order one batch at a time, so no
+    # read cursor stays open while the batch is being inserted
+    missing = users.count()
+    last_pk = 0
+    while True:
+        user_ids = list(
+            users.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            break
+        model.objects.bulk_create([build(user_id) for user_id in user_ids], ignore_conflicts=True)
+        last_pk = user_ids[-1]
+    # ignore_conflicts hides rows a concurrent request created first; count
+    # what the anti-join lost instead of what was attempted
+    return missing - users.count()
+
+
+def create_missing_profiles(users=None, batch_size=1000):
+    """Bulk-create default profiles for users that lack one; returns how many users gained one"""
+    return _bulk_create_for(
+        users_without_profile(users),
+        lambda user_id: Profile(user_id=user_id, **DEFAULT_PROFILE),
+        Profile,
+        batch_size,
+    )
+
+
+def create_missing_payrolls(users=None, batch_size=1000):
+    """Bulk-create default payrolls for users that have none; returns how many users gained one"""
+    return _bulk_create_for(
+        users_without_payroll(users),
+        lambda user_id: Payroll(user_id=user_id, **DEFAULT_PAYROLL),
+        Payroll,
+        batch_size,
+    )
+
+
+def clean_employee_record(record):
+    """
+    Return `record` with its typed columns converted, or raise ValidationError.
+
+    bulk_create runs no field validation, so a bad date, salary or
+    employment type would otherwise fail the insert of a whole batch.
+    """
+    cleaned = dict(record)
+    errors = {}
+    for model, name in TYPED_FIELDS:
+        if not record.get(name):
+            continue
+        try:
+            cleaned[name] = model._meta.get_field(name).clean(record[name], None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def import_employees(records, batch_size=500, password_hasher=None, on_invalid=None):
+    """
+    Create users, profiles and default payrolls from dicts in batches.
+
+    Everything goes through bulk_create, so the per-user post_save receivers
+    in signals.py never fire; this function is their bulk equivalent. Each
+    record needs employee_id, username and email and may carry first_name,
+    last_name, department, designation, date_of_joining, employment_type,
+    basic_salary and password. Users without a password get an unusable
+    one. Records with a malformed employee ID, or whose employee ID,
+    username or email already exist, are skipped, as are records with an
+    invalid date, salary or employment type; those are also passed to
+    `on_invalid(record, error)` if given. Returns (created, skipped).
+    """
+    created = 0
+    skipped = 0
+    batch = []
+    for record in records:
+        try:
+            record = clean_employee_record(record)
+        except ValidationError as exc:
+            skipped += 1
+            if on_invalid:
+                on_invalid(record, exc)
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            batch_created, batch_skipped = _import_employee_batch(batch, password_hasher)
+            created += batch_created
+            skipped += batch_skipped
+            batch = []
+    if batch:
+        batch_created, batch_skipped = _import_employee_batch(batch, password_hasher)
+        created += batch_created
+        skipped += batch_skipped
+    if created:
+        bump_dashboard_version(ADMIN_DASHBOARD)
+    return created, skipped
+
+
+def _import_employee_batch(records, password_hasher):
+    employee_ids = {record['employee_id'] for record in records}
+    usernames = {record['username'] for record in records}
+    emails = {record['email'] for record in records}
+    taken = set()
+    for employee_id, username, email in CustomUser.objects.filter(
+        Q(employee_id__in=employee_ids) | Q(username__in=usernames) | Q(email__in=emails)
+    ).values_list('employee_id', 'username', 'email'):
+        taken.update({('employee_id', employee_id), ('username', username), ('email', email)})
+
+    users = []
+    extras = []
+    for record in records:
+        keys = {('employee_id', record['employee_id']), ('username', record['username']), ('email', record['email'])}
+        if keys & taken or not EMPLOYEE_ID_RE.match(record['employee_id']):
+            continue
+        taken |= keys
+
+        user = CustomUser(
+            employee_id=record['employee_id'],
+            username=record['username'],
+            email=record['email'],
+            first_name=record.get('first_name', ''),
+            last_name=record.get('last_name', ''),
+            role='EMPLOYEE',
+        )
+        if record.get('password'):
+            user.password = (password_hasher or make_password)(record['password'])
+        else:
+            user.set_unusable_password()
+        users.append(user)
+        extras.append(record)
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users)
+        if users and users[0].pk is None:
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(CustomUser.objects.filter(
+                employee_id__in=[user.employee_id for user in users]
+            ).values_list('employee_id', 'pk'))
+            for user in users:
+                user.pk = ids[user.employee_id]
+
+        Profile.objects.bulk_create([
+            Profile(
+                user_id=user.pk,
+                designation=record.get('designation') or DEFAULT_PROFILE['designation'],
+                department=record.get('department') or DEFAULT_PROFILE['department'],
+                employment_type=record.get('employment_type') or 'FULL_TIME',
+                **({'date_of_joining': record['date_of_joining']} if record.get('date_of_joining') else {}),
+            )
+            for user, record in zip(users, extras)
+        ])
+        Payroll.objects.bulk_create([
+            Payroll(
+                user_id=user.pk,
+                basic_salary=record.get('basic_salary') or DEFAULT_PAYROLL['basic_salary'],
+                **({'effective_date': record['date_of_joining']} if record.get('date_of_joining') else {}),
+            )
+            for user, record in zip(users, extras)
+        ])
+
+    return len(users), len(records) - len(users)
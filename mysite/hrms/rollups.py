@@ -0,0 +1,226 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Count, F, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr
+from django.db.models.lookups import Exact
+from .models import Attendance, AttendanceCalendar, DailyAttendanceSummary, LeaveRequest, Profile
+
+
+UNASSIGNED_DEPARTMENT = 'Not Assigned'
+
+
+def get_department(user_id):
+    """Department an attendance row is counted under"""
+    department = Profile.objects.filter(user_id=user_id).values_list('department', flat=True).first()
+    return department or UNASSIGNED_DEPARTMENT
+
+
+def _bump(day, department, status, delta):
+    rows = DailyAttendanceSummary.objects.filter(date=day, department=department, status=status)
+    if delta < 0:
+        # Never drive a bucket below zero if it drifted; rebuild fixes drift
+        rows = rows.filter(count__gte=-delta)
+    updated = rows.update(count=F('count') + delta)
+    if not updated and delta > 0:
+        # First row of the bucket; insert straight away instead of get_or_create's extra SELECT
+        try:
+            with transaction.atomic():
+                DailyAttendanceSummary.objects.create(date=day, department=department, status=status, count=delta)
+        except IntegrityError:
+            # Created concurrently in the meantime
+            rows.update(count=F('count') + delta)
+
+
+def record_attendance_change(user_id, day, old_status, new_status, department=None):
+    """
+    Move one attendance row between summary buckets.
+
+    Pass `old_status=None` for a newly created row. Nothing is written when
+    the status did not change.
+    """
+    if old_status == new_status:
+        return
+    department = department or get_department(user_id)
+    # Part of the caller's transaction when there is one; no savepoint needed
+    with transaction.atomic(savepoint=False):
+        if old_status:
+            _bump(day, department, old_status, -1)
+        if new_status:
+            _bump(day, department, new_status, 1)
+            mark_calendar_day(user_id, day, AttendanceCalendar.ATTENDANCE_STATES[new_status])
+        else:
+            # The row was deleted: the day has no record any more
+            mark_calendar_day(user_id, day, AttendanceCalendar.NO_RECORD)
+
+
+def check_in(user_id, day, now):
+    """Punch a user in and count the row in the summaries; returns Attendance.punch_in's result"""
+    checked_in, old_status = Attendance.punch_in(user_id, day, now)
+    if checked_in:
+        record_attendance_change(user_id, day, old_status, 'PRESENT')
+    return checked_in, old_status
+
+
+def check_out(user_id, day, now):
+    """Punch a user out and move the row between summaries; returns Attendance.punch_out's result"""
+    punched = Attendance.punch_out(user_id, day, now)
+    if punched:
+        old_status, new_status, _ = punched
+        record_attendance_change(user_id, day, old_status, new_status)
+    return punched
+
+
+def get_daily_totals(day):
+    """Return {status: count} for one date from the summary table"""
+    rows = (
+        DailyAttendanceSummary.objects.filter(date=day)
+        .values('status')
+        .annotate(total=Sum('count'))
+    )
+    return {row['status']: row['total'] for row in rows}
+
+
+def rebuild_attendance_summary(date_from=None, date_to=None, batch_size=1000):
+    """Recompute summary rows from Attendance for an optional date range"""
+    attendance = Attendance.objects.all()
+    summaries = DailyAttendanceSummary.objects.all()
+    if date_from:
+        attendance = attendance.filter(date__gte=date_from)
+        summaries = summaries.filter(date__gte=date_from)
+    if date_to:
+        attendance = attendance.filter(date__lte=date_to)
+        summaries = summaries.filter(date__lte=date_to)
+
+    aggregated = (
+        attendance.order_by()
+        .values('date', 'status', dept=Coalesce(F('user__profile__department'), Value(UNASSIGNED_DEPARTMENT)))
+        .annotate(total=Count('id'))
+    )
+
+    created = 0
+    with transaction.atomic():
+        summaries.delete()
+        batch = []
+        for row in aggregated.iterator(chunk_size=batch_size):
+            batch.append(DailyAttendanceSummary(
+                date=row['date'],
+                department=row['dept'],
+                status=row['status'],
+                count=row['total'],
+            ))
+            if len(batch) >= batch_size:
+                DailyAttendanceSummary.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            DailyAttendanceSummary.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def _patched_days(first, last, state):
+    """`days` with positions first..last (1-based day numbers) replaced by `state`"""
+    return Concat(
+        Substr('days', 1, first - 1),
+        Value(state * (last - first + 1)),
+        Substr('days', last + 1),
+        output_field=CharField(),
+    )
+
+
+def mark_calendar_day(user_id, day, state):
+    """
+    Set one day of a user's AttendanceCalendar in a single UPDATE.
+
+    Days on approved leave keep their leave state; attendance never
+    overwrites it. Clearing a day (NO_RECORD) never creates a month row.
+    """
+    month = day.replace(day=1)
+    rows = AttendanceCalendar.objects.filter(user_id=user_id, month=month).exclude(
+        Exact(Substr('days', day.day, 1), AttendanceCalendar.ON_LEAVE)
+    )
+    if rows.update(days=_patched_days(day.day, day.day, state)) or state == AttendanceCalendar.NO_RECORD:
+        return
+    # Either the month has no row yet or the day is on leave
+    AttendanceCalendar.objects.bulk_create(
+        [AttendanceCalendar(user_id=user_id, month=month, days=AttendanceCalendar.blank(month))],
+        ignore_conflicts=True,
+    )
+    rows.update(days=_patched_days(day.day, day.day, state))
+
+
+def month_spans(start, end):
+    """Split an inclusive date range into (month, first_day, last_day) pieces"""
+    month = start.replace(day=1)
+    while month <= end:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        first = max(start, month)
+        last = min(end, next_month - timedelta(days=1))
+        yield month, first.day, last.day
+        month = next_month
+
+
+def mark_calendar_leaves(leaves):
+    """
+    Mark approved leaves, given as (user_id, start_date, end_date), on the calendars.
+
+    Users sharing a month and day span are updated together, one UPDATE per
+    distinct span.
+    """
+    spans = defaultdict(set)
+    for user_id, start_date, end_date in leaves:
+        for month, first, last in month_spans(start_date, end_date):
+            spans[(month, first, last)].add(user_id)
+    if not spans:
+        return
+
+    AttendanceCalendar.objects.bulk_create(
+        [
+            AttendanceCalendar(user_id=user_id, month=month, days=AttendanceCalendar.blank(month))
+            for month, user_id in {(month, user_id) for (month, _, _), users in spans.items() for user_id in users}
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    for (month, first, last), user_ids in spans.items():
+        AttendanceCalendar.objects.filter(month=month, user_id__in=user_ids).update(
+            days=_patched_days(first, last, AttendanceCalendar.ON_LEAVE)
+        )
+
+
+def rebuild_calendar(month, user_ids=None, batch_size=1000):
+    """
+    Recompute AttendanceCalendar rows for one month from Attendance and approved leave.
+
+    Approved leave takes precedence over attendance on the same day, as it
+    does for incremental updates. Pass `user_ids` to rebuild only those
+    users. Returns the number of rows written.
+    """
+    month = month.replace(day=1)
+    blank = AttendanceCalendar.blank(month)
+    last = month + timedelta(days=len(blank) - 1)
+
+    attendance = Attendance.objects.filter(date__range=(month, last))
+    leaves = LeaveRequest.objects.filter(status='APPROVED', start_date__lte=last, end_date__gte=month)
+    calendars = AttendanceCalendar.objects.filter(month=month)
+    if user_ids is not None:
+        attendance = attendance.filter(user_id__in=user_ids)
+        leaves = leaves.filter(user_id__in=user_ids)
+        calendars = calendars.filter(user_id__in=user_ids)
+
+    states = defaultdict(lambda: list(blank))
+    for user_id, day, status in attendance.values_list('user_id', 'date', 'status').iterator(chunk_size=batch_size):
+        states[user_id][day.day - 1] = AttendanceCalendar.ATTENDANCE_STATES[status]
+    for user_id, start_date, end_date in leaves.values_list('user_id', 'start_date', 'end_date'):
+        first = max(start_date, month).day
+        end = min(end_date, last).day
+        states[user_id][first - 1:end] = AttendanceCalendar.ON_LEAVE * (end - first + 1)
+
+    with transaction.atomic():
+        calendars.delete()
+        AttendanceCalendar.objects.bulk_create(
+            [AttendanceCalendar(user_id=user_id, month=month, days=''.join(days)) for user_id, days in states.items()],
+            batch_size=batch_size,
+        )
+    return len(states)
@@ -0,0 +1,174 @@
+"""
+Ranked employee search for the admin employee list and typeahead.
+
+On SQLite the hrms_employee_search FTS5 table (trigram tokenizer, kept in
+sync by triggers, see migration 0011, and re-created after every migrate
+since SQLite drops them whenever it rebuilds a table) answers substring queries from an
+index. On PostgreSQL, pg_trgm GIN indexes serve the same icontains filters
+and trigram similarity ranks the matches. Other databases, SQLite builds
+without FTS5 trigram support, and queries shorter than a trigram fall back
+to plain lookups.
+"""
+import importlib
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from .models import CustomUser
+
+
+SEARCH_TABLE = 'hrms_employee_search'
+MIN_INDEXED_LENGTH = 3
+
+SEARCH_INDEX_MIGRATION = 'hrms.migrations.0011_employee_search_index'
+
+_fts_available = {}
+
+
+def get_search_limit(request):
+    """Read the typeahead result count from the query string, clamped to the configured maximum"""
+    default = getattr(settings, 'HRMS_SEARCH_RESULTS', 10)
+    maximum = getattr(settings, 'HRMS_SEARCH_MAX_RESULTS', 50)
+    try:
+        limit = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def fts_available():
+    """Whether this database has the FTS5 search table"""
+    key = connection.settings_dict['NAME']
+    if key not in _fts_available:
+        with connection.cursor() as cursor:
+            _fts_available[key] = SEARCH_TABLE in connection.introspection.table_names(cursor)
+    return _fts_available[key]
+
+
+def search_triggers():
+    """CREATE TRIGGER IF NOT EXISTS statements for every search index trigger"""
+    search_index = importlib.import_module(SEARCH_INDEX_MIGRATION)
+    return [
+        statement.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1)
+        for statement in search_index.SQLITE_FORWARD if 'CREATE TRIGGER' in statement
+    ] + [
+        statement.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1)
+        for statement in search_index.SQLITE_PROFILE_TRIGGERS
+    ]
+
+
+def restore_search_triggers(connection):
+    """
+    Re-create any search index trigger a table rebuild dropped.
+
+    Safe to run at any time; returns the names of the triggers it created.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        if SEARCH_TABLE not in connection.introspection.table_names(cursor):
+            return []
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{SEARCH_TABLE}_%'])
+        existing = {name for name, in cursor.fetchall()}
+        created = []
+        for statement in search_triggers():
+            name = statement.split('IF NOT EXISTS', 1)[1].split()[0]
+            if name not in existing:
+                cursor.execute(statement)
+                created.append(name)
+    return created
+
+
+def search_employees(query, limit=10):
+    """
+    Best matches for `query` among employees, best first.
+
+    Returns dicts with id, employee_id, name, email, department and
+    designation.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    if len(query) >= MIN_INDEXED_LENGTH:
+        if connection.vendor == 'sqlite' and fts_available():
+            return _search_fts(query, limit)
+        if connection.vendor == 'postgresql':
+            return _search_trigram(query, limit)
+    return _search_lookups(query, limit)
+
+
+def _search_fts(query, limit):
+    # Quoted as one phrase: with the trigram tokenizer that is a substring match
+    phrase = '"' + query.replace('"', '""') + '"'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid, employee_id, name, email, department, designation
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH %s AND role = 'EMPLOYEE'
+            ORDER BY (employee_id = %s COLLATE NOCASE) DESC, rank
+            LIMIT %s
+            """,
+            [phrase, query, limit],
+        )
+        return [_result(*row) for row in cursor.fetchall()]
+
+
+def _search_trigram(query, limit):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    rows = (
+        _matching(query)
+        .annotate(similarity=Greatest(
+            TrigramWordSimilarity(query, 'employee_id'),
+            TrigramWordSimilarity(query, 'first_name'),
+            TrigramWordSimilarity(query, 'last_name'),
+            TrigramWordSimilarity(query, 'email'),
+        ))
+        .order_by('-similarity', 'first_name', 'last_name')
+    )
+    return _results(rows, limit)
+
+
+def _search_lookups(query, limit):
+    rows = _matching(query).annotate(
+        prefix_match=Case(
+            When(Q(employee_id__istartswith=query) | Q(first_name__istartswith=query) |
+                 Q(last_name__istartswith=query), then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    ).order_by('-prefix_match', 'first_name', 'last_name')
+    return _results(rows, limit)
+
+
+def _matching(query):
+    return CustomUser.objects.filter(role='EMPLOYEE').filter(
+        Q(employee_id__icontains=query) |
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(email__icontains=query) |
+        Q(profile__department__icontains=query) |
+        Q(profile__designation__icontains=query)
+    )
+
+
+def _results(rows, limit):
+    return [
+        _result(pk, employee_id, f'{first_name} {last_name}', email, department, designation)
+        for pk, employee_id, first_name, last_name, email, department, designation in rows.values_list(
+            'pk', 'employee_id', 'first_name', 'last_name', 'email',
+            Coalesce('profile__department', Value('')), Coalesce('profile__designation', Value('')),
+        )[:limit]
+    ]
+
+
+def _result(pk, employee_id, name, email, department, designation):
+    return {
+        'id': pk,
+        'employee_id': employee_id,
+        'name': name.strip(),
+        'email': email,
+        'department': department,
+        'designation': designation,
+    }
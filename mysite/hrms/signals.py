@@ -1,30 +1,87 @@
-from django.db.models.signals import post_save
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
-from .models import CustomUser, Profile, Payroll
+from .backends import invalidate_cached_user
+from .caching import ADMIN_DASHBOARD, bump_dashboard_version
+from .models import CustomUser, Profile, Payroll, Attendance, LeaveRequest, LeaveBalance
+from .provisioning import DEFAULT_PROFILE, DEFAULT_PAYROLL
+from .search import restore_search_triggers
+from .sqlite import configure_connection
 
 
+# Bulk imports (provisioning.import_employees) use bulk_create, which does not
+# send post_save; they create the same Profile/Payroll rows in batches instead.
+
 @receiver(post_save, sender=CustomUser)
-def create_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
     """Automatically create Profile and Payroll when a new user is created"""
-    if created:
-        # Create profile if it doesn't exist
-        if not hasattr(instance, 'profile'):
-            Profile.objects.create(
-                user=instance,
-                designation='Not Assigned',
-                department='Not Assigned'
-            )
+    if created and not raw:
+        # A brand-new user cannot have rows yet, unless a profile was attached in memory
+        if not CustomUser.profile.is_cached(instance):
+            Profile.objects.create(user=instance, **DEFAULT_PROFILE)
         
-        # Create default payroll if it doesn't exist
-        if not Payroll.objects.filter(user=instance).exists():
-            Payroll.objects.create(
-                user=instance,
-                basic_salary=0.00
-            )
+        # Create default payroll
+        Payroll.objects.create(user=instance, **DEFAULT_PAYROLL)
+
+
+@receiver(post_save, sender=CustomUser)
+def save_user_profile(sender, instance, created, **kwargs):
+    """Save the profile with the user, but only if it was loaded and edited"""
+    if created or not CustomUser.profile.is_cached(instance):
+        return
+    
+    profile = instance.profile
+    changed = profile.changed_fields()
+    if changed:
+        profile.save(update_fields=changed + ['updated_at'])
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user(sender, instance, **kwargs):
+    """Make the next request load the user (role, password, active flag) afresh"""
+    invalidate_cached_user(instance.pk)
 
 
 @receiver(post_save, sender=CustomUser)
-def save_user_profile(sender, instance, **kwargs):
-    """Save profile whenever user is saved"""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def invalidate_admin_counts(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Recount employees and pending leave on the admin dashboard"""
+    # Every sign-in saves last_login alone, which changes no count
+    if raw or update_fields == {'last_login'}:
+        return
+    bump_dashboard_version(ADMIN_DASHBOARD)
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+@receiver(post_save, sender=LeaveBalance)
+@receiver(post_delete, sender=LeaveBalance)
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_dashboard(sender, instance, raw=False, **kwargs):
+    """Retire the owner's cached dashboard blocks; set-based writes bump it themselves"""
+    if not raw:
+        bump_dashboard_version(instance.user_id)
+
+
+@receiver(connection_created)
+def configure_database_connection(sender, connection, **kwargs):
+    """WAL journal and the other production pragmas for SQLite"""
+    configure_connection(connection)
+
+
+@receiver(post_migrate)
+def restore_search_index_triggers(sender, using, **kwargs):
+    """Any migration that rebuilt hrms_customuser or hrms_profile on SQLite dropped their search triggers"""
+    # Sent once per app after the whole run; one pass is enough
+    if sender.label != 'hrms':
+        return
+    restore_search_triggers(connections[using])
@@ -0,0 +1,169 @@
+"""
+SQLite production mode.
+
+Every new SQLite connection gets the HRMS_SQLITE_PRAGMAS (WAL journal,
+busy timeout, relaxed fsync, larger page cache and mmap), and write
+transactions start with BEGIN IMMEDIATE (DATABASES OPTIONS), so writers
+queue on the busy timeout instead of failing with "database is locked".
+
+The transaction mode is per connection, not per block: a read-only
+atomic() also takes the write lock and waits behind writers, where a
+deferred one would read from its WAL snapshot at once. Every atomic()
+in hrms writes, so nothing pays for that today; reads that only need a
+consistent view should run outside atomic() (autocommit reads in WAL
+mode never wait) rather than in a transaction of their own.
+
+SQLite still commits one transaction at a time, and each commit has a fixed
+cost. With HRMS_WRITE_QUEUE, check-in/check-out writes from all request
+threads of a process go through one writer thread that commits whatever
+has piled up in a single transaction: one lock round and one WAL sync per
+group instead of per punch.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+}
+
+
+def configure_connection(connection):
+    """Apply HRMS_SQLITE_PRAGMAS to a new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'HRMS_SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def get_pragmas(connection):
+    """{name: current value} of the configured pragmas, for checks and benchmarks"""
+    pragmas = getattr(settings, 'HRMS_SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    values = {}
+    with connection.cursor() as cursor:
+        for name in pragmas:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            # None where the pragma does not apply, e.g. mmap_size in memory
+            values[name] = row[0] if row else None
+    return values
+
+
+class WriteQueue:
+    """
+    Run small writes on one thread per process, committing them in groups.
+
+    A group is whatever arrived within `max_wait` seconds of the first
+    write, up to `max_batch` writes. Each write runs in its own savepoint,
+    so one failing write is rolled back and reported alone while the rest
+    of the group commits. Results are handed back only after the commit.
+    """
+
+    def __init__(self, max_batch=64, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs); returns a Future for its result"""
+        future = Future()
+        self._get_queue().put((future, func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Queue a write and wait for it to be committed; returns its result"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def _get_queue(self):
+        # Threads do not survive fork(): a pre-forking server's workers each
+        # start their own writer on first use
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                threading.Thread(
+                    target=self._work, args=(self._queue,), name='hrms-write-queue', daemon=True,
+                ).start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def _work(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(pending.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            close_old_connections()
+            self._commit(batch)
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # The group itself could not commit; every write in it failed
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            connection.close()
+            return
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """The process-wide WriteQueue, or None when HRMS_WRITE_QUEUE is off"""
+    global _write_queue
+    if not getattr(settings, 'HRMS_WRITE_QUEUE', False):
+        return None
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(
+                max_batch=getattr(settings, 'HRMS_WRITE_QUEUE_BATCH', 64),
+                max_wait=getattr(settings, 'HRMS_WRITE_QUEUE_WAIT', 0.002),
+            )
+        return _write_queue
+
+
+def run_write(func, *args, **kwargs):
+    """
+    Run a small write transaction, through the write queue when HRMS_WRITE_QUEUE is on.
+
+    Either way func runs in a transaction of its own (a savepoint in the
+    queue's group) and its result or exception is returned to the caller.
+    """
+    write_queue = get_write_queue()
+    if write_queue is None or connection.in_atomic_block:
+        # Inside a caller's transaction the write must join it, not a group
+        # committed by another thread
+        with transaction.atomic():
+            return func(*args, **kwargs)
+    return write_queue.run(func, *args, **kwargs)
@@ -124,59 +124,175 @@ function closeModal(modal) {
 }
 
 // ========== Data Tables ==========
+// Tables render their first page on the server. Search, sort and paging then
+// fetch just the next page of rows as JSON from the table's data-source URL,
+// so the browser never holds more than one page however large the table is.
+const TABLE_SEARCH_DELAY = 300;
+
 function initDataTables() {
-    const tables = document.querySelectorAll('.data-table');
+    const tables = document.querySelectorAll('.data-table[data-source]');
     
     tables.forEach(table => {
-        addTableSearch(table);
-        addTableSort(table);
+        const state = {
+            params: new URLSearchParams(window.location.search),
+            controller: null,
+        };
+        addTableSearch(table, state);
+        addTableSort(table, state);
+        addTablePager(table, state);
     });
 }
 
-function addTableSearch(table) {
-    const searchInput = table.parentElement.querySelector('.table-search');
+function debounce(fn, delay) {
+    let timer;
+    return function(...args) {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn.apply(this, args), delay);
+    };
+}
+
+function loadTablePage(table, state) {
+    // Only the latest request matters; drop any still in flight
+    if (state.controller) {
+        state.controller.abort();
+    }
+    state.controller = new AbortController();
     
-    if (searchInput) {
-        searchInput.addEventListener('input', function() {
-            const filter = this.value.toLowerCase();
-            const rows = table.querySelectorAll('tbody tr');
-            
-            rows.forEach(row => {
-                const text = row.textContent.toLowerCase();
-                row.style.display = text.includes(filter) ? '' : 'none';
-            });
+    const query = state.params.toString();
+    table.setAttribute('aria-busy', 'true');
+    
+    return fetch(table.dataset.source + (query ? '?' + query : ''), {
+        headers: {'Accept': 'application/json'},
+        credentials: 'same-origin',
+        signal: state.controller.signal,
+    })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.json();
+        })
+        .then(data => {
+            table.querySelector('tbody').innerHTML = data.html;
+            updateTablePager(table, state, data);
+            updateTableExport(table, state);
+            window.history.replaceState(null, '', query ? '?' + query : window.location.pathname);
+            table.removeAttribute('aria-busy');
+        })
+        .catch(error => {
+            if (error.name !== 'AbortError') {
+                table.removeAttribute('aria-busy');
+                showToast('Could not load the table, please try again', 'error');
+            }
         });
+}
+
+function addTableSearch(table, state) {
+    const searchInput = document.querySelector(`.table-search[data-table="${table.id}"]`);
+    
+    if (searchInput) {
+        searchInput.addEventListener('input', debounce(function() {
+            const value = this.value.trim();
+            if (value === (state.params.get('q') || '')) {
+                return;
+            }
+            if (value) {
+                state.params.set('q', value);
+            } else {
+                state.params.delete('q');
+            }
+            // A new search starts again from the first page
+            state.params.delete('after');
+            state.params.delete('before');
+            loadTablePage(table, state);
+        }, TABLE_SEARCH_DELAY));
     }
 }
 
-function addTableSort(table) {
+function addTableSort(table, state) {
     const headers = table.querySelectorAll('th[data-sortable]');
     
     headers.forEach(header => {
         header.style.cursor = 'pointer';
         header.addEventListener('click', function() {
-            sortTable(table, header.cellIndex);
+            sortTable(table, state, header.dataset.sortable);
         });
     });
+    markSortedColumn(table);
 }
 
-function sortTable(table, columnIndex) {
-    const tbody = table.querySelector('tbody');
-    const rows = Array.from(tbody.querySelectorAll('tr'));
-    let ascending = true;
+function sortTable(table, state, field) {
+    // Clicking the sorted column flips its direction; a new column starts descending
+    const current = table.dataset.sort || '';
+    const sort = current === '-' + field ? field : '-' + field;
     
-    rows.sort((a, b) => {
-        const aValue = a.cells[columnIndex].textContent.trim();
-        const bValue = b.cells[columnIndex].textContent.trim();
-        
-        if (ascending) {
-            return aValue > bValue ? 1 : -1;
-        } else {
-            return aValue < bValue ? 1 : -1;
-        }
+    table.dataset.sort = sort;
+    state.params.set('sort', sort);
+    state.params.delete('after');
+    state.params.delete('before');
+    markSortedColumn(table);
+    loadTablePage(table, state);
+}
+
+function markSortedColumn(table) {
+    const sort = table.dataset.sort || '';
+    
+    table.querySelectorAll('th[data-sortable]').forEach(header => {
+        const field = header.dataset.sortable;
+        header.setAttribute('aria-sort',
+            sort === field ? 'ascending' : sort === '-' + field ? 'descending' : 'none');
     });
+}
+
+function addTablePager(table, state) {
+    const pager = document.querySelector(`.table-pager[data-table="${table.id}"]`);
+    
+    if (pager) {
+        pager.querySelectorAll('a[data-page]').forEach(link => {
+            // The first page's cursors come from the server-rendered links
+            link.dataset.cursor = new URL(link.href).searchParams.get(link.dataset.page) || '';
+            link.addEventListener('click', function(e) {
+                e.preventDefault();
+                state.params.delete('after');
+                state.params.delete('before');
+                state.params.set(link.dataset.page, link.dataset.cursor);
+                loadTablePage(table, state);
+            });
+        });
+    }
+}
+
+function updateTablePager(table, state, data) {
+    const pager = document.querySelector(`.table-pager[data-table="${table.id}"]`);
     
-    rows.forEach(row => tbody.appendChild(row));
+    if (pager) {
+        const cursors = {before: data.previous_cursor, after: data.next_cursor};
+        pager.querySelectorAll('a[data-page]').forEach(link => {
+            const cursor = cursors[link.dataset.page];
+            const params = new URLSearchParams(state.params);
+            params.delete('after');
+            params.delete('before');
+            if (cursor) {
+                params.set(link.dataset.page, cursor);
+            }
+            link.dataset.cursor = cursor || '';
+            link.href = '?' + params.toString();
+            link.hidden = !cursor;
+        });
+    }
+}
+
+function updateTableExport(table, state) {
+    // Exports cover every row matching the current filters, not one page
+    const params = new URLSearchParams(state.params);
+    params.delete('after');
+    params.delete('before');
+    
+    document.querySelectorAll(`.table-export[data-table="${table.id}"]`).forEach(link => {
+        const url = new URL(link.href);
+        url.search = params.toString();
+        link.href = url.toString();
+    });
 }
 
 // ========== Attendance Functions ==========
@@ -0,0 +1,149 @@
+"""
+Fingerprinted, precompressed static files served by the app itself.
+
+`collectstatic` writes every file under a content-hashed name (manifest
+storage) plus .gz and, when the optional `brotli` package is installed, .br
+copies of the compressible ones. StaticFilesMiddleware then answers
+/static/ requests straight from STATIC_ROOT before sessions or auth run,
+picking the smallest encoding the browser accepts. Hashed names never
+change content, so they are sent as immutable for a year and repeat visits
+make no static requests at all; no CDN or separate web server is needed.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import stat as stat_module
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.ico')
+
+# Keep a compressed copy only if it saves at least this share of the bytes
+MIN_SAVING = 0.05
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unhashed names can change on the next deploy; browsers revalidate them
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+# (request encoding token, file suffix), best first
+ENCODINGS = [('gzip', '.gz')]
+try:
+    import brotli
+except ImportError:
+    brotli = None
+else:
+    ENCODINGS.insert(0, ('br', '.br'))
+
+
+def compress(data):
+    """{suffix: bytes} for every encoding that makes `data` worthwhile smaller"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    limit = len(data) * (1 - MIN_SAVING)
+    return {suffix: payload for suffix, payload in variants.items() if len(payload) < limit}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also writes .gz/.br copies of compressible files"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+
+        # The unhashed copies are compressed as well; they are what url() falls back to
+        for name in set(hashed) | set(paths):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+                continue
+            with self.open(name) as handle:
+                data = handle.read()
+            for suffix, payload in compress(data).items():
+                path = self.path(name + suffix)
+                with open(path, 'wb') as handle:
+                    handle.write(payload)
+                yield name + suffix, name + suffix, True
+
+    def stored_name(self, name):
+        # Before the first collectstatic there is no manifest; fall back to
+        # the plain names instead of failing every page that uses {% static %}
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files from STATIC_ROOT with immutable caching and precompressed bodies"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = '/' + settings.STATIC_URL.strip('/') + '/'
+        self.root = str(settings.STATIC_ROOT)
+        self._hashed_names = None
+
+    @property
+    def hashed_names(self):
+        if self._hashed_names is None:
+            self._hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return self._hashed_names
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        name = posixpath.normpath(name).lstrip('/')
+        if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+            return None
+        try:
+            path = safe_join(self.root, name)
+            stat = os.stat(path)
+        except (SuspiciousFileOperation, OSError):
+            # Not collected: leave it to the URLconf (runserver's static view in DEBUG)
+            return None
+        if not stat_module.S_ISREG(stat.st_mode):
+            return None
+
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+            self.add_headers(response, name, stat)
+            return response
+
+        content_type, _ = mimetypes.guess_type(name)
+        accepted = {token.split(';')[0].strip() for token in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')}
+        encoding = None
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            for token, suffix in ENCODINGS:
+                if token in accepted and os.path.exists(path + suffix):
+                    path, encoding = path + suffix, token
+                    break
+
+        response = FileResponse(open(path, 'rb'), content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+            response['Content-Length'] = os.path.getsize(path)
+        self.add_headers(response, name, stat)
+        return response
+
+    def add_headers(self, response, name, stat):
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if name in self.hashed_names else REVALIDATE_CACHE_CONTROL
+        )
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            # Caches must key on the encoding the body was chosen for
+            response['Vary'] = 'Accept-Encoding'
@@ -0,0 +1,51 @@
+from django.db import connection
+from django.urls import reverse
+from . import urls
+from .instrumentation import RequestMetrics
+
+
+def fetch(request, url, **kwargs):
+    """Make a test client request and drain streaming bodies, whose queries run lazily"""
+    response = request(url, **kwargs)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting that a block stays within a query budget"""
+
+    def assertQueryBudget(self, budget, func, *args, **kwargs):
+        """Call `func` and fail if it runs more than `budget` queries; returns its result"""
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics.record_query):
+            result = func(*args, **kwargs)
+        if metrics.query_count > budget:
+            details = '\n'.join(
+                f'  {count}x {sql[:200]}'
+                for sql, count in sorted(metrics.duplicates.items(), key=lambda item: -item[1])
+            ) or '  (no repeated statements)'
+            self.fail(
+                f'{metrics.query_count} queries exceeds the budget of {budget}. Repeated statements:\n{details}'
+            )
+        return result
+
+    def assertRouteBudgets(self, client, budgets, route_kwargs=None, method='get'):
+        """
+        Request every named route in hrms.urls and check it against `budgets`.
+
+        `budgets` maps route name to the maximum number of queries; routes
+        without an entry fail the test so new views cannot skip a budget.
+        `route_kwargs` supplies URL arguments for parameterised routes.
+        """
+        route_kwargs = route_kwargs or {}
+        for pattern in urls.urlpatterns:
+            name = getattr(pattern, 'name', None)
+            if not name:
+                continue
+            with self.subTest(route=name):
+                self.assertIn(name, budgets, f'No query budget defined for route {name!r}')
+                if budgets[name] is None:
+                    continue
+                url = reverse(name, kwargs=route_kwargs.get(name))
+                self.assertQueryBudget(budgets[name], fetch, getattr(client, method), url)
@@ -1,3 +1,1497 @@
-from django.test import TestCase
+import calendar
+import csv
+import hashlib
+import importlib
+import gzip
+import os
+import shutil
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin.sites import site as admin_site
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.mail import get_connection
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q
+from django.http import HttpResponseNotFound
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .forms import LeaveRequestForm, ProfileUpdateForm
+from .loadtest import VirtualEmployee
+from . import instrumentation
+from .instrumentation import QueryInstrumentationMiddleware, StatsRegistry
+from .mailqueue import claim_batch, queue_email, send_queued_mail
+from .models import (
+    CustomUser, Attendance, AttendanceCalendar, DailyAttendanceSummary, LeaveRequest, LeaveBalance, OutboundEmail,
+    Payroll, Profile, VerificationToken,
+)
+from .availability import department_capacity
+from .balances import accrue_leave, reconcile_leave_balances, set_leave_status
+from .caching import bump_dashboard_version, get_dashboard_blocks
+from .payroll import run_payroll
+from .provisioning import import_employees
+from .rollups import check_in, get_daily_totals, record_attendance_change
+from . import pictures
+from .pictures import process_profile_pictures, variant_name
+from .search import restore_search_triggers, search_employees
+from .sqlite import get_pragmas, get_write_queue, run_write
+from .views import ATTENDANCE_SORT_FIELDS, media_variant
+from PIL import Image
+from .testing import QueryBudgetMixin, fetch
 
-# Create your tests here.
+
+# What settings.py switches to when HRMS_CACHE_URL names a shared cache
+CACHED_AUTH = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'AUTHENTICATION_BACKENDS': ['hrms.backends.CachedUserBackend', 'django.contrib.auth.backends.ModelBackend'],
+}
+
+
+def seed_hrms_data(employees=2000, days=10):
+    """Bulk-create employees with profiles, payrolls, attendance history and leaves"""
+    import_employees(
+        {
+            'employee_id': f'EMP{100000 + i}',
+            'username': f'employee{i}',
+            'email': f'employee{i}@example.com',
+            'first_name': 'Employee',
+            'last_name': str(i),
+            'department': f'Department {i % 12}',
+            'designation': 'Engineer',
+            'basic_salary': '30000',
+            'date_of_joining': '2025-01-01',
+        }
+        for i in range(employees)
+    )
+    user_ids = list(CustomUser.objects.values_list('pk', flat=True))
+    today = timezone.now().date()
+    now = timezone.now()
+
+    Attendance.objects.bulk_create(
+        [
+            Attendance(
+                user_id=user_id,
+                date=today - timedelta(days=day),
+                check_in_time=now - timedelta(days=day, hours=9),
+                check_out_time=now - timedelta(days=day),
+                total_hours=9,
+                status='PRESENT',
+            )
+            for user_id in user_ids
+            for day in range(1, days + 1)
+        ],
+        batch_size=2000,
+    )
+    LeaveRequest.objects.bulk_create([
+        LeaveRequest(
+            user_id=user_id,
+            leave_type='PAID',
+            start_date=today + timedelta(days=7),
+            end_date=today + timedelta(days=9),
+            status='PENDING' if index % 2 else 'APPROVED',
+        )
+        for index, user_id in enumerate(user_ids)
+    ])
+
+
+@override_settings(**CACHED_AUTH)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Every hrms route stays within a fixed query budget at realistic data volumes"""
+
+    # Budgets for a signed-in employee; admin routes just redirect them
+    EMPLOYEE_BUDGETS = {
+        'signup': 2,
+        'signin': 2,
+        'signout': None,  # covered by test_signout, it ends the session
+        'verify_email': 1,
+        'employee_dashboard': 7,
+        'employee_profile': 4,
+        'attendance_view': 2,
+        'attendance_checkin': 2,
+        'attendance_checkout': 2,
+        'leave_request_create': 2,
+        'leave_request_list': 3,
+        'payroll_view': 4,
+        'admin_dashboard': 2,
+        'admin_employee_list': 2,
+        'admin_employee_search': 2,
+        'admin_employee_edit': 2,
+        'admin_attendance_records': 2,
+        'admin_attendance_export': 2,
+        'admin_team_calendar': 2,
+        'admin_leave_approvals': 2,
+        'admin_leave_export': 2,
+        'admin_leave_bulk_action': 2,
+        'admin_leave_action': 2,
+        'admin_salary_management': 2,
+        'admin_salary_export': 2,
+        'admin_salary_update': 2,
+        'admin_payroll_run': 2,
+    }
+
+    # Budgets for a signed-in admin; employee routes just redirect them
+    ADMIN_BUDGETS = {
+        'signup': 2,
+        'signin': 2,
+        'signout': None,
+        'verify_email': 1,
+        'employee_dashboard': 2,
+        'employee_profile': 2,
+        'attendance_view': 2,
+        'attendance_checkin': 2,
+        'attendance_checkout': 2,
+        'leave_request_create': 2,
+        'leave_request_list': 2,
+        'payroll_view': 2,
+        'admin_dashboard': 7,
+        'admin_employee_list': 3,
+        'admin_employee_search': 3,
+        'admin_employee_edit': 4,
+        'admin_attendance_records': 3,
+        'admin_attendance_export': 3,
+        'admin_team_calendar': 3,
+        'admin_leave_approvals': 3,
+        'admin_leave_export': 3,
+        'admin_leave_bulk_action': 2,
+        'admin_leave_action': 3,
+        'admin_salary_management': 4,
+        'admin_salary_export': 3,
+        'admin_salary_update': 4,
+        'admin_payroll_run': 3,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_hrms_data()
+        cls.admin = CustomUser.objects.create_user(
+            'hr', 'hr@example.com', 'password', employee_id='EMP0001', role='ADMIN'
+        )
+        cls.employee = CustomUser.objects.create_user(
+            'employee', 'employee@example.com', 'password', employee_id='EMP0002'
+        )
+        LeaveRequest.objects.filter(status='APPROVED').update(approved_by=cls.admin)
+        cls.leave = LeaveRequest.objects.filter(status='PENDING').first()
+
+    def setUp(self):
+        # Budgets are for a cold dashboard cache
+        cache.clear()
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def route_kwargs(self):
+        return {
+            'verify_email': {'token': 'not-a-real-token'},
+            'admin_employee_edit': {'employee_id': self.employee.pk},
+            'admin_leave_action': {'leave_id': self.leave.pk, 'action': 'approve'},
+            'admin_salary_update': {'employee_id': self.employee.pk},
+        }
+
+    def test_employee_routes(self):
+        self.assertRouteBudgets(self.client_for(self.employee), self.EMPLOYEE_BUDGETS, self.route_kwargs())
+
+    def test_admin_routes(self):
+        self.assertRouteBudgets(self.client_for(self.admin), self.ADMIN_BUDGETS, self.route_kwargs())
+
+    def test_signout(self):
+        client = self.client_for(self.employee)
+        self.assertQueryBudget(4, client.get, reverse('signout'))
+
+    def test_attendance_punches(self):
+        client = self.client_for(self.employee)
+        client.get(reverse('attendance_view'))
+        # Viewing the page writes nothing; the check-in creates the day's row
+        self.assertQueryBudget(2, client.get, reverse('attendance_view'))
+        self.assertFalse(Attendance.objects.filter(user=self.employee, date=timezone.now().date()).exists())
+        # The INSERT, the department lookup, the summary bucket and the
+        # calendar day, with their savepoints; the first check-in of the day
+        # also creates the bucket and the employee's month
+        self.assertQueryBudget(13, client.post, reverse('attendance_checkin'))
+        # Checking out at once leaves the row ABSENT, a bucket nobody has used today
+        self.assertQueryBudget(10, client.post, reverse('attendance_checkout'))
+        attendance = Attendance.objects.get(user=self.employee, date=timezone.now().date())
+        self.assertIsNotNone(attendance.check_in_time)
+        self.assertIsNotNone(attendance.check_out_time)
+
+    def test_punches_are_single_conditional_writes(self):
+        now = timezone.now()
+        today = now.date()
+        # The check-in creates the day's row: one INSERT in a savepoint
+        self.assertEqual(
+            self.assertQueryBudget(3, Attendance.punch_in, self.employee.pk, today, now - timedelta(hours=5)),
+            (True, None),
+        )
+        # A row entered beforehand gets its check-in from one conditional UPDATE
+        # once the INSERT has hit the unique key
+        yesterday = today - timedelta(days=1)
+        Attendance.objects.create(user=self.employee, date=yesterday)
+        self.assertEqual(
+            self.assertQueryBudget(5, Attendance.punch_in, self.employee.pk, yesterday, now),
+            (True, 'ABSENT'),
+        )
+        # A retried or double-clicked check-in must not move the first one
+        self.assertEqual(Attendance.punch_in(self.employee.pk, today, now), (False, None))
+        old_status, new_status, total_hours = self.assertQueryBudget(
+            1, Attendance.punch_out, self.employee.pk, today, now
+        )
+        self.assertEqual((old_status, new_status, total_hours), ('PRESENT', 'HALF_DAY', Decimal('5.00')))
+        self.assertIsNone(Attendance.punch_out(self.employee.pk, today, now + timedelta(hours=1)))
+        attendance = Attendance.objects.get(user=self.employee, date=today)
+        self.assertEqual(attendance.check_in_time, now - timedelta(hours=5))
+        self.assertEqual(attendance.check_out_time, now)
+
+    def test_repeat_dashboard_hits_skip_the_database(self):
+        client = self.client_for(self.employee)
+        client.get(reverse('employee_dashboard'))
+        client.get(reverse('employee_profile'))
+        # Session, user and dashboard blocks all come from the cache
+        self.assertQueryBudget(0, client.get, reverse('employee_dashboard'))
+        self.assertQueryBudget(0, client.get, reverse('employee_profile'))
+
+        # Versions are bumped once the writes commit
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.punch_in(self.employee.pk, timezone.now().date(), timezone.now())
+            LeaveRequest.objects.create(
+                user=self.employee, leave_type='SICK', start_date=date(2026, 12, 1), end_date=date(2026, 12, 2),
+            )
+        response = client.get(reverse('employee_dashboard'))
+        self.assertIsNotNone(response.context['today_attendance'].check_in_time)
+        self.assertEqual(len(response.context['recent_leaves']), 1)
+
+    def test_cached_user_follows_role_changes(self):
+        user = CustomUser.objects.create_user('lead', 'lead@example.com', 'password', employee_id='EMP0003')
+        client = self.client_for(user)
+        url = reverse('admin_dashboard')
+        self.assertTrue(client.get(url)['Location'].startswith(reverse('employee_dashboard')))
+        user.role = 'ADMIN'
+        user.save(update_fields=['role'])
+        self.assertEqual(client.get(url).status_code, 200)
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        self.assertTrue(client.get(url)['Location'].startswith(reverse('signin')))
+
+    def test_leave_request_create(self):
+        client = self.client_for(self.employee)
+        today = timezone.now().date()
+        self.assertQueryBudget(6, client.post, reverse('leave_request_create'), {
+            'leave_type': 'SICK',
+            'start_date': today + timedelta(days=30),
+            'end_date': today + timedelta(days=31),
+            'remarks': 'Flu',
+        })
+        self.assertTrue(LeaveRequest.objects.filter(user=self.employee, leave_type='SICK').exists())
+
+    def test_leave_action(self):
+        client = self.client_for(self.admin)
+        url = reverse('admin_leave_action', kwargs={'leave_id': self.leave.pk, 'action': 'approve'})
+        # Includes creating the user's first leave ledger row for the year
+        self.assertQueryBudget(13, client.post, url, {'comment': 'Enjoy'})
+        self.leave.refresh_from_db()
+        self.assertEqual(self.leave.status, 'APPROVED')
+
+    def test_bulk_leave_approval(self):
+        client = self.client_for(self.admin)
+        pending = list(LeaveRequest.objects.filter(status='PENDING').values_list('pk', flat=True)[:300])
+        approved = LeaveRequest.objects.filter(status='APPROVED').values_list('pk', flat=True).first()
+        # A constant number of statements however many requests are decided
+        response = self.assertQueryBudget(
+            14, client.post, reverse('admin_leave_bulk_action'),
+            {'action': 'approve', 'leave_ids': pending + [approved], 'comment': 'Month end'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.json(), {'action': 'approve', 'requested': 301, 'updated': 300})
+        self.assertEqual(LeaveRequest.objects.filter(pk__in=pending, status='APPROVED', admin_comment='Month end').count(), 300)
+        self.assertEqual(
+            LeaveBalance.objects.filter(user__leave_requests__pk__in=pending, leave_type='PAID').count(), 300
+        )
+
+    def test_team_calendar(self):
+        client = self.client_for(self.admin)
+        today = timezone.now().date()
+        leave = LeaveRequest.objects.filter(status='PENDING', user__profile__department='Department 3').first()
+        client.post(reverse('admin_leave_bulk_action'), {'action': 'approve', 'leave_ids': [leave.pk]})
+        Attendance.punch_in(leave.user_id, today, timezone.now())
+        record_attendance_change(leave.user_id, today, None, 'PRESENT')
+
+        response = self.assertQueryBudget(
+            self.ADMIN_BUDGETS['admin_team_calendar'],
+            client.get, reverse('admin_team_calendar'), {'month': f'{today:%Y-%m}', 'department': 'Department 3'},
+        )
+        payload = response.json()
+        self.assertEqual(len(payload['employees']), 167)
+        self.assertEqual(payload['days_in_month'], calendar.monthrange(today.year, today.month)[1])
+        days = next(row['days'] for row in payload['employees'] if row['id'] == leave.user_id)
+        self.assertEqual(days[today.day - 1], 'P')
+        if leave.start_date.month == today.month:
+            self.assertEqual(days[leave.start_date.day - 1], 'L')
+
+    def test_salary_update(self):
+        client = self.client_for(self.admin)
+        url = reverse('admin_salary_update', kwargs={'employee_id': self.employee.pk})
+        self.assertQueryBudget(8, client.post, url, {'basic_salary': '45000'})
+        self.assertEqual(Payroll.objects.filter(user=self.employee).first().basic_salary, 45000)
+
+    def test_payroll_run(self):
+        client = self.client_for(self.admin)
+        month = timezone.now().date().replace(day=1)
+        # Payslips for 2,000 employees go in a few dozen multi-row INSERTs
+        # (SQLite caps bound parameters per statement), not one per employee
+        self.assertQueryBudget(40, client.post, reverse('admin_payroll_run'), {'month': f'{month:%Y-%m}'})
+
+    def test_attendance_pages_cost_the_same(self):
+        client = self.client_for(self.admin)
+        first_page = fetch(client.get, reverse('admin_attendance_records'))
+        cursor = first_page.context['page'].next_cursor
+        for _ in range(5):
+            page = self.assertQueryBudget(
+                self.ADMIN_BUDGETS['admin_attendance_records'],
+                client.get, reverse('admin_attendance_records'), {'after': cursor},
+            )
+            cursor = page.context['page'].next_cursor
+            self.assertIsNotNone(cursor)
+
+    def test_attendance_table_json(self):
+        client = self.client_for(self.admin)
+        url = reverse('admin_attendance_records')
+        params = {'q': 'employee 199', 'sort': 'total_hours', 'page_size': 20}
+        # Search, sort and paging return one page of rows, not the whole table
+        response = self.assertQueryBudget(
+            self.ADMIN_BUDGETS['admin_attendance_records'], client.get, url, params, HTTP_ACCEPT='application/json',
+        )
+        payload = response.json()
+        self.assertEqual(payload['html'].count('<tr>'), 20)
+        self.assertIsNone(payload['previous_cursor'])
+
+        seen = payload['html']
+        cursor = payload['next_cursor']
+        while cursor:
+            payload = client.get(url, dict(params, after=cursor), HTTP_ACCEPT='application/json').json()
+            seen += payload['html']
+            cursor = payload['next_cursor']
+        # Employee 199, 1990-1999 and 1199 (ID EMP101199), 10 days each
+        self.assertEqual(seen.count('<tr>'), 120)
+        self.assertNotIn('Employee 198', seen)
+
+    def test_every_attendance_sort_seeks_on_an_index(self):
+        row = Attendance.objects.order_by('pk').first()
+        for field in ATTENDANCE_SORT_FIELDS:
+            for order in ((f'-{field}', '-id'), (field, 'id')):
+                with self.subTest(order=order):
+                    # The shape of a keyset page query after a cursor
+                    plan = Attendance.objects.filter(
+                        Q(**{f'{field}__lt': getattr(row, field)}) | Q(**{field: getattr(row, field), 'id__lt': row.pk})
+                    ).order_by(*order)[:51].explain()
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+
+@override_settings(**CACHED_AUTH)
+class AdminDashboardTests(TestCase):
+    """The admin dashboard counts stay right when data changes outside the views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            'hr', 'hr@example.com', 'password', employee_id='EMP0001', role='ADMIN'
+        )
+        cls.employee = CustomUser.objects.create_user(
+            'employee', 'employee@example.com', 'password', employee_id='EMP0002'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_django_admin_edits_keep_the_rollup(self):
+        attendance_admin = admin_site._registry[Attendance]
+        request = RequestFactory().post('/admin/')
+        request.user = self.admin
+        today = timezone.now().date()
+
+        row = Attendance(user=self.employee, date=today, status='PRESENT')
+        attendance_admin.save_model(request, row, None, False)
+        self.assertEqual(get_daily_totals(today), {'PRESENT': 1})
+        row.status = 'HALF_DAY'
+        attendance_admin.save_model(request, row, None, True)
+        self.assertEqual(get_daily_totals(today), {'PRESENT': 0, 'HALF_DAY': 1})
+        row.date = today - timedelta(days=1)
+        attendance_admin.save_model(request, row, None, True)
+        self.assertEqual(get_daily_totals(today), {'PRESENT': 0, 'HALF_DAY': 0})
+        self.assertEqual(get_daily_totals(row.date), {'HALF_DAY': 1})
+        attendance_admin.delete_queryset(request, Attendance.objects.filter(pk=row.pk))
+        self.assertEqual(get_daily_totals(row.date), {'HALF_DAY': 0})
+        # Neither day has a record left on the team calendar
+        for day in (today, row.date):
+            days = AttendanceCalendar.objects.get(user=self.employee, month=day.replace(day=1)).days
+            self.assertEqual(days[day.day - 1], AttendanceCalendar.NO_RECORD)
+
+    def test_sign_ins_keep_the_cached_counts(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(Client().login(username='employee', password='password'))
+        self.assertEqual(callbacks, [])
+
+    def test_counts_are_cached_until_they_change(self):
+        client = Client()
+        client.force_login(self.admin)
+        url = reverse('admin_dashboard')
+        self.assertEqual(client.get(url).context['pending_leaves'], 0)
+        # Warm: no COUNT queries, only the rollup and the two short lists
+        with self.assertNumQueries(3):
+            self.assertEqual(client.get(url).context['total_employees'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            leave = LeaveRequest.objects.create(
+                user=self.employee, leave_type='SICK', start_date=date(2026, 3, 2), end_date=date(2026, 3, 2)
+            )
+        self.assertEqual(client.get(url).context['pending_leaves'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            set_leave_status(LeaveRequest.objects.filter(pk=leave.pk), 'APPROVED', self.admin)
+        self.assertEqual(client.get(url).context['pending_leaves'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            import_employees([{'employee_id': 'EMP0003', 'username': 'new', 'email': 'new@example.com'}])
+        self.assertEqual(client.get(url).context['total_employees'], 2)
+
+
+class LeaveBalanceTests(TestCase):
+    """The leave ledger follows status changes and can be accrued and reconciled"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            'hr', 'hr@example.com', 'password', employee_id='EMP0001', role='ADMIN'
+        )
+        cls.employee = CustomUser.objects.create_user(
+            'employee', 'employee@example.com', 'password', employee_id='EMP0002'
+        )
+
+    def balance(self, leave_type, year):
+        return LeaveBalance.objects.get(user=self.employee, leave_type=leave_type, year=year)
+
+    def test_status_changes_move_used_days(self):
+        leave = LeaveRequest.objects.create(
+            user=self.employee, leave_type='PAID', start_date=date(2026, 12, 30), end_date=date(2027, 1, 2)
+        )
+        leaves = LeaveRequest.objects.filter(pk=leave.pk)
+        self.assertEqual(set_leave_status(leaves, 'APPROVED', self.admin), 1)
+        # Approving twice changes nothing
+        self.assertEqual(set_leave_status(leaves, 'APPROVED', self.admin), 0)
+        self.assertEqual(self.balance('PAID', 2026).used, 2)
+        self.assertEqual(self.balance('PAID', 2027).used, 2)
+
+        # Decisions only apply to pending requests unless told otherwise
+        self.assertEqual(set_leave_status(leaves, 'REJECTED', self.admin), 0)
+        self.assertEqual(set_leave_status(leaves, 'REJECTED', self.admin, 'Cancelled', from_statuses=None), 1)
+        self.assertEqual(self.balance('PAID', 2026).used, 0)
+        self.assertEqual(self.balance('PAID', 2027).used, 0)
+        leave.refresh_from_db()
+        self.assertEqual((leave.status, leave.approved_by, leave.admin_comment), ('REJECTED', self.admin, 'Cancelled'))
+
+    def test_admin_action_reports_changed_requests(self):
+        LeaveRequest.objects.bulk_create([
+            LeaveRequest(user=self.employee, leave_type='SICK', start_date=date(2026, 3, day), end_date=date(2026, 3, day),
+                         status='APPROVED' if day == 1 else 'PENDING')
+            for day in (1, 2, 3)
+        ])
+        self.admin.is_staff = self.admin.is_superuser = True
+        self.admin.save()
+        client = Client()
+        client.force_login(self.admin)
+        response = client.post(reverse('admin:hrms_leaverequest_changelist'), {
+            'action': 'approve_leaves',
+            '_selected_action': list(LeaveRequest.objects.values_list('pk', flat=True)),
+        }, follow=True)
+        self.assertContains(response, '2 leave requests approved.')
+        self.assertEqual(self.balance('SICK', 2026).used, 2)
+
+    def test_accrual_is_idempotent(self):
+        self.assertEqual(accrue_leave(date(2026, 7, 2)), (len(LeaveRequest.LEAVE_TYPE_CHOICES), 3))
+        self.assertEqual(accrue_leave(date(2026, 7, 2)), (0, 3))
+        self.assertEqual(self.balance('PAID', 2026).accrued, Decimal('9.02'))
+        accrue_leave(date(2026, 12, 31))
+        self.assertEqual(self.balance('PAID', 2026).accrued, 18)
+        self.assertEqual(self.balance('UNPAID', 2026).accrued, 0)
+
+    def test_reconcile_fixes_drift(self):
+        LeaveRequest.objects.create(
+            user=self.employee, leave_type='CASUAL', status='APPROVED',
+            start_date=date(2026, 5, 4), end_date=date(2026, 5, 6),
+        )
+        LeaveBalance.objects.create(user=self.employee, leave_type='SICK', year=2026, used=4)
+        drift = reconcile_leave_balances(2026, fix=False)
+        self.assertEqual(sorted(drift), [
+            (self.employee.pk, 'CASUAL', None, 3),
+            (self.employee.pk, 'SICK', Decimal('4.00'), 0),
+        ])
+        reconcile_leave_balances(2026)
+        self.assertEqual(reconcile_leave_balances(2026), [])
+        self.assertEqual(self.balance('CASUAL', 2026).used, 3)
+
+
+class LeaveValidationTests(TestCase):
+    """Leave requests cannot overlap the employee's own leave or exceed department capacity"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(f'user{i}', f'user{i}@example.com', 'password', employee_id=f'EMP10{i:02d}')
+            for i in range(8)
+        ]
+        Profile.objects.update(department='Operations')
+        LeaveRequest.objects.bulk_create([
+            LeaveRequest(user=cls.users[0], leave_type='PAID', status='APPROVED',
+                         start_date=date(2026, 11, 2), end_date=date(2026, 11, 4)),
+            LeaveRequest(user=cls.users[1], leave_type='PAID', status='APPROVED',
+                         start_date=date(2026, 11, 4), end_date=date(2026, 11, 6)),
+            LeaveRequest(user=cls.users[2], leave_type='PAID', status='PENDING',
+                         start_date=date(2026, 11, 10), end_date=date(2026, 11, 10)),
+            LeaveRequest(user=cls.users[3], leave_type='PAID', status='REJECTED',
+                         start_date=date(2026, 11, 10), end_date=date(2026, 11, 10)),
+        ])
+
+    def form(self, user, start_date, end_date):
+        return LeaveRequestForm(
+            {'leave_type': 'SICK', 'start_date': start_date, 'end_date': end_date, 'remarks': ''}, user=user
+        )
+
+    def test_overlapping_own_leave_is_refused(self):
+        form = self.form(self.users[2], '2026-11-09', '2026-11-11')
+        self.assertFalse(form.is_valid())
+        self.assertIn('already have a pending leave', form.non_field_errors()[0])
+        # Rejected leaves do not block their dates
+        self.assertTrue(self.form(self.users[3], '2026-11-09', '2026-11-11').is_valid())
+
+    @override_settings(HRMS_DEPARTMENT_LEAVE_CAPACITY=0.25)
+    def test_department_capacity(self):
+        # Eight people at 25% capacity: two may be out on the same day
+        form = self.form(self.users[4], '2026-11-03', '2026-11-05')
+        self.assertFalse(form.is_valid())
+        self.assertIn('Nov 04, 2026', form.non_field_errors()[0])
+        self.assertTrue(self.form(self.users[4], '2026-11-05', '2026-11-06').is_valid())
+
+    def test_department_capacity_is_off_by_default(self):
+        self.assertIsNone(department_capacity('Operations'))
+        self.assertTrue(self.form(self.users[4], '2026-11-03', '2026-11-05').is_valid())
+
+    def test_department_coverage_uses_indexes(self):
+        plan = LeaveRequest.objects.filter(
+            user__profile__department='Operations', status='APPROVED',
+            start_date__lte=date(2026, 11, 30), end_date__gte=date(2026, 11, 1),
+        ).order_by().explain()
+        self.assertIn('hrms_profile_department_idx', plan)
+        self.assertIn('hrms_leave_user_interval_idx', plan)
+
+    @override_settings(HRMS_DEPARTMENT_LEAVE_CAPACITY=0.25)
+    def test_interval_checks_use_a_fixed_number_of_queries(self):
+        form = self.form(self.users[4], '2026-11-05', '2026-11-06')
+        with self.assertNumQueries(4):
+            self.assertTrue(form.is_valid())
+
+
+class EmployeeSearchTests(TestCase):
+    """Employee search is ranked, limited and kept in sync with users and profiles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        import_employees(
+            {
+                'employee_id': f'EMP{2000 + i}',
+                'username': f'staff{i}',
+                'email': f'staff{i}@example.com',
+                'first_name': 'Staff',
+                'last_name': f'Member{i}',
+                'department': 'Finance' if i % 2 else 'Logistics',
+                'designation': 'Analyst',
+            }
+            for i in range(30)
+        )
+        cls.admin = CustomUser.objects.create_user(
+            'hr', 'hr@example.com', 'password', employee_id='EMP0001', role='ADMIN'
+        )
+
+    def names(self, query, limit=10):
+        return [result['name'] for result in search_employees(query, limit=limit)]
+
+    def test_matches_profile_fields_and_limits(self):
+        results = search_employees('financ', limit=50)
+        self.assertEqual(len(results), 15)
+        self.assertEqual({result['department'] for result in results}, {'Finance'})
+        self.assertEqual(len(search_employees('analyst', limit=5)), 5)
+        # Admins are not employees
+        self.assertEqual(search_employees('hr@example'), [])
+
+    def test_exact_employee_id_ranks_first(self):
+        CustomUser.objects.create_user('longid', 'longid@example.com', 'password', employee_id='EMP20010')
+        results = search_employees('emp2001')
+        self.assertEqual([result['employee_id'] for result in results], ['EMP2001', 'EMP20010'])
+
+    def test_index_follows_changes(self):
+        user = CustomUser.objects.create_user(
+            'newhire', 'newhire@example.com', 'password', employee_id='EMP0500',
+            first_name='Priya', last_name='Raman',
+        )
+        self.assertEqual(self.names('priya'), ['Priya Raman'])
+        Profile.objects.filter(user=user).update(department='Research')
+        self.assertEqual(search_employees('research')[0]['id'], user.pk)
+        CustomUser.objects.filter(pk=user.pk).update(last_name='Iyer')
+        self.assertEqual(self.names('priya'), ['Priya Iyer'])
+        user.delete()
+        self.assertEqual(self.names('priya'), [])
+
+    def test_short_queries_fall_back_to_lookups(self):
+        self.assertEqual(len(search_employees('St', limit=50)), 30)
+
+    def test_migrate_restores_dropped_triggers(self):
+        # What a table rebuild in a later migration does to the triggers
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER hrms_employee_search_profile_update')
+            cursor.execute('DROP TRIGGER hrms_employee_search_user_update')
+        self.assertEqual(restore_search_triggers(connection), [
+            'hrms_employee_search_user_update', 'hrms_employee_search_profile_update',
+        ])
+        self.assertEqual(restore_search_triggers(connection), [])
+
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER hrms_employee_search_profile_update')
+        emit_post_migrate_signal(0, False, connection.alias)
+        user = CustomUser.objects.get(username='staff0')
+        Profile.objects.filter(user=user).update(department='Research')
+        self.assertEqual(search_employees('research')[0]['id'], user.pk)
+
+    def test_typeahead_endpoint(self):
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(reverse('admin_employee_search'), {'q': 'member1', 'limit': 3})
+        results = response.json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['url'], reverse('admin_employee_edit', args=[results[0]['id']]))
+
+        response = client.get(reverse('admin_employee_list'), {'search': 'logistics'})
+        self.assertEqual(len(response.context['employees']), 15)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    # Stands in for memcached/redis: every node reads the same directory
+    'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(tempfile.gettempdir(), 'hrms-test-cache')},
+}, HRMS_DASHBOARD_CACHE='shared')
+class SharedDashboardCacheTests(TestCase):
+    """Dashboard blocks cached by one app node are invalidated by writes on another"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(
+            'employee', 'employee@example.com', 'password', employee_id='EMP0002'
+        )
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_version_bump_reaches_other_nodes(self):
+        client = Client()
+        client.force_login(self.employee)
+        self.assertEqual(client.get(reverse('employee_profile')).context['latest_payroll'].basic_salary, 0)
+
+        # Another node, with its own cache client, changes the salary
+        node = caches.create_connection('shared')
+        payroll = Payroll.objects.filter(user=self.employee).first()
+        payroll.basic_salary = 52000
+        with mock.patch('hrms.caching.caches', {'shared': node}), self.captureOnCommitCallbacks(execute=True):
+            payroll.save()
+        self.assertEqual(client.get(reverse('employee_profile')).context['latest_payroll'].basic_salary, 52000)
+
+    def test_bumps_wait_for_the_commit(self):
+        builds = []
+        builders = {'block': lambda: builds.append(1) or len(builds)}
+        self.assertEqual(get_dashboard_blocks(self.employee.pk, builders), {'block': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_dashboard_version(self.employee.pk)
+            # Until the commit, readers must not cache uncommitted rows under a new version
+            self.assertEqual(get_dashboard_blocks(self.employee.pk, builders), {'block': 1})
+        self.assertEqual(get_dashboard_blocks(self.employee.pk, builders), {'block': 2})
+
+
+class SessionRevocationTests(TestCase):
+    """A revoked session is rejected on the next request, whichever node served it before"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(
+            'employee', 'employee@example.com', 'password', employee_id='EMP0002'
+        )
+
+    def assertSignedOut(self, client):
+        response = client.get(reverse('employee_dashboard'))
+        self.assertTrue(response['Location'].startswith(reverse('signin')))
+
+    def test_database_sessions(self):
+        client = Client()
+        client.force_login(self.employee)
+        self.assertEqual(client.get(reverse('employee_dashboard')).status_code, 200)
+        Session.objects.filter(session_key=client.session.session_key).delete()
+        self.assertSignedOut(client)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(tempfile.gettempdir(), 'hrms-test-sessions')},
+    }, **CACHED_AUTH)
+    def test_cached_sessions_on_a_shared_cache(self):
+        caches['default'].clear()
+        client = Client()
+        client.force_login(self.employee)
+        self.assertEqual(client.get(reverse('employee_dashboard')).status_code, 200)
+
+        # Another node, with its own cache client, signs the session out
+        node = caches.create_connection('default')
+        with mock.patch('django.contrib.sessions.backends.cached_db.caches', {'default': node}):
+            cached_db.SessionStore(session_key=client.session.session_key).delete()
+        self.assertSignedOut(client)
+
+    @override_settings(**CACHED_AUTH)
+    def test_sessions_signed_in_through_model_backend_survive(self):
+        client = Client()
+        client.force_login(self.employee, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(client.get(reverse('employee_dashboard')).status_code, 200)
+
+
+class ProfilePictureTests(TestCase):
+    """Uploads become small, metadata-free, content-addressed thumbnails off the request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(
+            'employee', 'employee@example.com', 'password', employee_id='EMP0002'
+        )
+        cls.colleague = CustomUser.objects.create_user(
+            'colleague', 'colleague@example.com', 'password', employee_id='EMP0003'
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def photo(self, color='teal'):
+        image = Image.new('RGB', (1600, 1200), color)
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif, quality=95)
+        return buffer.getvalue()
+
+    def upload(self, user, data):
+        client = Client()
+        client.force_login(user)
+        client.post(reverse('employee_profile'), {
+            'phone_number': '', 'address': '', 'emergency_contact': '',
+            'profile_picture': SimpleUploadedFile('IMG_0001.jpg', data, content_type='image/jpeg'),
+        })
+        return Profile.objects.get(user=user)
+
+    def test_upload_is_queued_and_processed(self):
+        profile = self.upload(self.employee, self.photo())
+        self.assertIsNotNone(profile.picture_due_at)
+        self.assertEqual(profile.picture_hash, '')
+        upload = profile.profile_picture.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_profile_pictures(), (1, 0))
+        profile.refresh_from_db()
+        self.assertIsNone(profile.picture_due_at)
+        self.assertFalse(default_storage.exists(upload))
+        with default_storage.open(variant_name(profile.picture_hash, 'md', 'webp')) as handle:
+            thumbnail = Image.open(handle)
+            self.assertEqual(thumbnail.size, (160, 160))
+            self.assertEqual(len(thumbnail.getexif()), 0)
+        self.assertLess(default_storage.size(variant_name(profile.picture_hash, 'sm', 'jpg')), 4096)
+
+        client = Client()
+        client.force_login(self.employee)
+        self.assertContains(client.get(reverse('employee_profile')), profile.picture_variants['lg']['webp'])
+
+    def test_identical_uploads_share_variants(self):
+        data = self.photo()
+        self.upload(self.employee, data)
+        self.upload(self.colleague, data)
+        with mock.patch.object(pictures, 'render_variants', wraps=pictures.render_variants) as render, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_profile_pictures(), (2, 0))
+        self.assertEqual(render.call_count, 1)
+        hashes = set(Profile.objects.values_list('picture_hash', flat=True))
+        self.assertEqual(len(hashes), 1)
+
+    def test_upload_replaced_while_processing(self):
+        first = self.upload(self.employee, self.photo()).profile_picture.name
+        render_variants = pictures.render_variants
+        newer = {}
+
+        def render_and_replace(image):
+            # The employee uploads another picture while the worker renders this one
+            newer['name'] = self.upload(self.employee, self.photo('navy')).profile_picture.name
+            return render_variants(image)
+
+        with mock.patch.object(pictures, 'render_variants', side_effect=render_and_replace), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_profile_pictures(), (1, 0))
+        profile = Profile.objects.get(user=self.employee)
+        self.assertEqual(profile.profile_picture.name, newer['name'])
+        self.assertIsNotNone(profile.picture_due_at)
+        self.assertEqual(profile.picture_hash, '')
+        # Nothing shows the first upload any more: it and its variants are gone
+        self.assertFalse(default_storage.exists(first))
+        directories, _ = default_storage.listdir(pictures.VARIANT_DIR)
+        self.assertEqual(
+            [name for directory in directories for name in default_storage.listdir(f'{pictures.VARIANT_DIR}/{directory}')[1]],
+            [],
+        )
+        self.assertTrue(default_storage.exists(newer['name']))
+
+    def test_variants_deleted_by_another_worker_are_restored(self):
+        data = self.photo()
+        self.upload(self.employee, data)
+        digest = hashlib.sha256(data).hexdigest()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(process_profile_pictures(), (1, 0))
+        # Another worker retired an identical picture just before this one committed
+        for size in pictures.get_picture_sizes():
+            for extension, _, _ in pictures.FORMATS:
+                default_storage.delete(variant_name(digest, size, extension))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Profile.objects.get(user=self.employee).picture_hash, digest)
+        self.assertTrue(default_storage.exists(variant_name(digest, 'lg', 'jpg')))
+
+    def test_unreadable_upload_is_discarded(self):
+        name = default_storage.save('profiles/broken.jpg', SimpleUploadedFile('broken.jpg', b'not an image'))
+        Profile.objects.filter(user=self.employee).update(profile_picture=name, picture_due_at=timezone.now())
+        with self.assertLogs('hrms.pictures', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_profile_pictures(), (0, 1))
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(Profile.objects.filter(user=self.employee).exclude(profile_picture='').exists())
+
+    def test_profile_edits_leave_the_worker_fields_alone(self):
+        profile = self.upload(self.employee, self.photo())
+        # The worker finishes while the employee's edit is in flight
+        Profile.objects.filter(pk=profile.pk).update(picture_hash='a' * 64, profile_picture='', picture_due_at=None)
+        form = ProfileUpdateForm(
+            {'phone_number': '5550100', 'address': '', 'emergency_contact': ''}, {}, instance=profile,
+        )
+        self.assertTrue(form.is_valid())
+        form.save()
+        profile.refresh_from_db()
+        self.assertEqual(profile.phone_number, '5550100')
+        self.assertEqual((profile.picture_hash, profile.profile_picture.name, profile.picture_due_at), ('a' * 64, '', None))
+
+    def test_claims_take_three_queries_whatever_the_batch(self):
+        due = timezone.now() - timedelta(minutes=1)
+        Profile.objects.update(profile_picture='profiles/queued.jpg', picture_due_at=due)
+        with self.assertNumQueries(3):
+            claimed = pictures.claim_batch(10)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(pictures.claim_batch(10), [])
+
+    def test_decoder_errors_do_not_stop_the_batch(self):
+        self.upload(self.employee, self.photo())
+        self.upload(self.colleague, self.photo('navy'))
+        render_variants = pictures.render_variants
+        # What Pillow raises for some truncated or malformed files
+        errors = iter([struct.error('unpack requires a buffer of 4 bytes')])
+
+        def render_or_fail(image):
+            for exc in errors:
+                raise exc
+            return render_variants(image)
+
+        with mock.patch.object(pictures, 'render_variants', side_effect=render_or_fail), \
+                self.assertLogs('hrms.pictures', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(process_profile_pictures(), (1, 1))
+        self.assertEqual(Profile.objects.exclude(picture_hash='').count(), 1)
+        self.assertFalse(Profile.objects.filter(picture_due_at__isnull=False).exists())
+
+    def test_variants_are_served_as_immutable(self):
+        profile = self.upload(self.employee, self.photo())
+        with self.captureOnCommitCallbacks(execute=True):
+            process_profile_pictures()
+        profile.refresh_from_db()
+        request = RequestFactory().get('/')
+        response = media_variant(request, variant_name(profile.picture_hash, 'sm', 'webp'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+
+class StaticFilesTests(TestCase):
+    """Collected static files are fingerprinted, precompressed and cached for good"""
+
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        self.enterContext(override_settings(STATIC_ROOT=static_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.original = (settings.BASE_DIR / 'hrms' / 'static' / 'hrms' / 'js' / 'main.js').read_bytes()
+
+    def test_pages_link_fingerprinted_files(self):
+        url = staticfiles_storage.url('hrms/css/style.css')
+        self.assertRegex(url, r'/static/hrms/css/style\.[0-9a-f]{12}\.css$')
+        self.assertContains(Client().get(reverse('signin')), url)
+
+    def test_precompressed_immutable_response(self):
+        url = staticfiles_storage.url('hrms/js/main.js')
+        with self.assertNumQueries(0):
+            response = Client().get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = b''.join(response.streaming_content)
+        self.assertLess(len(body), len(self.original) / 2)
+        self.assertEqual(gzip.decompress(body), self.original)
+
+        response = Client().get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.original)
+
+        not_modified = Client().get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_unhashed_names_are_revalidated(self):
+        response = Client().get('/static/hrms/js/main.js')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+        self.assertEqual(Client().get('/static/../manage.py').status_code, 404)
+
+
+class SQLiteProductionModeTests(TransactionTestCase):
+    """Connections are tuned for concurrent writers and punches can be committed in groups"""
+
+    def setUp(self):
+        import_employees(
+            {
+                'employee_id': f'EMP{3000 + i}',
+                'username': f'punch{i}',
+                'email': f'punch{i}@example.com',
+                'department': 'Operations',
+            }
+            for i in range(20)
+        )
+        self.user_ids = list(CustomUser.objects.values_list('pk', flat=True))
+
+    def test_connection_pragmas(self):
+        pragmas = get_pragmas(connection)
+        self.assertEqual(pragmas['synchronous'], 1)
+        self.assertEqual(pragmas['busy_timeout'], 20000)
+        self.assertEqual(pragmas['cache_size'], -64000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    @override_settings(HRMS_WRITE_QUEUE=True)
+    def test_write_queue_commits_punches(self):
+        today = timezone.now().date()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda user_id: run_write(check_in, user_id, today, timezone.now()), self.user_ids
+            ))
+        self.assertEqual([checked_in for checked_in, _ in results], [True] * 20)
+        self.assertEqual(Attendance.objects.filter(date=today, status='PRESENT').count(), 20)
+        self.assertEqual(get_daily_totals(today), {'PRESENT': 20})
+
+        # A failing write is rolled back alone; the rest of its group commits
+        def fail():
+            Attendance.objects.filter(date=today).update(status='ABSENT')
+            raise ValueError('rejected')
+
+        write_queue = get_write_queue()
+        failed = write_queue.submit(fail)
+        repeated = write_queue.submit(check_in, self.user_ids[0], today, timezone.now())
+        with self.assertRaisesMessage(ValueError, 'rejected'):
+            failed.result()
+        self.assertEqual(repeated.result(), (False, None))
+        self.assertEqual(Attendance.objects.filter(date=today, status='PRESENT').count(), 20)
+
+
+class ImportAttendanceTests(TestCase):
+    """Badge events are merged per employee and day across batches and feed the rollups"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(
+            'badge', 'badge@example.com', 'password', employee_id='EMP4000'
+        )
+        Profile.objects.filter(user=cls.employee).update(department='Operations')
+
+    def import_csv(self, text, *args):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, handle.name)
+        with handle:
+            handle.write(text)
+        out = StringIO()
+        call_command('import_attendance', handle.name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_merges_punches_and_rebuilds_rollups(self):
+        output = self.import_csv(
+            'employee_id,timestamp,event\n'
+            'EMP4000,2026-03-02T09:00:00+05:30,IN\n'
+            'EMP9999,2026-03-02T09:01:00+05:30,IN\n'
+            'EMP4000,2026-03-02T09:05:00+05:30,IN\n'
+            'EMP4000,2026-03-02T13:30:00+05:30,OUT\n'
+            'EMP4000,2026-03-02T13:30:00+05:30,OUT\n'
+            'EMP4000,not-a-time,OUT\n',
+            '--batch-size', '1',
+        )
+        self.assertIn('Skipped 1 malformed event(s)', output)
+        self.assertIn('Skipped 1 attendance day(s) of unknown employee IDs, e.g. EMP9999', output)
+
+        row = Attendance.objects.get(user=self.employee)
+        self.assertEqual(row.date, date(2026, 3, 2))
+        self.assertEqual(timezone.localtime(row.check_in_time).strftime('%H:%M'), '09:00')
+        self.assertEqual(timezone.localtime(row.check_out_time).strftime('%H:%M'), '13:30')
+        self.assertEqual((row.total_hours, row.status), (Decimal('4.50'), 'HALF_DAY'))
+        self.assertEqual(get_daily_totals(date(2026, 3, 2)), {'HALF_DAY': 1})
+        days = AttendanceCalendar.objects.get(user=self.employee, month=date(2026, 3, 1)).days
+        self.assertEqual(days[1], 'H')
+
+        # A later file with an earlier punch widens the stored day
+        self.import_csv('employee_id,timestamp\nEMP4000,2026-03-02T08:00:00+05:30\n')
+        row.refresh_from_db()
+        self.assertEqual((row.total_hours, row.status), (Decimal('5.50'), 'HALF_DAY'))
+        self.assertEqual(Attendance.objects.count(), 1)
+
+
+class ExportTests(TestCase):
+    """Admin exports stream the filtered rows as CSV"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            'hr', 'hr@example.com', 'password', employee_id='EMP0001', role='ADMIN'
+        )
+        cls.alice = CustomUser.objects.create_user(
+            'alice', 'alice@example.com', 'password', employee_id='EMP5001', first_name='Alice', last_name='Shah'
+        )
+        cls.bob = CustomUser.objects.create_user(
+            'bob', 'bob@example.com', 'password', employee_id='EMP5002', first_name='Bob', last_name='Rao'
+        )
+        for user in (cls.alice, cls.bob):
+            for day in (1, 2, 3):
+                Attendance.objects.create(user=user, date=date(2026, 3, day), status='PRESENT', total_hours=9)
+        LeaveRequest.objects.create(
+            user=cls.alice, leave_type='SICK', start_date=date(2026, 3, 5), end_date=date(2026, 3, 6)
+        )
+        LeaveRequest.objects.create(
+            user=cls.bob, leave_type='PAID', start_date=date(2026, 3, 9), end_date=date(2026, 3, 9), status='APPROVED'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        body = b''.join(response.streaming_content).decode()
+        return list(csv.reader(StringIO(body)))
+
+    def test_attendance_export_applies_filters(self):
+        rows = self.export('admin_attendance_export', q='alice', date_from='2026-03-02')
+        self.assertEqual(rows[0], [
+            'Employee ID', 'First Name', 'Last Name', 'Date', 'Check-in', 'Check-out', 'Total Hours', 'Status',
+        ])
+        self.assertEqual([(row[0], row[3]) for row in rows[1:]], [('EMP5001', '2026-03-03'), ('EMP5001', '2026-03-02')])
+        self.assertEqual(rows[1][6:], ['9.00', 'PRESENT'])
+        self.assertEqual(len(self.export('admin_attendance_export')), 7)
+
+    def test_leave_export_filters_by_status(self):
+        rows = self.export('admin_leave_export', status='APPROVED')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], 'EMP5002')
+
+    def test_xlsx_without_openpyxl_is_refused_clearly(self):
+        with mock.patch.dict('sys.modules', {'openpyxl': None}):
+            response = self.client.get(reverse('admin_attendance_export'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'requires openpyxl', response.content)
+
+
+class PayrollRunTests(TestCase):
+    """Loss of pay counts each working day once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(
+            'payee', 'payee@example.com', 'password', employee_id='EMP6000'
+        )
+        # March 2026 has 22 working days: 1000.00 a day
+        Payroll.objects.filter(user=cls.employee).update(
+            basic_salary=22000, provident_fund=1000, effective_date=date(2026, 1, 1)
+        )
+
+    def payslip(self):
+        run_payroll(date(2026, 3, 1))
+        return self.employee.payslips.get(month=date(2026, 3, 1))
+
+    def test_weekend_absence_costs_nothing(self):
+        Attendance.objects.create(user=self.employee, date=date(2026, 3, 7), status='ABSENT')
+        Attendance.objects.create(user=self.employee, date=date(2026, 3, 8), status='ABSENT')
+        payslip = self.payslip()
+        self.assertEqual((payslip.working_days, payslip.loss_of_pay_days), (22, 0))
+        self.assertEqual((payslip.gross_salary, payslip.net_salary), (Decimal('22000.00'), Decimal('21000.00')))
+
+    def test_absence_during_unpaid_leave_is_docked_once(self):
+        LeaveRequest.objects.create(
+            user=self.employee, leave_type='UNPAID', status='APPROVED',
+            start_date=date(2026, 3, 9), end_date=date(2026, 3, 10),
+        )
+        Attendance.objects.create(user=self.employee, date=date(2026, 3, 9), status='ABSENT')
+        Attendance.objects.create(user=self.employee, date=date(2026, 3, 10), status='HALF_DAY')
+        Attendance.objects.create(user=self.employee, date=date(2026, 3, 11), status='HALF_DAY')
+        Attendance.objects.create(user=self.employee, date=date(2026, 3, 12), status='ABSENT')
+        payslip = self.payslip()
+        self.assertEqual(payslip.loss_of_pay_days, Decimal('3.5'))
+        self.assertEqual((payslip.gross_salary, payslip.net_salary), (Decimal('18500.00'), Decimal('17500.00')))
+
+
+class PayrollDuplicateTests(TransactionTestCase):
+    """Duplicate payroll rows are removed newest-wins, by the command and by migration 0005"""
+
+    def setUp(self):
+        self.employee = CustomUser.objects.create_user(
+            'payee', 'payee@example.com', 'password', employee_id='EMP6001'
+        )
+        # Duplicates can only exist without the constraint, as before 0005
+        self.constraint = next(
+            constraint for constraint in Payroll._meta.constraints
+            if constraint.name == 'hrms_payroll_unique_user_effective_date'
+        )
+        others = [constraint for constraint in Payroll._meta.constraints if constraint is not self.constraint]
+        # SQLite rebuilds the table from the model's constraints
+        with mock.patch.object(Payroll._meta, 'constraints', others), connection.schema_editor() as editor:
+            editor.remove_constraint(Payroll, self.constraint)
+        self.kept = Payroll.objects.get(user=self.employee)
+        effective_date = self.kept.effective_date
+        Payroll.objects.bulk_create([
+            Payroll(user=self.employee, basic_salary=100 * i, effective_date=effective_date) for i in (1, 2)
+        ])
+        # Same created_at everywhere: the latest id wins the tie
+        Payroll.objects.update(created_at=self.kept.created_at)
+        self.kept = Payroll.objects.order_by('-id').first()
+
+    def tearDown(self):
+        Payroll.objects.exclude(pk=self.kept.pk).delete()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Payroll, self.constraint)
+
+    def test_command_keeps_latest_row(self):
+        out = StringIO()
+        call_command('cleanup_payroll_duplicates', '--dry-run', stdout=out)
+        self.assertIn('2 duplicate payroll record(s) in 1 group(s) would be deleted', out.getvalue())
+        self.assertEqual(Payroll.objects.count(), 3)
+
+        call_command('cleanup_payroll_duplicates', stdout=StringIO())
+        self.assertEqual(list(Payroll.objects.values_list('pk', flat=True)), [self.kept.pk])
+
+    def test_migration_logs_what_it_deletes(self):
+        migration = importlib.import_module('hrms.migrations.0005_payroll_unique_effective_date')
+        with self.assertLogs(migration.logger, 'WARNING') as logs:
+            migration.delete_duplicate_payrolls(apps, None)
+        self.assertIn('Deleting 2 duplicate payroll row(s)', logs.output[0])
+        self.assertEqual(len(logs.output), 3)
+        self.assertEqual(list(Payroll.objects.values_list('pk', flat=True)), [self.kept.pk])
+
+
+class FixProfilesTests(TestCase):
+    """fix_profiles fills in missing profiles and payrolls and reports what it created"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(f'fix{i}', f'fix{i}@example.com', 'password', employee_id=f'EMP700{i}')
+            for i in range(3)
+        ]
+
+    def fix_profiles(self, *args):
+        out = StringIO()
+        call_command('fix_profiles', *args, stdout=out)
+        return out.getvalue()
+
+    def test_creates_only_missing_rows(self):
+        Profile.objects.filter(user__in=self.users[:2]).delete()
+        Payroll.objects.filter(user=self.users[2]).delete()
+        self.assertIn('Created 2 Profile(s) and 1 Payroll(s)', self.fix_profiles('--batch-size', '1'))
+        self.assertEqual(Profile.objects.filter(user__in=self.users).count(), 3)
+        self.assertEqual(Profile.objects.get(user=self.users[0]).department, 'Not Assigned')
+        self.assertEqual(Payroll.objects.filter(user__in=self.users).count(), 3)
+        self.assertIn('All users already have profiles', self.fix_profiles())
+
+    def test_since_limits_the_users_checked(self):
+        CustomUser.objects.filter(pk=self.users[0].pk).update(date_joined=timezone.now() - timedelta(days=30))
+        Profile.objects.filter(user__in=self.users[:2]).delete()
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertIn('Created 1 Profile(s) and 0 Payroll(s)', self.fix_profiles('--since', since))
+        self.assertFalse(Profile.objects.filter(user=self.users[0]).exists())
+
+
+class ImportEmployeesTests(TestCase):
+    """import_employees creates users with their profile and payroll and skips bad rows"""
+
+    def import_csv(self, text):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, handle.name)
+        with handle:
+            handle.write(text)
+        out = StringIO()
+        call_command('import_employees', handle.name, '--batch-size', '2', stdout=out)
+        return out.getvalue()
+
+    def test_imports_in_batches_and_skips_bad_rows(self):
+        CustomUser.objects.create_user('taken', 'taken@example.com', 'password', employee_id='EMP8000')
+        output = self.import_csv(
+            'employee_id,username,email,first_name,department,basic_salary,date_of_joining,password\n'
+            'EMP8001,asha,asha@example.com,Asha,Finance,40000,2026-01-05,secret-pass\n'
+            'EMP8002,taken,other@example.com,,,,,\n'
+            'BAD1,ravi,ravi@example.com,,,,,\n'
+            'EMP8003,meena,meena@example.com,Meena,,,,\n'
+            'EMP8004,meena,meena2@example.com,,,,,\n'
+        )
+        self.assertIn('Imported 2 employee(s)', output)
+        self.assertIn('Skipped 3 row(s)', output)
+
+        asha = CustomUser.objects.select_related('profile').get(employee_id='EMP8001')
+        self.assertEqual((asha.first_name, asha.role, asha.profile.department), ('Asha', 'EMPLOYEE', 'Finance'))
+        self.assertTrue(asha.check_password('secret-pass'))
+        payroll = asha.payrolls.get()
+        self.assertEqual((payroll.basic_salary, payroll.effective_date), (Decimal('40000.00'), date(2026, 1, 5)))
+
+        meena = CustomUser.objects.select_related('profile').get(username='meena')
+        self.assertFalse(meena.has_usable_password())
+        self.assertEqual(meena.profile.department, 'Not Assigned')
+        self.assertEqual(meena.payrolls.count(), 1)
+
+    def test_rows_with_invalid_values_are_reported(self):
+        output = self.import_csv(
+            'employee_id,username,email,basic_salary,date_of_joining,employment_type\n'
+            'EMP8011,one,one@example.com,40000,2026-02-30,\n'
+            'EMP8012,two,two@example.com,lots,,\n'
+            'EMP8013,three,three@example.com,,,FREELANCE\n'
+            'EMP8014,four,four@example.com,52000.50,2026-03-02,CONTRACT\n'
+        )
+        self.assertIn('Imported 1 employee(s)', output)
+        self.assertIn('Skipped 3 row(s) with invalid values', output)
+        for employee_id, field in (('EMP8011', 'date_of_joining'), ('EMP8012', 'basic_salary'),
+                                   ('EMP8013', 'employment_type')):
+            self.assertIn(f'{employee_id} ({field}:', output)
+        self.assertEqual(list(CustomUser.objects.values_list('employee_id', flat=True)), ['EMP8014'])
+        profile = Profile.objects.get(user__employee_id='EMP8014')
+        self.assertEqual((profile.employment_type, profile.date_of_joining), ('CONTRACT', date(2026, 3, 2)))
+
+    def test_missing_columns_are_refused(self):
+        with self.assertRaisesMessage(CommandError, 'Missing required column(s): email'):
+            self.import_csv('employee_id,username\nEMP8005,x\n')
+
+
+class MailQueueTests(TestCase):
+    """Queued mail is claimed once, sent in batches and retried with backoff (locmem backend)"""
+
+    def setUp(self):
+        for i in range(5):
+            queue_email(f'Subject {i}', 'Body', [f'user{i}@example.com'])
+
+    def test_claimed_messages_are_hidden_until_the_claim_expires(self):
+        with self.assertNumQueries(3):
+            claimed = claim_batch(3)
+        self.assertEqual([email.subject for email in claimed], ['Subject 0', 'Subject 1', 'Subject 2'])
+        self.assertEqual(len(claim_batch(10)), 2)
+        self.assertEqual(claim_batch(10), [])
+
+        OutboundEmail.objects.filter(pk=claimed[0].pk).update(next_attempt_at=timezone.now())
+        self.assertEqual([email.pk for email in claim_batch(10)], [claimed[0].pk])
+
+    def test_batch_goes_out_in_one_call(self):
+        connection = get_connection()
+        with mock.patch.object(connection, 'send_messages', wraps=connection.send_messages) as send:
+            self.assertEqual(send_queued_mail(connection=connection), (5, 0))
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].to, ['user0@example.com'])
+        self.assertEqual(OutboundEmail.objects.filter(status='SENT', attempts=1).count(), 5)
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        connection = get_connection()
+        with mock.patch.object(connection, 'send_messages', side_effect=OSError('refused')):
+            self.assertEqual(send_queued_mail(batch_size=2, max_attempts=2, connection=connection), (0, 2))
+            email = OutboundEmail.objects.get(subject='Subject 0')
+            self.assertEqual((email.status, email.attempts, email.last_error), ('PENDING', 1, 'refused'))
+            self.assertAlmostEqual(
+                (email.next_attempt_at - timezone.now()).total_seconds(), 60, delta=5
+            )
+
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now() - timedelta(days=1))
+            self.assertEqual(send_queued_mail(batch_size=1, max_attempts=2, connection=connection), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('FAILED', 2))
+        self.assertEqual(send_queued_mail(batch_size=10), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_rate_limit_paces_the_calls(self):
+        connection = get_connection()
+        with mock.patch('hrms.mailqueue.time.sleep') as sleep, \
+                mock.patch.object(connection, 'send_messages', wraps=connection.send_messages) as send:
+            self.assertEqual(send_queued_mail(rate_limit=2, connection=connection), (5, 0))
+        self.assertEqual([len(call.args[0]) for call in send.call_args_list], [2, 2, 1])
+        self.assertEqual(sleep.call_count, 2)
+        self.assertAlmostEqual(sleep.call_args.args[0], 1.0, delta=0.5)
+
+
+class VerificationTokenTests(TestCase):
+    """Verification tokens are stored hashed, expire and work once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('newhire', 'newhire@example.com', 'password', employee_id='EMP9000')
+
+    def test_only_the_digest_is_stored(self):
+        raw_token = self.user.generate_verification_token()
+        token = VerificationToken.objects.get(user=self.user)
+        self.assertNotEqual(token.digest, raw_token)
+        self.assertEqual(token.digest, hashlib.sha256(raw_token.encode()).hexdigest())
+        self.assertFalse(VerificationToken.objects.filter(digest=raw_token).exists())
+
+    def test_consume_is_single_use(self):
+        raw_token = self.user.generate_verification_token()
+        with self.assertNumQueries(1):
+            self.assertEqual(VerificationToken.consume(raw_token), self.user.pk)
+        self.assertIsNone(VerificationToken.consume(raw_token))
+        self.assertIsNone(VerificationToken.consume('not-a-token'))
+
+        response = self.client.get(reverse('verify_email', args=[raw_token]), follow=True)
+        self.assertContains(response, 'Invalid or expired verification link.')
+
+    def test_expired_tokens_are_refused_and_purged(self):
+        raw_token = self.user.generate_verification_token()
+        VerificationToken.objects.update(expires_at=timezone.now() - timedelta(days=8))
+        self.assertIsNone(VerificationToken.consume(raw_token))
+
+        fresh = self.user.generate_verification_token()
+        call_command('purge_verification_tokens', stdout=StringIO())
+        self.assertEqual(list(VerificationToken.objects.values_list('digest', flat=True)), [VerificationToken.hash(fresh)])
+        self.client.get(reverse('verify_email', args=[fresh]))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.email_verified)
+
+
+class VerificationTokenMigrationTests(TransactionTestCase):
+    """Migration 0007 moves plain-text tokens into the hashed store"""
+
+    before = [('hrms', '0006_outbound_email_queue')]
+
+    def test_pending_tokens_still_verify(self):
+        executor = MigrationExecutor(connection)
+        after = executor.loader.graph.leaf_nodes('hrms')
+        try:
+            executor.migrate(self.before)
+            old_apps = executor.loader.project_state(self.before).apps
+            user = old_apps.get_model('hrms', 'CustomUser').objects.create(
+                username='legacy', email='legacy@example.com', employee_id='EMP9001', verification_token='plain-token',
+            )
+            old_apps.get_model('hrms', 'CustomUser').objects.create(
+                username='verified', email='verified@example.com', employee_id='EMP9002', verification_token='',
+            )
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.migrate(after)
+
+        token = VerificationToken.objects.get()
+        self.assertEqual(token.digest, hashlib.sha256(b'plain-token').hexdigest())
+        self.assertGreater(token.expires_at, timezone.now() + timedelta(hours=47))
+        self.assertEqual(VerificationToken.consume('plain-token'), user.pk)
+
+
+class AttendanceSummaryMigrationTests(TransactionTestCase):
+    """Migration 0003 counts the attendance already recorded"""
+
+    before = [('hrms', '0002_attendance_date_id_index')]
+
+    def test_existing_attendance_is_counted(self):
+        executor = MigrationExecutor(connection)
+        after = executor.loader.graph.leaf_nodes('hrms')
+        try:
+            executor.migrate(self.before)
+            old_apps = executor.loader.project_state(self.before).apps
+            CustomUser = old_apps.get_model('hrms', 'CustomUser')
+            Attendance = old_apps.get_model('hrms', 'Attendance')
+            today = timezone.now().date()
+            for i, status in enumerate(['PRESENT', 'PRESENT', 'ABSENT']):
+                user = CustomUser.objects.create(username=f'user{i}', email=f'user{i}@example.com', employee_id=f'EMP900{i}')
+                Attendance.objects.create(user=user, date=today, status=status)
+            old_apps.get_model('hrms', 'Profile').objects.create(user=user, designation='Analyst', department='Finance')
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.migrate(after)
+
+        self.assertEqual(get_daily_totals(today), {'PRESENT': 2, 'ABSENT': 1})
+        self.assertEqual(
+            DailyAttendanceSummary.objects.get(date=today, status='ABSENT').department, 'Finance'
+        )
+
+
+class InstrumentationTests(TestCase):
+    """Request stats are flushed safely from many threads and keyed by view"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.enterContext(override_settings(HRMS_INSTRUMENTATION_DIR=Path(directory)))
+        self.directory = Path(directory)
+
+    def test_concurrent_flushes(self):
+        registry = StatsRegistry(flush_interval=0)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: registry.add('view', i, 1, 1, 0, 0), range(200)))
+        registry.flush()
+        self.assertEqual([path.name for path in self.directory.iterdir()], [f'requests-{os.getpid()}.json'])
+        self.assertEqual(len(instrumentation.load_stats()['view']), 200)
+
+    def test_unresolved_paths_share_one_key(self):
+        registry = StatsRegistry(flush_interval=3600)
+        middleware = QueryInstrumentationMiddleware(lambda request: HttpResponseNotFound())
+        with mock.patch.object(instrumentation, 'registry', registry):
+            for path in ('/wp-login.php', '/.env', '/admin.php'):
+                middleware(RequestFactory().get(path))
+        self.assertEqual(list(registry.snapshot()), [instrumentation.UNRESOLVED_VIEW])
+
+
+class LockContentionTests(TestCase):
+    """Lock timeouts are answered with a marked 503 that the load test counts, DEBUG or not"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = CustomUser.objects.create_user(
+            'busy', 'busy@example.com', 'password', employee_id='EMP9100'
+        )
+
+    def test_lock_error_becomes_marked_503(self):
+        self.client.force_login(self.employee)
+        with mock.patch('hrms.views.check_in', side_effect=OperationalError('database is locked')):
+            with self.assertLogs('hrms.middleware', 'WARNING'):
+                response = self.client.post(reverse('attendance_checkin'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual((response['Retry-After'], response['X-Lock-Contention']), ('1', '1'))
+
+    def test_load_test_classifies_by_header(self):
+        employee = VirtualEmployee('http://127.0.0.1:1', 'busy', 'password')
+        with mock.patch.object(employee, 'request', return_value=(503, {'X-Lock-Contention': '1'}, b'Busy')):
+            self.assertEqual(employee.timed('attendance_checkin', 'POST', '/').error, 'lock_contention')
+        with mock.patch.object(employee, 'request', return_value=(500, {}, b'Server Error (500)')):
+            self.assertEqual(employee.timed('attendance_checkin', 'POST', '/').error, 'http_500')
@@ -24,10 +24,17 @@ urlpatterns = [
     # Admin URLs
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('admin/employees/', views.admin_employee_list, name='admin_employee_list'),
+    path('admin/employees/search/', views.admin_employee_search, name='admin_employee_search'),
     path('admin/employees/<int:employee_id>/edit/', views.admin_employee_edit, name='admin_employee_edit'),
     path('admin/attendance/', views.admin_attendance_records, name='admin_attendance_records'),
+    path('admin/attendance/export/', views.admin_attendance_export, name='admin_attendance_export'),
+    path('admin/calendar/', views.admin_team_calendar, name='admin_team_calendar'),
     path('admin/leave/', views.admin_leave_approvals, name='admin_leave_approvals'),
+    path('admin/leave/export/', views.admin_leave_export, name='admin_leave_export'),
+    path('admin/leave/bulk/', views.admin_leave_bulk_action, name='admin_leave_bulk_action'),
     path('admin/leave/<int:leave_id>/<str:action>/', views.admin_leave_action, name='admin_leave_action'),
     path('admin/salary/', views.admin_salary_management, name='admin_salary_management'),
+    path('admin/salary/export/', views.admin_salary_export, name='admin_salary_export'),
     path('admin/salary/<int:employee_id>/update/', views.admin_salary_update, name='admin_salary_update'),
+    path('admin/salary/run/', views.admin_payroll_run, name='admin_payroll_run'),
 ]
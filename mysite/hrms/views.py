@@ -1,14 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.views.static import serve
+from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.core.mail import send_mail
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db.models import Q, Count, F, DecimalField, ExpressionWrapper, OuterRef, Subquery
+from django.db.models.functions import ExtractYear
 from datetime import datetime, timedelta
-from .models import CustomUser, Profile, Attendance, LeaveRequest, Payroll
+from .models import (
+    CustomUser, Profile, Attendance, AttendanceCalendar, LeaveRequest, LeaveBalance, Payroll, PayrollRun,
+    VerificationToken,
+)
 from .forms import SignUpForm, SignInForm, ProfileUpdateForm, AdminProfileUpdateForm, LeaveRequestForm
+from .pagination import keyset_paginate, get_page_size, get_sort
+from .rollups import check_in, check_out, get_daily_totals
+from .exports import export_response
+from .payroll import parse_month, run_payroll
+from .mailqueue import queue_email
+from .balances import set_leave_status
+from .search import search_employees, get_search_limit
+from .caching import ADMIN_DASHBOARD, get_dashboard_blocks
+from .backends import invalidate_cached_user
+from .pictures import IMMUTABLE_CACHE_CONTROL, VARIANT_RE
+from .sqlite import run_write
 
 
 # ============== Helper Functions ==============
@@ -23,6 +41,65 @@ def is_employee(user):
     return user.is_authenticated and user.role == 'EMPLOYEE'
 
 
+# Columns the admin attendance table can be sorted by; each needs a
+# (field, id) index on Attendance for keyset paging
+ATTENDANCE_SORT_FIELDS = ('date', 'total_hours', 'status')
+
+
+def filter_attendance_records(queryset, params):
+    """Apply the admin attendance employee search and date filters"""
+    search_query = params.get('q', '')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+    
+    # Every word has to match the employee ID or a name, so full names work
+    for term in search_query.split():
+        queryset = queryset.filter(
+            Q(user__employee_id__icontains=term) |
+            Q(user__first_name__icontains=term) |
+            Q(user__last_name__icontains=term)
+        )
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    
+    return queryset
+
+
+def filter_leave_requests(queryset, params, default_status=''):
+    """Apply the admin leave status filter and an optional date range"""
+    status_filter = params.get('status', default_status)
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+    
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    # Keep any leave that overlaps the requested range
+    if date_from:
+        queryset = queryset.filter(end_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(start_date__lte=date_to)
+    
+    return queryset
+
+
+def filter_payrolls(queryset, params):
+    """Apply the admin salary employee filter and an optional effective date range"""
+    employee_id = params.get('employee')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+    
+    if employee_id:
+        queryset = queryset.filter(user_id=employee_id)
+    if date_from:
+        queryset = queryset.filter(effective_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(effective_date__lte=date_to)
+    
+    return queryset
+
+
 # ============== Authentication Views ==============
 
 def signup_view(request):
@@ -36,49 +113,22 @@ def signup_view(request):
             user = form.save(commit=False)
             user.is_active = True  # User can login, but email not verified
             user.save()
-<<<<<<< HEAD
             
             # Generate verification token
             token = user.generate_verification_token()
             
             # Note: Profile and Payroll are automatically created by signals.py
             
-=======
-
-            # Create Profile safely (avoid UNIQUE constraint error)
-            profile, created = Profile.objects.get_or_create(
-                user=user,
-                defaults={
-                    'designation': 'Not Assigned',
-                    'department': 'Not Assigned',
-                }
-            )
-
-            # Create Payroll safely
-            payroll, created = Payroll.objects.get_or_create(
-                user=user,
-                defaults={'basic_salary': 0.0}
-            )
-
-            # Generate email verification token
-            token = default_token_generator.make_token(user)
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            current_site = get_current_site(request)
-
-            # Build verification URL
-            verification_url = f"http://{current_site.domain}{reverse('activate', kwargs={'uidb64': uid, 'token': token})}"
-
->>>>>>> c00c069c04bd4eafb92f9444538f33583a738dea
             # Send verification email
             verification_url = request.build_absolute_uri(
                 reverse('verify_email', kwargs={'token': token})
             )
-            send_mail(
+            # Queued so signup never waits on the SMTP server (see send_queued_mail)
+            queue_email(
                 subject='Verify your Dayflow account',
                 message=f'Hello {user.first_name},\n\nPlease click the link below to verify your email:\n{verification_url}\n\nThank you!',
                 from_email='noreply@dayflow.com',
                 recipient_list=[user.email],
-                fail_silently=False,
             )
             
             messages.success(request, 'Account created successfully! Please check your email to verify your account.')
@@ -91,14 +141,13 @@ def signup_view(request):
 
 def verify_email(request, token):
     """Verify user email"""
-    try:
-        user = CustomUser.objects.get(verification_token=token)
-        user.email_verified = True
-        user.verification_token = ''
-        user.save()
+    user_id = VerificationToken.consume(token)
+    if user_id:
+        CustomUser.objects.filter(pk=user_id).update(email_verified=True)
+        invalidate_cached_user(user_id)
         messages.success(request, 'Email verified successfully! You can now sign in.')
-    except CustomUser.DoesNotExist:
-        messages.error(request, 'Invalid verification link.')
+    else:
+        messages.error(request, 'Invalid or expired verification link.')
     
     return redirect('signin')
 
@@ -142,20 +191,23 @@ def employee_dashboard(request):
     user = request.user
     today = timezone.now().date()
     
-    # Get today's attendance
-    today_attendance = Attendance.objects.filter(user=user, date=today).first()
-    
-    # Get recent leave requests
-    recent_leaves = LeaveRequest.objects.filter(user=user)[:5]
-    
-    # Get latest payroll
-    latest_payroll = Payroll.objects.filter(user=user).first()
+    # These blocks change a few times a day per user; the cache is
+    # invalidated by a per-user version bump whenever their rows change
+    blocks = get_dashboard_blocks(user.pk, {
+        f'today_attendance:{today}': lambda: Attendance.objects.filter(user=user, date=today).first(),
+        'recent_leaves': lambda: list(LeaveRequest.objects.filter(user=user)[:5]),
+        'latest_payroll': lambda: Payroll.objects.filter(user=user).first(),
+        f'leave_balances:{today.year}': lambda: list(LeaveBalance.objects.filter(user=user, year=today.year)),
+        'profile': lambda: Profile.objects.filter(user=user).first(),
+    })
     
     context = {
         'user': user,
-        'today_attendance': today_attendance,
-        'recent_leaves': recent_leaves,
-        'latest_payroll': latest_payroll,
+        'profile': blocks['profile'],
+        'today_attendance': blocks[f'today_attendance:{today}'],
+        'recent_leaves': blocks['recent_leaves'],
+        'latest_payroll': blocks['latest_payroll'],
+        'leave_balances': blocks[f'leave_balances:{today.year}'],
     }
     
     return render(request, 'hrms/employee/dashboard.html', context)
@@ -165,19 +217,24 @@ def employee_dashboard(request):
 @user_passes_test(is_employee, login_url='admin_dashboard')
 def employee_profile(request):
     """Employee profile view and edit"""
-    profile = request.user.profile
+    blocks = get_dashboard_blocks(request.user.pk, {
+        'profile': lambda: Profile.objects.filter(user=request.user).first(),
+        'latest_payroll': lambda: Payroll.objects.filter(user=request.user).first(),
+    })
     
     if request.method == 'POST':
+        # Edit the live row, not the cached copy
+        profile = request.user.profile
         form = ProfileUpdateForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
             form.save()
             messages.success(request, 'Profile updated successfully!')
             return redirect('employee_profile')
     else:
+        profile = blocks['profile']
         form = ProfileUpdateForm(instance=profile)
     
-    # Get latest payroll
-    latest_payroll = Payroll.objects.filter(user=request.user).first()
+    latest_payroll = blocks['latest_payroll']
     
     context = {
         'form': form,
@@ -195,11 +252,8 @@ def attendance_view(request):
     user = request.user
     today = timezone.now().date()
     
-    # Get or create today's attendance
-    today_attendance, created = Attendance.objects.get_or_create(
-        user=user,
-        date=today
-    )
+    # Read only: check-in creates today's row (Attendance.punch_in)
+    today_attendance = Attendance.objects.filter(user=user, date=today).first()
     
     # Get this week's attendance
     week_start = today - timedelta(days=today.weekday())
@@ -225,20 +279,15 @@ def attendance_checkin(request):
     """Check-in attendance"""
     if request.method == 'POST':
         user = request.user
-        today = timezone.now().date()
+        now = timezone.now()
+        today = now.date()
         
-        attendance, created = Attendance.objects.get_or_create(
-            user=user,
-            date=today
-        )
+        checked_in, _ = run_write(check_in, user.id, today, now)
         
-        if attendance.check_in_time:
+        if not checked_in:
             messages.warning(request, 'You have already checked in today.')
         else:
-            attendance.check_in_time = timezone.now()
-            attendance.status = 'PRESENT'
-            attendance.save()
-            messages.success(request, f'Checked in successfully at {attendance.check_in_time.strftime("%I:%M %p")}')
+            messages.success(request, f'Checked in successfully at {now.strftime("%I:%M %p")}')
     
     return redirect('attendance_view')
 
@@ -249,20 +298,17 @@ def attendance_checkout(request):
     """Check-out attendance"""
     if request.method == 'POST':
         user = request.user
-        today = timezone.now().date()
+        now = timezone.now()
+        today = now.date()
         
-        try:
-            attendance = Attendance.objects.get(user=user, date=today)
-            
-            if not attendance.check_in_time:
-                messages.error(request, 'Please check in first.')
-            elif attendance.check_out_time:
-                messages.warning(request, 'You have already checked out today.')
-            else:
-                attendance.check_out_time = timezone.now()
-                attendance.calculate_total_hours()
-                messages.success(request, f'Checked out successfully at {attendance.check_out_time.strftime("%I:%M %p")}. Total hours: {attendance.total_hours}')
-        except Attendance.DoesNotExist:
+        punched = run_write(check_out, user.id, today, now)
+        
+        if punched:
+            total_hours = punched[2]
+            messages.success(request, f'Checked out successfully at {now.strftime("%I:%M %p")}. Total hours: {total_hours}')
+        elif Attendance.objects.filter(user=user, date=today, check_out_time__isnull=False).exists():
+            messages.warning(request, 'You have already checked out today.')
+        else:
             messages.error(request, 'Please check in first.')
     
     return redirect('attendance_view')
@@ -273,7 +319,7 @@ def attendance_checkout(request):
 def leave_request_create(request):
     """Create leave request"""
     if request.method == 'POST':
-        form = LeaveRequestForm(request.POST)
+        form = LeaveRequestForm(request.POST, user=request.user)
         if form.is_valid():
             leave_request = form.save(commit=False)
             leave_request.user = request.user
@@ -322,20 +368,28 @@ def admin_dashboard(request):
     """Admin dashboard with overview statistics"""
     today = timezone.now().date()
     
-    # Statistics
-    total_employees = CustomUser.objects.filter(role='EMPLOYEE').count()
-    present_today = Attendance.objects.filter(date=today, status='PRESENT').count()
-    pending_leaves = LeaveRequest.objects.filter(status='PENDING').count()
+    # Head counts are cached until an employee or leave request changes
+    counts = get_dashboard_blocks(ADMIN_DASHBOARD, {
+        'total_employees': lambda: CustomUser.objects.filter(role='EMPLOYEE').count(),
+        'pending_leaves': lambda: LeaveRequest.objects.filter(status='PENDING').count(),
+    })
+    total_employees = counts['total_employees']
+    pending_leaves = counts['pending_leaves']
+    
+    # Attendance counts come from the daily rollup, not a scan of Attendance
+    attendance_totals = get_daily_totals(today)
+    present_today = attendance_totals.get('PRESENT', 0)
     
     # Recent leave requests
-    recent_leave_requests = LeaveRequest.objects.all()[:10]
+    recent_leave_requests = LeaveRequest.objects.select_related('user')[:10]
     
-    # Today's attendance summary
-    today_attendance = Attendance.objects.filter(date=today).select_related('user')
+    # Today's attendance summary (the dashboard only shows the first few)
+    today_attendance = Attendance.objects.filter(date=today).select_related('user')[:5]
     
     context = {
         'total_employees': total_employees,
         'present_today': present_today,
+        'attendance_totals': attendance_totals,
         'pending_leaves': pending_leaves,
         'recent_leave_requests': recent_leave_requests,
         'today_attendance': today_attendance,
@@ -348,16 +402,14 @@ def admin_dashboard(request):
 @user_passes_test(is_admin, login_url='employee_dashboard')
 def admin_employee_list(request):
     """List all employees with search"""
-    search_query = request.GET.get('search', '')
-    employees = CustomUser.objects.filter(role='EMPLOYEE')
+    search_query = request.GET.get('search', '').strip()
+    employees = CustomUser.objects.filter(role='EMPLOYEE').select_related('profile')
     
     if search_query:
-        employees = employees.filter(
-            Q(employee_id__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        # Best matches first, from the search index
+        ids = [match['id'] for match in search_employees(search_query, limit=get_page_size(request))]
+        by_id = employees.in_bulk(ids)
+        employees = [by_id[pk] for pk in ids if pk in by_id]
     
     context = {
         'employees': employees,
@@ -367,6 +419,16 @@ def admin_employee_list(request):
     return render(request, 'hrms/admin/employee_list.html', context)
 
 
+@login_required
+@user_passes_test(is_admin, login_url='employee_dashboard')
+def admin_employee_search(request):
+    """Typeahead: ranked employee matches as JSON (?q=&limit=)"""
+    results = search_employees(request.GET.get('q', ''), limit=get_search_limit(request))
+    for result in results:
+        result['url'] = reverse('admin_employee_edit', args=[result['id']])
+    return JsonResponse({'results': results})
+
+
 @login_required
 @user_passes_test(is_admin, login_url='employee_dashboard')
 def admin_employee_edit(request, employee_id):
@@ -395,19 +457,44 @@ def admin_employee_edit(request, employee_id):
 @login_required
 @user_passes_test(is_admin, login_url='employee_dashboard')
 def admin_attendance_records(request):
-    """View all attendance records"""
+    """View all attendance records; search, sort and paging also come back as JSON for the table"""
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
+    sort_field, descending = get_sort(request, ATTENDANCE_SORT_FIELDS, '-date')
     
-    attendance_records = Attendance.objects.all().select_related('user')
+    attendance_records = filter_attendance_records(
+        Attendance.objects.all().select_related('user'), request.GET
+    )
     
-    if date_from:
-        attendance_records = attendance_records.filter(date__gte=date_from)
-    if date_to:
-        attendance_records = attendance_records.filter(date__lte=date_to)
+    # Seek on (sort field, id) so deep pages cost the same as the first one
+    page = keyset_paginate(
+        attendance_records,
+        sort_field,
+        get_page_size(request),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        descending=descending,
+    )
+    
+    if 'application/json' in request.headers.get('Accept', ''):
+        # Progressive table: only the rows and cursors of the requested page
+        return JsonResponse({
+            'html': render_to_string('hrms/admin/attendance_rows.html', {'attendance_records': page}, request),
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        })
+    
+    # Carry the filters over to the next/previous page links
+    page_query = request.GET.copy()
+    page_query.pop('after', None)
+    page_query.pop('before', None)
     
     context = {
-        'attendance_records': attendance_records,
+        'attendance_records': page,
+        'page': page,
+        'page_query': page_query.urlencode(),
+        'search_query': request.GET.get('q', ''),
+        'sort': f"{'-' if descending else ''}{sort_field}",
         'date_from': date_from,
         'date_to': date_to,
     }
@@ -415,16 +502,67 @@ def admin_attendance_records(request):
     return render(request, 'hrms/admin/attendance_records.html', context)
 
 
+@login_required
+@user_passes_test(is_admin, login_url='employee_dashboard')
+def admin_attendance_export(request):
+    """Export filtered attendance records as CSV/XLSX"""
+    rows = filter_attendance_records(Attendance.objects.all(), request.GET).order_by('-date', '-id').values_list(
+        'user__employee_id', 'user__first_name', 'user__last_name', 'date',
+        'check_in_time', 'check_out_time', 'total_hours', 'status',
+    )
+    header = ['Employee ID', 'First Name', 'Last Name', 'Date', 'Check-in', 'Check-out', 'Total Hours', 'Status']
+    return export_response(request, 'attendance', header, rows)
+
+
+@login_required
+@user_passes_test(is_admin, login_url='employee_dashboard')
+def admin_team_calendar(request):
+    """Month grid of day states per employee as JSON, optionally for one department"""
+    try:
+        month = parse_month(request.GET['month']) if request.GET.get('month') else timezone.now().date().replace(day=1)
+    except ValueError:
+        return JsonResponse({'error': 'month must be in YYYY-MM format'}, status=400)
+    department = request.GET.get('department', '')
+    
+    employees = CustomUser.objects.filter(role='EMPLOYEE', is_active=True)
+    if department:
+        employees = employees.filter(profile__department=department)
+    # One indexed (user, month) lookup per employee, all in a single query
+    days = AttendanceCalendar.objects.filter(user=OuterRef('pk'), month=month).values('days')[:1]
+    rows = employees.annotate(days=Subquery(days)).order_by('first_name', 'last_name', 'pk').values_list(
+        'pk', 'employee_id', 'first_name', 'last_name', 'days'
+    )
+    
+    blank = AttendanceCalendar.blank(month)
+    return JsonResponse({
+        'month': f'{month:%Y-%m}',
+        'department': department,
+        'days_in_month': len(blank),
+        'legend': {
+            AttendanceCalendar.NO_RECORD: 'No record',
+            AttendanceCalendar.ON_LEAVE: 'On leave',
+            **{AttendanceCalendar.ATTENDANCE_STATES[status]: label for status, label in Attendance.STATUS_CHOICES},
+        },
+        'employees': [
+            {'id': pk, 'employee_id': employee_id, 'name': f'{first_name} {last_name}'.strip(), 'days': days or blank}
+            for pk, employee_id, first_name, last_name, days in rows
+        ],
+    })
+
+
 @login_required
 @user_passes_test(is_admin, login_url='employee_dashboard')
 def admin_leave_approvals(request):
     """View and approve/reject leave requests"""
     status_filter = request.GET.get('status', 'PENDING')
     
-    leave_requests = LeaveRequest.objects.all().select_related('user')
-    
-    if status_filter:
-        leave_requests = leave_requests.filter(status=status_filter)
+    # Each row's remaining balance is one lookup on the (user, leave_type, year) unique index
+    balance = LeaveBalance.objects.filter(
+        user=OuterRef('user'), leave_type=OuterRef('leave_type'), year=ExtractYear(OuterRef('start_date')),
+    ).annotate(available=F('accrued') - F('used')).values('available')[:1]
+    leave_requests = filter_leave_requests(
+        LeaveRequest.objects.all().select_related('user', 'approved_by'), request.GET, default_status='PENDING'
+    ).annotate(balance_available=Subquery(balance))
     
     context = {
         'leave_requests': leave_requests,
@@ -434,27 +572,72 @@ def admin_leave_approvals(request):
     return render(request, 'hrms/admin/leave_approvals.html', context)
 
 
+@login_required
+@user_passes_test(is_admin, login_url='employee_dashboard')
+def admin_leave_bulk_action(request):
+    """Approve or reject many pending leave requests at once"""
+    if request.method != 'POST':
+        return redirect('admin_leave_approvals')
+    
+    action = request.POST.get('action')
+    status = {'approve': 'APPROVED', 'reject': 'REJECTED'}.get(action)
+    leave_ids = [value for value in request.POST.getlist('leave_ids') if value.isdigit()]
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    
+    if status is None:
+        if wants_json:
+            return JsonResponse({'error': 'action must be approve or reject'}, status=400)
+        messages.error(request, 'Choose approve or reject.')
+        return redirect('admin_leave_approvals')
+    
+    updated = set_leave_status(
+        LeaveRequest.objects.filter(pk__in=leave_ids), status, request.user, request.POST.get('comment', '')
+    ) if leave_ids else 0
+    
+    if wants_json:
+        return JsonResponse({'action': action, 'requested': len(leave_ids), 'updated': updated})
+    
+    verb = 'approved' if status == 'APPROVED' else 'rejected'
+    messages.success(request, f'{updated} leave request(s) {verb}.')
+    if updated < len(leave_ids):
+        messages.warning(request, f'{len(leave_ids) - updated} request(s) were no longer pending and were skipped.')
+    return redirect('admin_leave_approvals')
+
+
+@login_required
+@user_passes_test(is_admin, login_url='employee_dashboard')
+def admin_leave_export(request):
+    """Export filtered leave requests as CSV/XLSX"""
+    rows = filter_leave_requests(LeaveRequest.objects.all(), request.GET).values_list(
+        'user__employee_id', 'user__first_name', 'user__last_name', 'leave_type',
+        'start_date', 'end_date', 'status', 'approved_by__employee_id', 'remarks', 'admin_comment',
+    )
+    header = ['Employee ID', 'First Name', 'Last Name', 'Leave Type', 'Start Date', 'End Date',
+              'Days', 'Status', 'Processed By', 'Remarks', 'Admin Comment']
+    
+    def with_total_days(row):
+        start_date, end_date = row[4], row[5]
+        return row[:6] + ((end_date - start_date).days + 1,) + row[6:]
+    
+    return export_response(request, 'leave_requests', header, rows, transform=with_total_days)
+
+
 @login_required
 @user_passes_test(is_admin, login_url='employee_dashboard')
 def admin_leave_action(request, leave_id, action):
     """Approve or reject leave request"""
-    leave_request = get_object_or_404(LeaveRequest, id=leave_id)
+    leave_request = get_object_or_404(LeaveRequest.objects.select_related('user'), id=leave_id)
     
     if request.method == 'POST':
         comment = request.POST.get('comment', '')
         
-        if action == 'approve':
-            leave_request.status = 'APPROVED'
-            leave_request.approved_by = request.user
-            leave_request.admin_comment = comment
-            leave_request.save()
-            messages.success(request, f'Leave request for {leave_request.user.get_full_name()} approved.')
-        elif action == 'reject':
-            leave_request.status = 'REJECTED'
-            leave_request.approved_by = request.user
-            leave_request.admin_comment = comment
-            leave_request.save()
-            messages.success(request, f'Leave request for {leave_request.user.get_full_name()} rejected.')
+        status = {'approve': 'APPROVED', 'reject': 'REJECTED'}.get(action)
+        
+        if status and set_leave_status(LeaveRequest.objects.filter(pk=leave_request.pk), status, request.user, comment):
+            verb = 'approved' if status == 'APPROVED' else 'rejected'
+            messages.success(request, f'Leave request for {leave_request.user.get_full_name()} {verb}.')
+        elif status:
+            messages.warning(request, 'This leave request has already been processed.')
     
     return redirect('admin_leave_approvals')
 
@@ -464,12 +647,9 @@ def admin_leave_action(request, leave_id, action):
 def admin_salary_management(request):
     """Manage employee salaries"""
     employee_id = request.GET.get('employee')
-    payrolls = Payroll.objects.all().select_related('user')
+    payrolls = filter_payrolls(Payroll.objects.all().select_related('user'), request.GET)
     employees = CustomUser.objects.filter(role='EMPLOYEE')
     
-    if employee_id:
-        payrolls = payrolls.filter(user_id=employee_id)
-    
     context = {
         'payrolls': payrolls,
         'employees': employees,
@@ -479,6 +659,31 @@ def admin_salary_management(request):
     return render(request, 'hrms/admin/salary_management.html', context)
 
 
+@login_required
+@user_passes_test(is_admin, login_url='employee_dashboard')
+def admin_salary_export(request):
+    """Export filtered payroll records as CSV/XLSX"""
+    money = DecimalField(max_digits=12, decimal_places=2)
+    gross = (F('basic_salary') + F('house_rent_allowance') + F('transport_allowance')
+             + F('medical_allowance') + F('other_allowances'))
+    deductions = F('provident_fund') + F('professional_tax') + F('income_tax') + F('other_deductions')
+    rows = filter_payrolls(Payroll.objects.all(), request.GET).annotate(
+        gross=ExpressionWrapper(gross, output_field=money),
+        deductions=ExpressionWrapper(deductions, output_field=money),
+        net=ExpressionWrapper(gross - deductions, output_field=money),
+    ).values_list(
+        'user__employee_id', 'user__first_name', 'user__last_name', 'effective_date',
+        'basic_salary', 'house_rent_allowance', 'transport_allowance', 'medical_allowance', 'other_allowances',
+        'provident_fund', 'professional_tax', 'income_tax', 'other_deductions',
+        'gross', 'deductions', 'net',
+    )
+    header = ['Employee ID', 'First Name', 'Last Name', 'Effective Date',
+              'Basic Salary', 'HRA', 'Transport', 'Medical', 'Other Allowances',
+              'Provident Fund', 'Professional Tax', 'Income Tax', 'Other Deductions',
+              'Gross Salary', 'Total Deductions', 'Net Salary']
+    return export_response(request, 'payroll', header, rows)
+
+
 @login_required
 @user_passes_test(is_admin, login_url='employee_dashboard')
 def admin_salary_update(request, employee_id):
@@ -487,8 +692,9 @@ def admin_salary_update(request, employee_id):
     latest_payroll = Payroll.objects.filter(user=employee).first()
     
     if request.method == 'POST':
-        # Create new payroll record
-        payroll = Payroll.objects.create(
+        # One salary structure per effective date: update today's or create it
+        effective_date = timezone.now().date()
+        payroll, created = Payroll.objects.update_or_create(
             user=employee,
             effective_date=effective_date,
             defaults={
@@ -513,3 +719,39 @@ def admin_salary_update(request, employee_id):
     }
     
     return render(request, 'hrms/admin/salary_update.html', context)
+
+
+@login_required
+@user_passes_test(is_admin, login_url='employee_dashboard')
+def admin_payroll_run(request):
+    """Run monthly payroll and list previous runs"""
+    if request.method == 'POST':
+        try:
+            month = parse_month(request.POST.get('month', ''))
+        except ValueError:
+            messages.error(request, 'Please choose a valid month.')
+            return redirect('admin_payroll_run')
+        
+        run = run_payroll(month, created_by=request.user)
+        if run.payslip_count:
+            messages.success(request, f'Issued {run.payslip_count} payslips for {month:%B %Y}.')
+        else:
+            messages.warning(request, f'No new payslips to issue for {month:%B %Y}.')
+        return redirect('admin_payroll_run')
+    
+    context = {
+        'payroll_runs': PayrollRun.objects.select_related('created_by')[:12],
+        'current_month': timezone.now().strftime('%Y-%m'),
+    }
+    
+    return render(request, 'hrms/admin/payroll_run.html', context)
+
+
+def media_variant(request, path):
+    """Serve a hashed profile picture variant in development, with the headers production should send"""
+    if not VARIANT_RE.match(path):
+        raise Http404('Not a picture variant')
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    # The name is a content hash, so the file behind it never changes
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
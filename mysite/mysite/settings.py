@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
@@ -50,14 +51,25 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Collected static files are answered here, before sessions and auth
+    'hrms.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Lock timeouts become 503 + Retry-After, whatever DEBUG is
+    'hrms.middleware.LockContentionMiddleware',
 ]
 
+# Opt-in per-view query/latency instrumentation (Server-Timing headers and
+# `manage.py dump_request_stats`)
+if os.getenv('HRMS_INSTRUMENTATION'):
+    MIDDLEWARE.insert(0, 'hrms.instrumentation.QueryInstrumentationMiddleware')
+    if os.getenv('HRMS_INSTRUMENTATION_DIR'):
+        HRMS_INSTRUMENTATION_DIR = Path(os.getenv('HRMS_INSTRUMENTATION_DIR'))
+
 ROOT_URLCONF = 'mysite.urls'
 
 TEMPLATES = [
@@ -100,9 +112,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts; a deferred
+            # transaction that reads first and then writes can fail with
+            # "database is locked" at once instead of waiting its turn.
+            # Read-only atomic() blocks take it too (see hrms/sqlite.py)
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Applied to every new SQLite connection (hrms/sqlite.py). WAL lets readers
+# carry on while one writer commits; NORMAL only syncs at checkpoints in WAL
+# mode, which cannot corrupt the database, though a power cut may lose the
+# last commits. Writers wait up to busy_timeout ms for the lock.
+HRMS_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Send check-in/check-out writes through one thread per process that commits
+# them in groups (hrms/sqlite.py). Needs threaded workers, e.g.
+# `gunicorn --worker-class gthread --threads 8`; with one request per process
+# there is nothing to group.
+HRMS_WRITE_QUEUE = bool(os.getenv('HRMS_WRITE_QUEUE'))
+HRMS_WRITE_QUEUE_BATCH = 64
+HRMS_WRITE_QUEUE_WAIT = 0.002
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -142,6 +182,19 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'hrms' / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# `collectstatic` fingerprints every file and writes .gz copies, plus .br
+# ones when the optional Brotli package is installed (pip install Brotli;
+# without it browsers get gzip); hrms.staticfiles.StaticFilesMiddleware
+# serves them with immutable caching, so no CDN or web server is needed
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'hrms.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files (uploads)
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -156,6 +209,67 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # EMAIL_HOST_PASSWORD = 'your_app_password'
 
 
+# HRMS list pagination (rows per page for keyset-paginated admin tables)
+HRMS_PAGE_SIZE = 50
+HRMS_MAX_PAGE_SIZE = 500
+
+# Email verification links stop working after this long
+HRMS_VERIFICATION_TOKEN_TTL = timedelta(hours=48)
+
+# Yearly leave entitlement in days per leave type, accrued daily by
+# `manage.py accrue_leave`; types not listed (unpaid leave) accrue nothing
+HRMS_LEAVE_ENTITLEMENTS = {
+    'PAID': 18,
+    'SICK': 12,
+    'CASUAL': 6,
+}
+
+# Share of a department that may be on approved leave on the same day, e.g.
+# 0.25; new requests that would exceed it are refused. None disables the check.
+HRMS_DEPARTMENT_LEAVE_CAPACITY = None
+
+# Cache for sessions, signed-in users and dashboard blocks. Local memory is
+# per process; with several worker processes or app nodes set HRMS_CACHE_URL
+# to a shared Redis, so a write (or a sign-out) on one is seen by all.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dayflow',
+    },
+}
+if os.getenv('HRMS_CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('HRMS_CACHE_URL'),
+    }
+HRMS_DASHBOARD_CACHE = 'default'
+HRMS_DASHBOARD_CACHE_TIMEOUT = 3600
+
+# With a shared cache, sessions and the signed-in user come from it, so an
+# authenticated request costs no queries before the view runs; cached_db
+# still writes sessions through to the database, so they survive a cache
+# restart. A per-process cache would keep serving a session or user another
+# worker has revoked, so without HRMS_CACHE_URL both stay in the database.
+# ModelBackend stays listed: sessions record the backend that signed them
+# in, and ones from before the switch must keep resolving.
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+if os.getenv('HRMS_CACHE_URL'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['hrms.backends.CachedUserBackend', 'django.contrib.auth.backends.ModelBackend']
+HRMS_USER_CACHE = 'default'
+HRMS_USER_CACHE_TIMEOUT = 3600
+
+# Profile picture uploads above this size are refused; accepted ones are
+# turned into thumbnails by `manage.py process_profile_pictures --loop`
+HRMS_PROFILE_PICTURE_MAX_BYTES = 10 * 1024 * 1024
+HRMS_PROFILE_PICTURE_SIZES = {'sm': 48, 'md': 160, 'lg': 320}
+
+# Employee typeahead: matches returned by default and at most (?limit=)
+HRMS_SEARCH_RESULTS = 10
+HRMS_SEARCH_MAX_RESULTS = 50
+
+
 # Login URLs
 LOGIN_URL = 'signin'
 LOGIN_REDIRECT_URL = 'employee_dashboard'
@@ -167,6 +281,9 @@ LOGOUT_REDIRECT_URL = 'signin'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 #email configuration
+# Signup emails are queued in the database and delivered by
+# `python manage.py send_queued_mail --loop`. Set EMAIL_BACKEND to
+# 'django.core.mail.backends.console.EmailBackend' to try it locally.
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -1,13 +1,16 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from hrms.views import media_variant
 
 urlpatterns = [
     path('django-admin/', admin.site.urls),  # Django admin at /django-admin/
     path('', include('hrms.urls')),  # HRMS custom admin at /admin/
 ]
 
-# Serve media files during development
+# Serve media files during development. In production the web server serves
+# media/profiles/v/ itself and should send the same immutable Cache-Control.
 if settings.DEBUG:
+    urlpatterns += [re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>profiles/v/.+)$', media_variant)]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)